@@ -7,9 +7,14 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import json
+import uuid
 import streamlit as st
+from pydantic import ValidationError
 
-from pipeline import run_pipeline
+from pipeline import iter_pipeline, run_pipeline
+from tools import render_prd_md, render_milestones_md
+from scheduling import list_schedule
+from schemas import PRD
 
 # Configure Streamlit page settings
 st.set_page_config(page_title="Project Starter Agent", page_icon="✅", layout="wide")
@@ -27,6 +32,8 @@ with st.sidebar:
     st.header("Settings")
     # Slider to control how many revision attempts the pipeline will make
     max_attempts = st.slider("Max revision attempts", 1, 5, 3)
+    # Skip the LLM response cache to force a fresh generation for identical inputs
+    regenerate = st.checkbox("Regenerate (skip response cache)", value=False)
     st.divider()
     st.write("Tip: Keep v1 constraints short and concrete.")
 
@@ -57,15 +64,57 @@ if clear:
     st.session_state.clear()
     st.rerun()
 
+# One checkpointed run per session: re-generating after a small tweak only
+# re-runs the stages whose inputs changed
+if "run_id" not in st.session_state:
+    st.session_state["run_id"] = uuid.uuid4().hex
+
 # Generate button handler: validate input and run the pipeline
 if generate:
     if not idea.strip():
         st.error("Please enter a project idea.")
     else:
-        # Run the pipeline with a status indicator
-        with st.status("Running pipeline…", expanded=False) as status:
-            result = run_pipeline(idea=idea, constraints=constraints, max_attempts=max_attempts)
+        # Run the pipeline, rendering each stage's preview as soon as it validates
+        live = st.empty()
+        streamed_tasks = 0
+        with st.status("Interpreting goal…", expanded=False) as status:
+            for stage_name, value in iter_pipeline(
+                idea=idea,
+                constraints=constraints,
+                max_attempts=max_attempts,
+                use_cache=not regenerate,
+                run_id=st.session_state["run_id"],
+                resume_from="goal" if regenerate else None,
+                stream_items=True,
+            ):
+                if stage_name == "item":
+                    # Elements of the draft still being generated
+                    draft_stage, field, _ = value
+                    if draft_stage == field == "tasks":
+                        streamed_tasks += 1
+                        status.update(label=f"Breaking milestones into tasks… ({streamed_tasks} drafted)")
+                elif stage_name == "goal":
+                    with live.container():
+                        st.subheader(value.title)
+                        st.caption(value.one_liner)
+                        prd_col, milestones_col = st.columns(2)
+                    status.update(label="Writing PRD…")
+                elif stage_name == "prd":
+                    with prd_col:
+                        st.subheader("PRD Preview")
+                        st.markdown(render_prd_md(value))
+                    status.update(label="Planning milestones…")
+                elif stage_name == "milestones":
+                    with milestones_col:
+                        st.subheader("Milestones Preview")
+                        st.markdown(render_milestones_md(value))
+                    status.update(label="Breaking milestones into tasks…")
+                elif stage_name == "tasks":
+                    status.update(label=f"Generated {len(value.tasks)} tasks, rendering…")
+                else:
+                    result = value
             status.update(label="Done!", state="complete")
+        live.empty()
 
         # Store result in session state for persistence
         st.session_state["result"] = result
@@ -83,6 +132,8 @@ if "result" in st.session_state:
     else:
         time_str = f"{seconds:.1f}s"
     st.success(f"✅ Project plan generated in {time_str}")
+    if result.get("reused_stages"):
+        st.caption("Reused unchanged stages: " + ", ".join(result["reused_stages"]))
 
     # Display validation issues if any remain
     issues = result["issues"]
@@ -91,12 +142,20 @@ if "result" in st.session_state:
         st.warning("Some validations still had issues (best-effort output).")
         st.json(remaining)
 
+    # Show deterministic fixes made without an LLM round trip
+    repaired = {k: v for k, v in result.get("repairs", {}).items() if v}
+    if repaired:
+        with st.expander("Auto-repairs applied"):
+            st.json(repaired)
+
     # Download buttons for generated artifacts
     st.subheader("Downloads")
-    d1, d2, d3 = st.columns(3)
+    d1, d2, d3, d4 = st.columns(4)
     d1.download_button("Download PRD.md", result["prd_md"], file_name="PRD.md")
     d2.download_button("Download MILESTONES.md", result["milestones_md"], file_name="MILESTONES.md")
     d3.download_button("Download TASKS.csv", result["tasks_csv"], file_name="TASKS.csv")
+    if result.get("schedule_csv"):
+        d4.download_button("Download SCHEDULE.csv", result["schedule_csv"], file_name="SCHEDULE.csv")
 
     st.divider()
 
@@ -159,6 +218,92 @@ if "result" in st.session_state:
         }
     )
     
+    # Schedule: critical path and a simulation with N parallel workers
+    schedule = result.get("schedule")
+    if schedule is not None:
+        st.divider()
+        st.subheader("Schedule")
+        workers = st.slider("Parallel workers", 1, 8, 1)
+        plan = list_schedule(result["tasks"], workers)
+        s1, s2, s3 = st.columns(3)
+        s1.metric("Critical path", f"{schedule.duration_hours:.1f} h")
+        s2.metric(f"Finish with {workers} worker(s)", f"{plan.makespan_hours:.1f} h")
+        s3.metric("Utilization", f"{plan.utilization():.0%}")
+        st.caption("Critical path: " + " → ".join(schedule.critical_path))
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "Task ID": a.task_id,
+                    "Worker": a.worker + 1,
+                    "Start (h)": round(a.start, 1),
+                    "Finish (h)": round(a.finish, 1),
+                    "Slack (h)": round(schedule.slack[a.task_id], 1),
+                    "Critical": a.task_id in schedule.critical_path,
+                }
+                for a in plan.assignments
+            ]),
+            hide_index=True,
+        )
+    else:
+        st.warning("Tasks have a dependency cycle, so no schedule could be computed.")
+
+    # Edit the PRD and re-plan only milestones and tasks from it
+    with st.expander("Edit PRD and re-plan milestones & tasks"):
+        edited_prd_text = st.text_area(
+            "PRD JSON",
+            value=json.dumps(result["prd"].model_dump(), indent=2),
+            height=400,
+        )
+        if st.button("Re-plan from edited PRD"):
+            try:
+                edited_prd = PRD.model_validate_json(edited_prd_text)
+            except ValidationError as e:
+                st.error(f"Edited PRD is not valid: {e}")
+            else:
+                with st.status("Re-planning milestones and tasks…", expanded=False) as status:
+                    st.session_state["result"] = run_pipeline(
+                        idea=idea,
+                        constraints=constraints,
+                        max_attempts=max_attempts,
+                        use_cache=not regenerate,
+                        run_id=st.session_state["run_id"],
+                        prd_override=edited_prd,
+                    )
+                    status.update(label="Done!", state="complete")
+                st.rerun()
+
+    # Input tokens saved by the compact, field-pruned prompt context
+    if result.get("context_tokens"):
+        with st.expander("Prompt context tokens"):
+            st.dataframe(pd.DataFrame(result["context_tokens"]).T)
+
+    # Where the time went: one bar per stage / draft / validation / revision / LLM call
+    if result.get("spans"):
+        with st.expander("Timing waterfall"):
+            import altair as alt
+            st.dataframe(pd.DataFrame(result["stage_metrics"]).T)
+            spans = pd.DataFrame([
+                {
+                    "Span": f"{i:02d} {s['attributes'].get('stage', '')} {s['name']}"
+                            + (f" #{s['attributes']['attempt']}" if s["name"] != "stage" and "attempt" in s["attributes"] else ""),
+                    "Kind": s["name"],
+                    "Start (s)": s["start_seconds"],
+                    "End (s)": s["start_seconds"] + s["duration_seconds"],
+                    "Duration (ms)": round(s["duration_seconds"] * 1000, 1),
+                    "Tokens": (s["attributes"].get("prompt_tokens") or 0) + (s["attributes"].get("completion_tokens") or 0),
+                    "Cache hit": s["attributes"].get("cache_hit", ""),
+                }
+                for i, s in enumerate(result["spans"], 1)
+            ])
+            chart = alt.Chart(spans).mark_bar().encode(
+                x="Start (s):Q",
+                x2="End (s):Q",
+                y=alt.Y("Span:N", sort=None, title=None),
+                color="Kind:N",
+                tooltip=list(spans.columns),
+            )
+            st.altair_chart(chart, use_container_width=True)
+
     # Debug expander with full structured data
     with st.expander("Show full structured JSON (debug)"):
         st.json({
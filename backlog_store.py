@@ -0,0 +1,238 @@
+# backlog_store.py
+"""
+Columnar store for portfolio analytics over many generated backlogs.
+
+Tasks from TasksDoc objects or TASKS.csv files are kept as NumPy columns:
+categorical codes for type and priority, float hours, dependency fan-in
+(depends_on count) and fan-out (tasks depending on it, within its project),
+plus project and task ids. Aggregations are bincounts and percentiles over
+those columns rather than Python loops over TaskItem objects, so a million
+tasks summarize in well under a second. Stores round-trip through a
+compressed .npz file.
+
+Usage:
+    python backlog_store.py output/batch --save .cache/backlog.npz
+"""
+from __future__ import annotations
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import csv
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from schemas import TasksDoc
+from validators import ALLOWED_PRIORITIES, ALLOWED_TYPES
+
+# Category tables; the last entry collects values outside the allowed set
+TYPES = sorted(ALLOWED_TYPES) + ["other"]
+PRIORITIES = sorted(ALLOWED_PRIORITIES) + ["other"]
+_TYPE_CODE = {name: i for i, name in enumerate(TYPES)}
+_PRIORITY_CODE = {name: i for i, name in enumerate(PRIORITIES)}
+
+_COLUMNS = ("project", "type", "priority", "hours", "fan_in", "fan_out", "task_id")
+
+
+def _encode(values: Sequence[str], table: Dict[str, int]) -> np.ndarray:
+    other = len(table) - 1
+    return np.fromiter((table.get(v, other) for v in values), dtype=np.int8, count=len(values))
+
+
+class BacklogStore:
+    """Append-only columnar backlog store (one row per task)."""
+
+    def __init__(self):
+        self.projects: List[str] = []
+        self._chunks: List[Dict[str, np.ndarray]] = []
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+
+    # Ingestion
+
+    def add_rows(
+        self,
+        project: str,
+        task_ids: Sequence[str],
+        types: Sequence[str],
+        priorities: Sequence[str],
+        hours: Sequence[float],
+        depends_on: Sequence[Sequence[str]],
+    ) -> None:
+        """Append one project's tasks given as parallel sequences."""
+        n = len(task_ids)
+        known = set(task_ids)
+        fan_out = Counter(dep for deps in depends_on for dep in set(deps) if dep in known)
+        self.projects.append(project)
+        self._chunks.append({
+            "project": np.full(n, len(self.projects) - 1, dtype=np.int32),
+            "type": _encode(types, _TYPE_CODE),
+            "priority": _encode(priorities, _PRIORITY_CODE),
+            "hours": np.asarray(hours, dtype=np.float32),
+            "fan_in": np.fromiter((len(d) for d in depends_on), dtype=np.int32, count=n),
+            "fan_out": np.fromiter((fan_out.get(t, 0) for t in task_ids), dtype=np.int32, count=n),
+            "task_id": np.asarray(task_ids, dtype=str),
+        })
+        self._columns = None
+
+    def add_tasks_doc(self, tdoc: TasksDoc, project: Optional[str] = None) -> None:
+        tasks = tdoc.tasks
+        self.add_rows(
+            project or tdoc.title,
+            [t.task_id for t in tasks],
+            [t.type for t in tasks],
+            [t.priority for t in tasks],
+            [t.estimate_hours for t in tasks],
+            [t.depends_on for t in tasks],
+        )
+
+    def add_csv(self, path: str, project: Optional[str] = None) -> None:
+        """Append a TASKS.csv (as written by the pipeline; depends_on is ';'-separated)."""
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.add_rows(
+            project or str(path),
+            [r["task_id"] for r in rows],
+            [r["type"] for r in rows],
+            [r["priority"] for r in rows],
+            [float(r["estimate_hours"] or 0) for r in rows],
+            [[d for d in r["depends_on"].split(";") if d] for r in rows],
+        )
+
+    def add_csv_files(self, paths: Iterable[str]) -> int:
+        count = 0
+        for path in paths:
+            self.add_csv(path)
+            count += 1
+        return count
+
+    # Columns
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Concatenated columns (cached until the next append)."""
+        if self._columns is None:
+            if self._chunks:
+                self._columns = {c: np.concatenate([ch[c] for ch in self._chunks]) for c in _COLUMNS}
+                self._chunks = [self._columns]
+            else:
+                self._columns = {c: np.empty(0, dtype=np.int32) for c in _COLUMNS}
+        return self._columns
+
+    def __len__(self) -> int:
+        return sum(len(ch["hours"]) for ch in self._chunks)
+
+    # Aggregations
+
+    def hours_by_type(self) -> Dict[str, float]:
+        c = self.columns
+        totals = np.bincount(c["type"], weights=c["hours"], minlength=len(TYPES))
+        return {name: float(h) for name, h in zip(TYPES, totals) if h}
+
+    def hours_by_priority(self) -> Dict[str, float]:
+        c = self.columns
+        totals = np.bincount(c["priority"], weights=c["hours"], minlength=len(PRIORITIES))
+        return {name: float(h) for name, h in zip(PRIORITIES, totals) if h}
+
+    def hours_by_type_and_priority(self) -> Dict[str, Dict[str, float]]:
+        c = self.columns
+        cell = c["type"].astype(np.int32) * len(PRIORITIES) + c["priority"]
+        grid = np.bincount(cell, weights=c["hours"], minlength=len(TYPES) * len(PRIORITIES))
+        grid = grid.reshape(len(TYPES), len(PRIORITIES))
+        return {
+            t: {p: float(grid[i, j]) for j, p in enumerate(PRIORITIES) if grid[i, j]}
+            for i, t in enumerate(TYPES) if grid[i].any()
+        }
+
+    def fan_in_distribution(self) -> Dict[int, int]:
+        """{number of dependencies: number of tasks}"""
+        counts = np.bincount(self.columns["fan_in"])
+        return {k: int(v) for k, v in enumerate(counts) if v}
+
+    def fan_out_distribution(self) -> Dict[int, int]:
+        """{number of dependent tasks: number of tasks}"""
+        counts = np.bincount(self.columns["fan_out"])
+        return {k: int(v) for k, v in enumerate(counts) if v}
+
+    def estimate_outliers(self, k: float = 1.5, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Tasks whose estimate is outside [Q1 - k*IQR, Q3 + k*IQR] for their type.
+
+        Returns the most extreme `limit` outliers, largest deviation first.
+        """
+        c = self.columns
+        hours, types = c["hours"], c["type"]
+        lo = np.full(len(TYPES), -np.inf, dtype=np.float32)
+        hi = np.full(len(TYPES), np.inf, dtype=np.float32)
+        for code in np.unique(types):
+            q1, q3 = np.percentile(hours[types == code], [25, 75])
+            lo[code], hi[code] = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+        deviation = np.maximum(lo[types] - hours, hours - hi[types])
+        idx = np.flatnonzero(deviation > 0)
+        idx = idx[np.argsort(-deviation[idx], kind="stable")][:limit]
+        return [
+            {
+                "project": self.projects[c["project"][i]],
+                "task_id": str(c["task_id"][i]),
+                "type": TYPES[types[i]],
+                "estimate_hours": float(hours[i]),
+                "type_range": (float(lo[types[i]]), float(hi[types[i]])),
+            }
+            for i in idx
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        c = self.columns
+        hours = c["hours"]
+        return {
+            "projects": len(self.projects),
+            "tasks": int(len(hours)),
+            "total_hours": float(hours.sum(dtype=np.float64)),
+            "hours_p50": float(np.percentile(hours, 50)) if len(hours) else 0.0,
+            "hours_p95": float(np.percentile(hours, 95)) if len(hours) else 0.0,
+            "hours_by_type": self.hours_by_type(),
+            "hours_by_priority": self.hours_by_priority(),
+            "fan_in": self.fan_in_distribution(),
+            "fan_out": self.fan_out_distribution(),
+        }
+
+    # Persistence
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, projects=np.asarray(self.projects, dtype=str), **self.columns)
+
+    @classmethod
+    def load(cls, path: str) -> "BacklogStore":
+        store = cls()
+        with np.load(path) as data:
+            store.projects = [str(p) for p in data["projects"]]
+            store._columns = {c: data[c] for c in _COLUMNS}
+        store._chunks = [store._columns]
+        return store
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Summarize many TASKS.csv backlogs.")
+    parser.add_argument("root", help="Directory searched recursively for TASKS.csv files")
+    parser.add_argument("--save", help="Write the columnar store to this .npz file")
+    parser.add_argument("--outliers", type=int, default=10, help="Estimate outliers to list (default: 10)")
+    args = parser.parse_args(argv)
+
+    store = BacklogStore()
+    files = store.add_csv_files(str(p) for p in sorted(Path(args.root).rglob("TASKS.csv")))
+    print(f"Loaded {len(store)} tasks from {files} backlogs")
+    print(json.dumps(store.summary(), indent=2))
+    for o in store.estimate_outliers(limit=args.outliers):
+        print(f"  outlier: {o['project']} {o['task_id']} ({o['type']}) {o['estimate_hours']}h")
+    if args.save:
+        store.save(args.save)
+
+
+if __name__ == "__main__":
+    main()
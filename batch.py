@@ -0,0 +1,252 @@
+# batch.py
+"""
+Batch planning: run many ideas through the pipeline with a bounded worker pool.
+
+Each finished plan is written to its own directory under the output root
+(PRD.md, MILESTONES.md, TASKS.csv, SCHEDULE.csv) as soon as it completes, and
+recorded in manifest.jsonl. Re-running the same batch skips ideas already done,
+so a crashed batch resumes where it stopped. Repeated ideas (same text and
+constraints) are planned once. Stage checkpoints are kept under <out>/runs/,
+so an idea that failed mid-pipeline resumes at its failed stage, and a plan
+that still had validation issues ("incomplete") at its first invalid stage.
+
+Usage:
+    python batch.py sample_idea_prompts.txt --constraint "Solo developer" --workers 8
+"""
+from __future__ import annotations
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import pipeline
+from checkpoints import STAGES
+
+MANIFEST_NAME = "manifest.jsonl"
+RUNS_DIR_NAME = "runs"
+
+
+@dataclass
+class BatchReport:
+    completed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    stage_seconds: Dict[str, List[float]] = field(default_factory=lambda: {s: [] for s in STAGES})
+    failures: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def plans_per_minute(self) -> float:
+        return self.completed / self.elapsed_seconds * 60 if self.elapsed_seconds else 0.0
+
+    def stage_percentiles(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+            for stage, values in self.stage_seconds.items()
+        }
+
+    def summary(self) -> str:
+        lines = [
+            f"completed={self.completed} skipped={self.skipped} failed={self.failed} "
+            f"elapsed={self.elapsed_seconds:.1f}s throughput={self.plans_per_minute:.1f} plans/min",
+        ]
+        for stage, p in self.stage_percentiles().items():
+            lines.append(f"  {stage:<11} p50={p['p50']:.2f}s p95={p['p95']:.2f}s")
+        return "\n".join(lines)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def read_ideas(path: str) -> Iterator[str]:
+    """Yield one idea per non-empty line of a text file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line.strip()
+
+
+def idea_key(idea: str, constraints: List[str]) -> str:
+    payload = json.dumps([idea.strip(), constraints], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _slug(text: str, max_len: int = 40) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:max_len].rstrip("-") or "idea"
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def load_manifest(out_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Return the latest manifest record per idea key."""
+    records: Dict[str, Dict[str, Any]] = {}
+    path = Path(out_dir) / MANIFEST_NAME
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line after a crash
+                records[record["key"]] = record
+    return records
+
+
+def write_plan(plan_dir: Path, result: Dict[str, Any]) -> None:
+    plan_dir.mkdir(parents=True, exist_ok=True)
+    _write_atomic(plan_dir / "PRD.md", result["prd_md"])
+    _write_atomic(plan_dir / "MILESTONES.md", result["milestones_md"])
+    _write_atomic(plan_dir / "TASKS.csv", result["tasks_csv"])
+    if result.get("schedule_csv"):
+        _write_atomic(plan_dir / "SCHEDULE.csv", result["schedule_csv"])
+
+
+def run_batch(
+    ideas: Iterable[str],
+    constraints: List[str],
+    out_dir: str = "output/batch",
+    workers: int = 4,
+    max_attempts: int = 3,
+    use_cache: bool = True,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> BatchReport:
+    """
+    Plan every idea with a pool of `workers` threads and stream results to disk.
+
+    Args:
+        ideas: Iterable of idea strings (consumed lazily, so it can be huge)
+        constraints: Constraints shared by every idea
+        out_dir: Root directory for per-idea plan folders and the manifest
+        workers: Number of pipelines running at once
+        max_attempts: Passed to run_pipeline
+        use_cache: Passed to run_pipeline
+        on_result: Optional callback with each manifest record as it is written
+
+    Returns:
+        BatchReport with counts, throughput and per-stage latencies
+    """
+    root = Path(out_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    done = {k for k, r in load_manifest(out_dir).items() if r.get("status") == "done"}
+    report = BatchReport()
+    start = time.perf_counter()
+
+    def plan(idea: str, key: str) -> Dict[str, Any]:
+        return pipeline.run_pipeline(
+            idea,
+            constraints,
+            max_attempts=max_attempts,
+            use_cache=use_cache,
+            run_id=key,
+            run_dir=str(root / RUNS_DIR_NAME),
+        )
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(root / MANIFEST_NAME, "a", encoding="utf-8") as manifest:
+        pending: Dict[Future, Dict[str, Any]] = {}
+
+        def record(entry: Dict[str, Any]) -> None:
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            os.fsync(manifest.fileno())
+            if on_result:
+                on_result(entry)
+
+        def drain(block_until: int) -> None:
+            # Wait until at most `block_until` futures are still running
+            while len(pending) > block_until:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    entry = pending.pop(fut)
+                    try:
+                        result = fut.result()
+                        write_plan(root / entry["dir"], result)
+                    except Exception as e:
+                        report.failed += 1
+                        entry.update(status="failed", error=f"{type(e).__name__}: {e}")
+                        report.failures.append(entry)
+                        record(entry)
+                        continue
+                    report.completed += 1
+                    reused = set(result.get("reused_stages", []))
+                    for stage, seconds in result["stage_seconds"].items():
+                        # Reused checkpoints take ~0s and would skew the latency percentiles
+                        if stage not in reused:
+                            report.stage_seconds.setdefault(stage, []).append(seconds)
+                    issues = sum(len(v) for v in result["issues"].values())
+                    entry.update(
+                        # A best-effort plan is written but retried on the next run
+                        status="done" if not issues else "incomplete",
+                        issues=issues,
+                        duration_seconds=result["duration_seconds"],
+                        stage_seconds=result["stage_seconds"],
+                    )
+                    record(entry)
+
+        for index, idea in enumerate(ideas):
+            key = idea_key(idea, constraints)
+            if key in done:
+                report.skipped += 1
+                continue
+            # A repeat of an idea already in flight would share its run_id and checkpoints
+            done.add(key)
+            entry = {"index": index, "key": key, "idea": idea, "dir": f"{index:05d}-{_slug(idea)}"}
+            pending[pool.submit(plan, idea, key)] = entry
+            # Keep a bounded number of ideas queued so huge inputs stream through
+            drain(block_until=workers * 2)
+        drain(block_until=0)
+
+    report.elapsed_seconds = time.perf_counter() - start
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run many project ideas through the planning pipeline.")
+    parser.add_argument("ideas_file", help="Text file with one idea per line")
+    parser.add_argument("--constraint", action="append", default=[], help="Shared constraint (repeatable)")
+    parser.add_argument("--out", default="output/batch", help="Output directory (default: output/batch)")
+    parser.add_argument("--workers", type=int, default=4, help="Pipelines to run at once (default: 4)")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Revise attempts per stage (default: 3)")
+    parser.add_argument("--no-cache", action="store_true", help="Skip the LLM response cache")
+    args = parser.parse_args(argv)
+
+    def progress(entry: Dict[str, Any]) -> None:
+        mark = "✅" if entry["status"] == "done" else "❌"
+        print(f"{mark} [{entry['index']}] {entry['dir']}" + (f" — {entry['error']}" if "error" in entry else ""))
+
+    report = run_batch(
+        read_ideas(args.ideas_file),
+        args.constraint,
+        out_dir=args.out,
+        workers=args.workers,
+        max_attempts=args.max_attempts,
+        use_cache=not args.no_cache,
+        on_result=progress,
+    )
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# bench_backlog_store.py
+"""
+Benchmark: ingest and summarize ~10^6 synthetic tasks with BacklogStore,
+against the row-by-row approach (TaskItem objects -> tasks_to_rows -> dict
+accumulation) on a sample of the same backlogs.
+
+Usage:
+    python benchmarks/bench_backlog_store.py [--projects 25000] [--tasks 40]
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from backlog_store import BacklogStore
+from schemas import TasksDoc
+from tools import tasks_to_rows
+
+TYPES = ["backend", "frontend", "data", "ml", "infra", "docs", "testing"]
+
+
+def synthetic_backlog(rng: random.Random, n: int):
+    ids = [f"T{i:03d}" for i in range(1, n + 1)]
+    return (
+        ids,
+        [rng.choice(TYPES) for _ in ids],
+        [rng.choice(["P0", "P1", "P2"]) for _ in ids],
+        [rng.choice([1, 2, 3, 4, 6, 8, 12, 16]) for _ in ids],
+        [rng.sample(ids[:i], min(i, rng.randint(0, 3))) for i in range(n)],
+    )
+
+
+def row_by_row(docs):
+    hours_by_type = defaultdict(float)
+    fan_in = defaultdict(int)
+    for tdoc in docs:
+        for row in tasks_to_rows(tdoc):
+            hours_by_type[row["type"]] += row["estimate_hours"]
+            fan_in[len([d for d in row["depends_on"].split(";") if d])] += 1
+    return hours_by_type, fan_in
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=25000)
+    parser.add_argument("--tasks", type=int, default=40)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    backlogs = [synthetic_backlog(rng, args.tasks) for _ in range(args.projects)]
+    total = args.projects * args.tasks
+
+    store = BacklogStore()
+    t0 = time.perf_counter()
+    for i, (ids, types, priorities, hours, deps) in enumerate(backlogs):
+        store.add_rows(f"project-{i}", ids, types, priorities, hours, deps)
+    ingest = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    summary = store.summary()
+    outliers = store.estimate_outliers()
+    grid = store.hours_by_type_and_priority()
+    summarize = time.perf_counter() - t0
+    print(f"BacklogStore: ingest {total:,} tasks {ingest:.2f}s, summarize {summarize * 1000:.0f} ms "
+          f"({summary['total_hours']:,.0f}h, {len(outliers)} outliers, {len(grid)} types)")
+
+    # Row-by-row baseline on a 5% sample, extrapolated
+    sample = backlogs[: max(1, args.projects // 20)]
+    docs = [
+        TasksDoc.model_validate({"title": "x", "tasks": [
+            {"task_id": t, "title": t, "type": ty, "priority": p, "estimate_hours": h, "depends_on": d,
+             "acceptance_criteria": ["ok"]}
+            for t, ty, p, h, d in zip(*b)
+        ]})
+        for b in sample
+    ]
+    t0 = time.perf_counter()
+    row_by_row(docs)
+    baseline = (time.perf_counter() - t0) * len(backlogs) / len(sample)
+    print(f"row-by-row aggregation (extrapolated from {len(sample)} backlogs): {baseline:.2f}s per summary")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# bench_client_pool.py
+"""
+Micro-benchmark: per-call setup cost of a fresh OpenAI client vs the pooled
+client from llm.get_client(), measured against a local stub HTTP server.
+
+Usage:
+    python benchmarks/bench_client_pool.py [--calls 200]
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import time
+
+from openai import OpenAI
+
+from benchmarks.stub_server import StubLLMServer
+from cache import ResponseCache, set_cache
+from llm import call_llm_json, get_client, close_clients
+
+
+def bench(label: str, calls: int, make_client, server: StubLLMServer) -> float:
+    connections_before = server.connections
+    start = time.perf_counter()
+    for _ in range(calls):
+        call_llm_json("system", "user", client=make_client(), use_cache=False)
+    elapsed = time.perf_counter() - start
+    per_call_ms = elapsed / calls * 1000
+    opened = server.connections - connections_before
+    print(f"{label:<22} {per_call_ms:8.3f} ms/call   connections opened: {opened}")
+    return per_call_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    # Measure the transport only: keep responses out of the on-disk cache
+    set_cache(ResponseCache(path=None))
+
+    with StubLLMServer() as server:
+        def fresh_client():
+            return OpenAI(api_key="bench", base_url=server.base_url)
+
+        def pooled_client():
+            return get_client(api_key="bench", base_url=server.base_url)
+
+        # Warm up imports / server threads
+        call_llm_json("system", "user", client=pooled_client(), use_cache=False)
+
+        print(f"{args.calls} calls against {server.base_url}")
+        before = bench("new client per call", args.calls, fresh_client, server)
+        after = bench("pooled client", args.calls, pooled_client, server)
+        print(f"setup overhead saved:  {before - after:8.3f} ms/call ({before / after:.1f}x)")
+
+    close_clients()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# bench_event_log.py
+"""
+Micro-benchmark: events/second for the old per-event open/append logger vs
+the buffered JsonlEventLogger, single-threaded and from several threads.
+
+Usage:
+    python benchmarks/bench_event_log.py [--events 20000] [--threads 8]
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from event_log import JsonlEventLogger
+
+
+def legacy_append(event: dict, log_path: str) -> None:
+    # What tools.append_jsonl_log did before: mkdir + open/append per event
+    Path("output").mkdir(parents=True, exist_ok=True)
+    with open(log_path, "a") as f:
+        f.write(f"{json.dumps(event)}\n")
+
+
+def make_event(i: int) -> dict:
+    return {"event": "stage_done", "stage": "tasks", "attempt": i % 3, "seconds": 1.234, "issues": []}
+
+
+def bench(label: str, events: int, threads: int, log) -> float:
+    start = time.perf_counter()
+    if threads == 1:
+        for i in range(events):
+            log(make_event(i))
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda i: log(make_event(i)), range(events)))
+    elapsed = time.perf_counter() - start
+    rate = events / elapsed
+    print(f"{label:<34} {rate:12,.0f} events/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for threads in (1, args.threads):
+            legacy_path = f"{tmp}/legacy-{threads}.jsonl"
+            before = bench(f"append_jsonl_log (old), {threads} thr", args.events, threads,
+                           lambda e: legacy_append(e, legacy_path))
+
+            logger = JsonlEventLogger(f"{tmp}/buffered-{threads}.jsonl")
+
+            def buffered(e):
+                logger.log(e)
+
+            after = bench(f"JsonlEventLogger, {threads} thr", args.events, threads, buffered)
+            t0 = time.perf_counter()
+            logger.close()
+            print(f"{'final flush':<34} {(time.perf_counter() - t0) * 1000:12.1f} ms")
+            print(f"{'speedup':<34} {after / before:12.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
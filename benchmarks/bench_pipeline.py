@@ -0,0 +1,196 @@
+# bench_pipeline.py
+"""
+Benchmark: the full pipeline and its CPU-bound pieces, offline.
+
+Every LLM call goes to the deterministic StubLLM (see stub_llm.py), so no
+API key or network is needed and runs are comparable across machines of the
+same kind. Timed cases:
+
+- pipeline: run_pipeline end to end (sync, and with tasks_fanout) at several
+  defect rates, so the revise loops run, with best-of-3 tasks drafts, and
+  with truncated tasks drafts that have to be continued
+- revise_loop: _revise_loop over a defective tasks draft (patch and full mode)
+- validators, renderers, tasks CSV and critical path over synthetic documents
+  of increasing size
+
+Results (mean/p50/p95 in ms per case) are printed and written as JSON.
+Compare against a saved baseline to catch regressions:
+
+Usage:
+    python benchmarks/bench_pipeline.py --out .cache/bench.json
+    python benchmarks/bench_pipeline.py --compare .cache/bench.json [--threshold 0.2]
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+import pipeline
+from cache import ResponseCache, set_cache
+from llm import use_backend
+from repairs import repair_tasks
+from schemas import GoalInterpretation, MilestonesDoc, PRD, TasksDoc
+from scheduling import critical_path
+from stub_llm import StubLLM, make_milestones, make_prd, make_tasks
+from tools import render_milestones_md, render_prd_md
+from validators import validate_milestones, validate_prd, validate_tasks
+
+SIZES = [25, 100, 1000, 10000]
+
+
+def timed(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()  # warm-up
+    samples: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "repeat": repeat,
+    }
+
+
+def bench_pipeline(results: Dict[str, dict], repeat: int, latency: float, run_dir: str) -> None:
+    for defect_rate in (0.0, 0.05, 0.2):
+        for fanout in (False, True):
+            stub = StubLLM(latency=latency, defect_rate=defect_rate)
+            name = f"pipeline/{'fanout' if fanout else 'single'}/defects={defect_rate}"
+            with use_backend(stub):
+                results[name] = timed(lambda: pipeline.run_pipeline(
+                    "Habit tracker for remote teams", ["Solo developer"],
+                    use_cache=False, tasks_fanout=fanout, run_dir=run_dir,
+                ), repeat)
+            results[name]["llm_calls"] = round(sum(stub.calls.values()) / (repeat + 1), 1)
+    # Best-of-N tasks drafts against jittery latency: the stage waits for the
+    # fastest valid candidate instead of a straggler or a revise round
+    for n in (1, 3):
+        stub = StubLLM(latency=latency, jitter=latency, defect_rate=0.01)
+        name = f"pipeline/candidates={n}/defects=0.01"
+        with use_backend(stub):
+            results[name] = timed(lambda: pipeline.run_pipeline(
+                "Habit tracker for remote teams", ["Solo developer"],
+                use_cache=False, candidates={"tasks": n}, run_dir=run_dir,
+            ), repeat)
+        results[name]["llm_calls"] = round(sum(stub.calls.values()) / (repeat + 1), 1)
+    # Tasks drafts cut off at the token limit: salvaged and continued, not re-generated
+    stub = StubLLM(latency=latency, truncate_rate=0.5)
+    name = "pipeline/single/truncated=0.5"
+    with use_backend(stub):
+        results[name] = timed(lambda: pipeline.run_pipeline(
+            "Habit tracker for remote teams", ["Solo developer"], use_cache=False, run_dir=run_dir,
+        ), repeat)
+    results[name]["llm_calls"] = round(sum(stub.calls.values()) / (repeat + 1), 1)
+
+
+def bench_revise_loop(results: Dict[str, dict], repeat: int) -> None:
+    draft = make_tasks("Bench", 40, random.Random(0), defect_rate=0.3)
+    for mode in pipeline.REVISION_MODES:
+        stub = StubLLM()
+        with use_backend(stub):
+            call = lambda prompt, attempt, response_format: pipeline.call_llm_json(
+                pipeline.SYSTEM, prompt, use_cache=False, response_format=response_format
+            )
+            results[f"revise_loop/{mode}"] = timed(lambda: pipeline._revise_loop(
+                TasksDoc, draft, max_attempts=3, call=call, revision_mode=mode,
+            ), repeat)
+
+
+def bench_documents(results: Dict[str, dict], repeat: int, sizes: List[int]) -> None:
+    rng = random.Random(0)
+    prd = PRD.model_validate(make_prd("Bench", rng))
+    results["validate_prd"] = timed(lambda: validate_prd(prd), repeat)
+    results["render_prd_md"] = timed(lambda: render_prd_md(prd), repeat)
+    for n in sizes:
+        mdoc = MilestonesDoc.model_validate(make_milestones("Bench", max(1, n // 10), rng))
+        tdoc = TasksDoc.model_validate(make_tasks("Bench", n, rng))
+        tdict = tdoc.model_dump()
+        reps = max(3, repeat * 25 // n) if n > 25 else repeat
+        results[f"validate_milestones/{n // 10}"] = timed(lambda: validate_milestones(mdoc), reps)
+        results[f"render_milestones_md/{n // 10}"] = timed(lambda: render_milestones_md(mdoc), reps)
+        results[f"parse_tasks/{n}"] = timed(lambda: TasksDoc.model_validate(tdict), reps)
+        results[f"validate_tasks/{n}"] = timed(lambda: validate_tasks(tdoc), reps)
+        results[f"repair_tasks/{n}"] = timed(lambda: repair_tasks(tdoc), reps)
+        results[f"critical_path/{n}"] = timed(lambda: critical_path(tdoc), reps)
+        results[f"build_result/{n}"] = timed(lambda: pipeline._build_result(
+            GoalInterpretation(title="Bench", one_liner="Bench"), prd, mdoc, tdoc,
+            {}, 0.0, {}, _NullStore(), {},
+        ), reps)
+
+
+class _NullStore:
+    run_id = "bench"
+    reused: List[str] = []
+
+
+def compare(results: Dict[str, dict], baseline_path: str, threshold: float) -> List[str]:
+    """Cases whose p50 got more than `threshold` (fraction) slower than the baseline."""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]
+    regressions = []
+    for name, r in results.items():
+        old = baseline.get(name)
+        if old and old["p50_ms"] > 0 and r["p50_ms"] > old["p50_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p50 {old['p50_ms']:.3f} -> {r['p50_ms']:.3f} ms "
+                               f"(+{(r['p50_ms'] / old['p50_ms'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per case (default: 20)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub latency per LLM call in seconds")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Task counts for document benchmarks")
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON from a previous --out; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50 slowdown (default: 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    set_cache(ResponseCache(path=None))
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as run_dir:
+        bench_pipeline(results, args.repeat, args.latency, run_dir)
+    bench_revise_loop(results, args.repeat)
+    bench_documents(results, args.repeat, args.sizes)
+
+    for name, r in results.items():
+        print(f"{name:<40} mean {r['mean_ms']:>10.3f} ms  p50 {r['p50_ms']:>10.3f} ms  p95 {r['p95_ms']:>10.3f} ms")
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps({
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+                "latency": args.latency,
+            },
+            "results": results,
+        }, indent=2), encoding="utf-8")
+        print(f"Wrote {args.out}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
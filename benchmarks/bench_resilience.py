@@ -0,0 +1,80 @@
+# bench_resilience.py
+"""
+Benchmark: tail latency and failures of call_llm_json against a faulty stub
+server, with the resilience layer off (no retries, hedging or deadline) and
+on (see resilience.py).
+
+The server answers after `--delay` seconds, stalls a `--stall-rate` fraction
+of requests for `--stall` seconds and fails an `--error-rate` fraction with
+HTTP 500.
+
+Usage:
+    python benchmarks/bench_resilience.py [--calls 400] [--concurrency 8]
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from benchmarks.stub_server import StubLLMServer
+from cache import ResponseCache, set_cache
+from llm import call_llm_json, close_clients, get_client
+from resilience import Resilience, ResiliencePolicy, use_resilience
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def bench(label: str, resilience: Resilience, args: argparse.Namespace) -> None:
+    with StubLLMServer(delay=args.delay, stall=args.stall, stall_rate=args.stall_rate,
+                       error_rate=args.error_rate) as server, use_resilience(resilience):
+        client = get_client(api_key="bench", base_url=server.base_url, request_timeout=args.stall * 2)
+
+        def one(i: int) -> Optional[float]:
+            t0 = time.perf_counter()
+            try:
+                call_llm_json("system", f"user {i}", client=client, use_cache=False)
+            except Exception:
+                return None
+            return time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(one, range(args.calls)))
+        latencies = sorted(s * 1000 for s in outcomes if s is not None)
+        failed = outcomes.count(None)
+        print(f"{label:<12} p50 {percentile(latencies, 0.5):8.1f} ms  p95 {percentile(latencies, 0.95):8.1f} ms  "
+              f"p99 {percentile(latencies, 0.99):8.1f} ms  failed {failed:>4}  requests {server.requests}")
+    close_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.02, help="Normal response time in seconds")
+    parser.add_argument("--stall", type=float, default=1.0, help="Response time of stalled requests")
+    parser.add_argument("--stall-rate", type=float, default=0.03)
+    parser.add_argument("--error-rate", type=float, default=0.03)
+    args = parser.parse_args()
+
+    # Measure the transport only: keep responses out of the on-disk cache
+    set_cache(ResponseCache(path=None))
+
+    print(f"{args.calls} calls, {args.concurrency} at a time, "
+          f"{args.stall_rate:.0%} stalled for {args.stall}s, {args.error_rate:.0%} HTTP 500")
+    bench("off", Resilience(ResiliencePolicy(retries=0, hedge=False, breaker_failures=0)), args)
+    bench("on", Resilience(ResiliencePolicy(
+        retries=2, backoff_base=0.01, hedge=True, hedge_min_samples=20, hedge_min_delay=0.0,
+        deadline=args.stall * 2, breaker_failures=0,
+    )), args)
+
+
+if __name__ == "__main__":
+    main()
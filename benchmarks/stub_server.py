@@ -0,0 +1,217 @@
+# stub_server.py
+"""
+Minimal OpenAI-compatible HTTP server for local benchmarks and tests.
+
+Serves POST /v1/chat/completions with a canned JSON completion so the real
+OpenAI client (and its connection pool) can be exercised without network
+access or an API key. Requests with "stream": true get the content back as
+server-sent events, `chunk_size` characters per delta.
+
+Faults can be injected to exercise retries, hedging and the circuit breaker
+(see resilience.py): `faults` scripts the first requests, in order, and
+`error_rate` / `stall_rate` hit random later ones. Fault kinds:
+
+- "error": HTTP 500          - "rate_limit": HTTP 429
+- "bad_request": HTTP 400    - "bad_json": a completion that is not JSON
+- "truncated": the first half of the completion, finish_reason "length"
+- "stall": answer normally, but only after `stall` seconds
+- None: no fault
+"""
+from __future__ import annotations
+
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, Optional
+
+FAULT_STATUS = {"error": 500, "rate_limit": 429, "bad_request": 400}
+
+
+class StubLLMServer:
+    """
+    Threaded stub server. Use as a context manager:
+
+        with StubLLMServer(content='{"ok": true}') as server:
+            client = OpenAI(api_key="test", base_url=server.base_url)
+    """
+
+    def __init__(
+        self,
+        content: str = '{"ok": true}',
+        delay: float = 0.0,
+        port: int = 0,
+        chunk_size: int = 16,
+        chunk_delay: float = 0.0,
+        faults: Optional[Iterable[Optional[str]]] = None,
+        error_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall: float = 5.0,
+        seed: int = 0,
+    ):
+        self.content = content
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.faults = list(faults or [])
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.chunks_sent = 0
+        self.requests = 0
+        self.connections = 0
+        self.injected: list = []  # fault kind per request, in arrival order
+        self.last_body: Optional[dict] = None  # most recent request body, for tests
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                server.last_body = body
+                fault = server.next_fault()
+                if server.delay:
+                    time.sleep(server.delay)
+                if fault == "stall":
+                    time.sleep(server.stall)
+                if fault in FAULT_STATUS:
+                    self._send_json(FAULT_STATUS[fault], {"error": {"message": f"Injected {fault}", "type": fault}})
+                elif fault == "bad_json":
+                    self._send_json(200, server.completion(body, content="Sorry, here is your plan: {"))
+                elif body.get("stream"):
+                    self._send_stream(body, truncated=fault == "truncated")
+                else:
+                    self._send_json(200, server.completion(body, truncated=fault == "truncated"))
+
+            def _send_stream(self, body: dict, truncated: bool = False) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for event in server.stream_events(body, truncated):
+                        data = f"data: {event}\n\n".encode("utf-8")
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                        self.wfile.flush()
+                        with server._lock:
+                            server.chunks_sent += 1
+                        if server.chunk_delay:
+                            time.sleep(server.chunk_delay)
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # client abandoned the stream
+
+            def _send_json(self, status: int, payload: dict) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # client gave up (timeout or hedge)
+
+        return Handler
+
+    def next_fault(self) -> Optional[str]:
+        """Count a request and pick its fault: scripted first, then random."""
+        with self._lock:
+            self.requests += 1
+            if self.faults:
+                fault = self.faults.pop(0)
+            else:
+                r = self._rng.random()
+                fault = "error" if r < self.error_rate else "stall" if r < self.error_rate + self.stall_rate else None
+            self.injected.append(fault)
+            return fault
+
+    def _reply(self, truncated: bool) -> tuple:
+        """(content, finish_reason): the canned content, or its first half as if cut at the token limit."""
+        if truncated:
+            return self.content[:len(self.content) // 2], "length"
+        return self.content, "stop"
+
+    def completion(self, body: dict, content: Optional[str] = None, truncated: bool = False) -> dict:
+        """Build a chat.completion payload around the canned content."""
+        reply, finish_reason = self._reply(truncated)
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply if content is None else content},
+                "finish_reason": finish_reason,
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+
+    def stream_events(self, body: dict, truncated: bool = False):
+        """Yield the SSE data lines of a chat.completion.chunk stream."""
+        content, finish_reason = self._reply(truncated)
+
+        def chunk(delta: dict, finish_reason=None) -> str:
+            return json.dumps({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            })
+
+        yield chunk({"role": "assistant", "content": ""})
+        for i in range(0, len(content), self.chunk_size):
+            yield chunk({"content": content[i:i + self.chunk_size]})
+        yield chunk({}, finish_reason=finish_reason)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield json.dumps({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            })
+        yield "[DONE]"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
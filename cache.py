@@ -0,0 +1,215 @@
+# cache.py
+"""
+Content-addressed cache for LLM JSON responses.
+
+Two tiers:
+- an in-memory LRU (fast, per process)
+- a persistent SQLite file (shared across runs / processes)
+
+Entries are keyed by a SHA-256 of the normalized (system_prompt, user_prompt,
+model, response_format) request plus the backend that answered it, and expire
+after a TTL. The disk tier is
+trimmed to a maximum number of entries, least recently used first. Memory
+hits also refresh the disk row's access time (at most once per
+DISK_TOUCH_SECONDS per entry), so entries kept hot in memory are not the
+first to be trimmed from disk.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite3")
+DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+DEFAULT_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+DEFAULT_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "10000"))
+# Min seconds between disk access-time updates for an entry served from memory
+DISK_TOUCH_SECONDS = 60.0
+
+
+def normalize_prompt(text: str) -> str:
+    """Strip trailing whitespace per line and surrounding blank lines."""
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+def make_key(
+    system_prompt: str,
+    user_prompt: str,
+    model: str,
+    response_format: Optional[Dict[str, Any]] = None,
+    backend: str = "",
+) -> str:
+    """
+    Cache key for a request. `backend` identifies what answers it (see
+    llm.LLMBackend.cache_namespace); "" is the OpenAI API.
+    """
+    request = [normalize_prompt(system_prompt), normalize_prompt(user_prompt), model]
+    if response_format is not None:
+        request.append(response_format)
+    if backend:
+        request.append({"backend": backend})
+    payload = json.dumps(request, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + SQLite) cache of parsed JSON responses.
+
+    Args:
+        path: SQLite file for the persistent tier, or None for memory only
+        ttl_seconds: Entries older than this are treated as misses and evicted
+        max_memory_entries: Size of the in-memory LRU tier
+        max_disk_entries: Size cap of the persistent tier
+        clock: Time source (injectable for tests)
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        max_disk_entries: int = DEFAULT_DISK_ENTRIES,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        # key -> (created_at, disk accessed_at last written, value)
+        self._memory: "OrderedDict[str, tuple[float, float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, touched_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    if self._db is not None and now - touched_at >= DISK_TOUCH_SECONDS:
+                        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._memory[key] = (created_at, now, value)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value_text, created_at = row
+                    if now - created_at <= self.ttl_seconds:
+                        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        value = json.loads(value_text)
+                        self._remember(key, created_at, now, value)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return copy.deepcopy(value)
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = self.clock()
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, now, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                self._evict_disk(now)
+
+    def _remember(self, key: str, created_at: float, touched_at: float, value: Dict[str, Any]) -> None:
+        self._memory[key] = (created_at, touched_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            disk_entries = (
+                self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self._db is not None else 0
+            )
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Return the process-wide cache (created lazily at DEFAULT_CACHE_PATH)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def set_cache(cache: Optional[ResponseCache]) -> None:
+    """Replace the process-wide cache (e.g. a temp-dir cache in tests)."""
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = cache
@@ -0,0 +1,125 @@
+# checkpoints.py
+"""
+Stage-level checkpoints for run_pipeline.
+
+Each stage's validated output is stored as JSON under <root>/<run_id>/<stage>.json,
+together with a fingerprint of the inputs it was generated from:
+
+    idea + constraints -> goal -> prd -> milestones -> tasks (prd + milestones)
+
+Rerunning with the same run_id reuses a stage only if its checkpoint parses and
+its input fingerprint still matches, so a crashed run resumes at the first
+missing stage and an edited input only regenerates the stages downstream of it.
+A checkpoint saved with validation issues (a best-effort result) or failing
+the current validators is invalid: it and every later stage are regenerated,
+bypassing the response cache.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from schemas import GoalInterpretation, PRD, MilestonesDoc, TasksDoc
+from validators import validate_milestones, validate_prd, validate_tasks
+
+STAGES = ("goal", "prd", "milestones", "tasks")
+STAGE_MODELS: Dict[str, Type[BaseModel]] = {
+    "goal": GoalInterpretation,
+    "prd": PRD,
+    "milestones": MilestonesDoc,
+    "tasks": TasksDoc,
+}
+STAGE_VALIDATORS = {"prd": validate_prd, "milestones": validate_milestones, "tasks": validate_tasks}
+DEFAULT_RUN_DIR = "output/runs"
+
+
+def fingerprint(*inputs: Any) -> str:
+    """Stable hash of stage inputs (pydantic models, strings, lists...)."""
+    normalized = [x.model_dump() if isinstance(x, BaseModel) else x for x in inputs]
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RunStore:
+    """
+    Checkpoint store for one pipeline run.
+
+    Args:
+        run_id: Identifier of the run, or None to disable checkpointing
+        root: Directory holding one sub-directory per run
+        resume_from: Stage to regenerate from, ignoring its checkpoint and
+            every later one (e.g. "milestones")
+    """
+
+    def __init__(self, run_id: Optional[str], root: str = DEFAULT_RUN_DIR, resume_from: Optional[str] = None):
+        if resume_from is not None and resume_from not in STAGES:
+            raise ValueError(f"resume_from must be one of {STAGES}, got {resume_from!r}.")
+        if resume_from is not None and run_id is None:
+            raise ValueError("resume_from requires a run_id.")
+        self.run_id = run_id
+        self.dir = Path(root) / run_id if run_id else None
+        self.resume_from = resume_from
+        self.reused: List[str] = []
+        self.invalid: List[str] = []  # stages whose checkpoint failed validation
+
+    def path(self, stage: str) -> Path:
+        return self.dir / f"{stage}.json"
+
+    def load(self, stage: str, inputs_fingerprint: str) -> Optional[Tuple[BaseModel, List[str]]]:
+        """
+        Return (document, issues) for a reusable stage, or None if it must run.
+
+        A checkpoint is reusable when it parses, was generated from the same
+        inputs, passed validation, and the stage is before resume_from and
+        after no invalid checkpoint.
+        """
+        if self.dir is None:
+            return None
+        if self.resume_from is not None and STAGES.index(stage) >= STAGES.index(self.resume_from):
+            return None
+        if self.invalid and STAGES.index(stage) > STAGES.index(self.invalid[0]):
+            return None
+        try:
+            with open(self.path(stage), encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("inputs_fingerprint") != inputs_fingerprint:
+                return None
+            doc = STAGE_MODELS[stage].model_validate(payload["data"])
+        except (OSError, ValueError, KeyError, ValidationError):
+            return None
+        validate = STAGE_VALIDATORS.get(stage)
+        if payload.get("issues") or (validate is not None and validate(doc)):
+            self.invalid.append(stage)
+            return None
+        self.reused.append(stage)
+        return doc, []
+
+    def regenerating(self) -> bool:
+        """
+        Whether the run is past an invalid checkpoint. Its stages are then
+        regenerated without the response cache, which would only replay the
+        replies that produced the invalid result.
+        """
+        return bool(self.invalid)
+
+    def save(self, stage: str, doc: BaseModel, issues: List[str], inputs_fingerprint: str) -> None:
+        if self.dir is None:
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "stage": stage,
+            "saved_at": time.time(),
+            "inputs_fingerprint": inputs_fingerprint,
+            "issues": issues,
+            "data": doc.model_dump(),
+        }
+        tmp = self.path(stage).with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp, self.path(stage))
@@ -0,0 +1,268 @@
+# event_log.py
+"""
+Buffered JSONL event logger.
+
+Events are serialized when logged and kept in memory; a background thread
+writes them out in batches every `flush_interval` seconds (or as soon as
+`max_buffer` events are pending). Each batch is written with one O_APPEND
+write while holding an exclusive lock on "<path>.lock", so lines from
+concurrent threads and processes never interleave.
+
+The log rotates when it grows past `max_bytes` or its first write is older
+than `rotate_seconds`: events.jsonl -> events.jsonl.1 -> ... -> .<backup_count>,
+optionally gzip-compressed (events.jsonl.1.gz). The time of the first write is
+kept in the lock file, so events are written exactly as logged.
+"""
+from __future__ import annotations
+
+import atexit
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: O_APPEND plus the in-process lock only
+    fcntl = None
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class JsonlEventLogger:
+    """
+    Append-only JSONL logger with batching and rotation.
+
+    Args:
+        path: Log file path (parent directories are created once)
+        flush_interval: Seconds between background flushes
+        max_buffer: Pending events that trigger an immediate flush
+        max_bytes: Rotate once the file would exceed this size (0 disables)
+        rotate_seconds: Rotate once the file's first event is this old (None disables)
+        backup_count: Rotated files to keep
+        compress: Gzip rotated files
+        clock: Time source for age-based rotation
+    """
+
+    def __init__(
+        self,
+        path: str = "events.jsonl",
+        flush_interval: float = 1.0,
+        max_buffer: int = 1000,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        rotate_seconds: Optional[float] = None,
+        backup_count: int = 5,
+        compress: bool = False,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.compress = compress
+        self.clock = clock
+        self.written = 0
+        self.rotations = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._buffer: List[str] = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._inode: Optional[int] = None
+        self._lock_fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self._closed = False
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"event-log:{self.path.name}", daemon=True)
+        self._thread.start()
+
+    def log(self, event: Dict[str, Any]) -> None:
+        """Queue one event."""
+        if self._closed:
+            raise ValueError(f"Event logger for {self.path} is closed.")
+        line = json.dumps(event, default=str) + "\n"
+        with self._buffer_lock:
+            self._buffer.append(line)
+            full = len(self._buffer) >= self.max_buffer
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write every pending event to disk."""
+        with self._write_lock:
+            with self._buffer_lock:
+                lines, self._buffer = self._buffer, []
+            if not lines:
+                return
+            data = "".join(lines).encode("utf-8")
+            self._lock()
+            try:
+                self._ensure_open()
+                if self._should_rotate(len(data)):
+                    self._rotate()
+                    self._ensure_open()
+                if os.fstat(self._fd).st_size == 0:
+                    self._set_started_at(self.clock())
+                self._write_all(data)
+            except OSError:
+                # Keep the batch so the next flush retries it
+                with self._buffer_lock:
+                    self._buffer[:0] = lines
+                raise
+            finally:
+                self._unlock()
+            self.written += len(lines)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        os.close(self._lock_fd)
+
+    def __enter__(self) -> "JsonlEventLogger":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                pass  # batch stays buffered and is retried on the next tick
+
+    def _lock(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+
+    def _unlock(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _ensure_open(self) -> None:
+        # Another process may have rotated the file since we opened it
+        try:
+            current = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            current = None
+        if self._fd is not None and current == self._inode:
+            return
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._inode = os.fstat(self._fd).st_ino
+
+    def _started_at(self) -> float:
+        # First-write time of the current file, shared with other processes
+        # through the lock file; a file without one counts from now
+        os.lseek(self._lock_fd, 0, os.SEEK_SET)
+        try:
+            return float(os.read(self._lock_fd, 64).decode("ascii"))
+        except ValueError:
+            started_at = self.clock()
+            self._set_started_at(started_at)
+            return started_at
+
+    def _set_started_at(self, started_at: float) -> None:
+        os.ftruncate(self._lock_fd, 0)
+        os.lseek(self._lock_fd, 0, os.SEEK_SET)
+        os.write(self._lock_fd, repr(started_at).encode("ascii"))
+
+    def _write_all(self, data: bytes) -> None:
+        # os.write may write only part of a large batch (e.g. on a full disk or a signal)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+
+    def _should_rotate(self, incoming: int) -> bool:
+        size = os.fstat(self._fd).st_size
+        if size == 0:
+            return False
+        if self.max_bytes and size + incoming > self.max_bytes:
+            return True
+        return self.rotate_seconds is not None and self.clock() - self._started_at() >= self.rotate_seconds
+
+    def _backup(self, n: int) -> Path:
+        suffix = f".{n}.gz" if self.compress else f".{n}"
+        return self.path.with_name(self.path.name + suffix)
+
+    def _rotate(self) -> None:
+        os.close(self._fd)
+        self._fd = None
+        if self.backup_count <= 0:
+            os.remove(self.path)
+        else:
+            self._backup(self.backup_count).unlink(missing_ok=True)
+            for n in range(self.backup_count - 1, 0, -1):
+                if self._backup(n).exists():
+                    os.replace(self._backup(n), self._backup(n + 1))
+            if self.compress:
+                rotated = self.path.with_name(self.path.name + ".rotating")
+                os.replace(self.path, rotated)
+                with open(rotated, "rb") as src, gzip.open(self._backup(1), "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(rotated)
+            else:
+                os.replace(self.path, self._backup(1))
+        self.rotations += 1
+
+
+_loggers: Dict[str, JsonlEventLogger] = {}
+_loggers_lock = threading.Lock()
+
+
+def get_event_logger(
+    path: str = "events.jsonl", on_create: Optional[Callable[[], Any]] = None, **options: Any
+) -> JsonlEventLogger:
+    """
+    Return the process-wide logger for `path`, creating it on first use.
+
+    on_create() is called once, just before the logger is created (e.g. to
+    prepare directories). Options only take effect on creation; passing
+    options that differ from an open logger's raises ValueError rather than
+    silently ignoring them.
+    """
+    key = os.path.abspath(path)
+    with _loggers_lock:
+        logger = _loggers.get(key)
+        if logger is None or logger._closed:
+            if on_create is not None:
+                on_create()
+            logger = _loggers[key] = JsonlEventLogger(path, **options)
+            return logger
+        conflicts = sorted(name for name, value in options.items() if getattr(logger, name) != value)
+        if conflicts:
+            raise ValueError(f"Event logger for {path} is already open with different {', '.join(conflicts)}.")
+        return logger
+
+
+def flush_event_logs() -> None:
+    with _loggers_lock:
+        loggers = list(_loggers.values())
+    for logger in loggers:
+        if not logger._closed:
+            logger.flush()
+
+
+@atexit.register
+def close_event_logs() -> None:
+    with _loggers_lock:
+        loggers = list(_loggers.values())
+        _loggers.clear()
+    for logger in loggers:
+        logger.close()
@@ -0,0 +1,289 @@
+# event_store.py
+"""
+Indexed SQLite store over the events.jsonl run history.
+
+ingest() reads the log from the byte offset saved by the previous ingest, so
+only new events are parsed; a partially written last line is left for next
+time. If the log was rotated since (see event_log.py), the rest of the old
+file is read from events.jsonl.1 first when it is still uncompressed.
+
+Events are indexed by type, stage, attempt and timestamp, and every entry of
+a validation event's "issues" list is stored with a normalized pattern (task
+ids and numbers replaced) so similar issues group together. Other events that
+repeat issues (e.g. stage_complete, with the final ones) are not indexed
+again, so each validation finding is counted once.
+
+Usage:
+    python event_store.py ingest --log events.jsonl
+    python event_store.py attempts
+    python event_store.py issues --stage tasks --top 10
+    python event_store.py latency --stage tasks --bucket 5
+"""
+from __future__ import annotations
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_DB_PATH = ".cache/events.sqlite3"
+DEFAULT_LOG_PATH = "events.jsonl"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL,
+    event TEXT,
+    stage TEXT,
+    attempt INTEGER,
+    run_id TEXT,
+    seconds REAL,
+    issue_count INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_event ON events (event, ts);
+CREATE INDEX IF NOT EXISTS events_stage ON events (stage, attempt);
+CREATE INDEX IF NOT EXISTS events_run ON events (stage, run_id, attempt);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE TABLE IF NOT EXISTS issues (
+    event_id INTEGER NOT NULL,
+    stage TEXT,
+    pattern TEXT NOT NULL,
+    issue TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS issues_pattern ON issues (stage, pattern);
+CREATE TABLE IF NOT EXISTS ingest_state (
+    path TEXT PRIMARY KEY,
+    inode INTEGER,
+    offset INTEGER NOT NULL
+);
+"""
+
+_TASK_ID = re.compile(r"\bT\d+\b")
+_NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+_QUOTED = re.compile(r"'[^']*'")
+
+
+def normalize_issue(issue: str) -> str:
+    """Collapse ids, numbers and quoted values so similar issues share a pattern."""
+    issue = _TASK_ID.sub("T#", issue)
+    issue = _QUOTED.sub("'…'", issue)
+    return _NUMBER.sub("N", issue)
+
+
+def _stage_of(event: Dict[str, Any]) -> Optional[str]:
+    if event.get("stage"):
+        return event["stage"]
+    name = str(event.get("event", ""))
+    if name.endswith("_validation"):
+        return name[: -len("_validation")]
+    return None
+
+
+def _row(event: Dict[str, Any]) -> Tuple:
+    issues = event.get("issues")
+    seconds = event.get("seconds", event.get("duration_seconds"))
+    return (
+        event.get("ts"),
+        event.get("event"),
+        _stage_of(event),
+        event.get("attempt"),
+        event.get("run_id"),
+        seconds,
+        len(issues) if isinstance(issues, list) else None,
+        json.dumps(event),
+    )
+
+
+class EventStore:
+    """
+    SQLite-backed index of JSONL events.
+
+    Args:
+        db_path: SQLite database file (":memory:" for a throwaway store)
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "EventStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # Ingestion
+
+    def _state(self, key: str) -> Tuple[Optional[int], int]:
+        row = self._conn.execute("SELECT inode, offset FROM ingest_state WHERE path = ?", (key,)).fetchone()
+        return (row[0], row[1]) if row else (None, 0)
+
+    def _read_lines(self, path: Path, offset: int) -> Iterator[Tuple[bytes, int]]:
+        """Yield (line, offset after it) for every complete line past `offset`."""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return  # still being written
+                offset += len(line)
+                yield line, offset
+
+    def _ingest_file(self, path: Path, offset: int) -> Tuple[int, int]:
+        count = 0
+        for line, offset in self._read_lines(path, offset):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(event, dict):
+                continue
+            cur = self._conn.execute(
+                "INSERT INTO events (ts, event, stage, attempt, run_id, seconds, issue_count, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                _row(event),
+            )
+            issues = event.get("issues")
+            if isinstance(issues, list) and issues and str(event.get("event", "")).endswith("_validation"):
+                stage = _stage_of(event)
+                self._conn.executemany(
+                    "INSERT INTO issues (event_id, stage, pattern, issue) VALUES (?, ?, ?, ?)",
+                    [(cur.lastrowid, stage, normalize_issue(str(i)), str(i)) for i in issues],
+                )
+            count += 1
+        return count, offset
+
+    def ingest(self, log_path: str = DEFAULT_LOG_PATH) -> int:
+        """Index events appended to `log_path` since the last ingest; returns how many."""
+        path = Path(log_path)
+        key = os.path.abspath(log_path)
+        inode, offset = self._state(key)
+        count = 0
+        with self._conn:
+            if path.exists():
+                current = path.stat()
+                if inode is not None and current.st_ino != inode:
+                    # Rotated: finish the old file if it is still readable as .1
+                    rotated = path.with_name(path.name + ".1")
+                    if rotated.exists() and rotated.stat().st_ino == inode:
+                        count += self._ingest_file(rotated, offset)[0]
+                    offset = 0
+                elif current.st_size < offset:
+                    offset = 0  # truncated
+                new, offset = self._ingest_file(path, offset)
+                count += new
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ingest_state (path, inode, offset) VALUES (?, ?, ?)",
+                    (key, current.st_ino, offset),
+                )
+        return count
+
+    # Queries
+
+    def event_counts(self) -> Dict[str, int]:
+        rows = self._conn.execute("SELECT event, COUNT(*) FROM events GROUP BY event ORDER BY 2 DESC")
+        return {event: n for event, n in rows}
+
+    def attempts_per_stage(self) -> Dict[str, Dict[str, float]]:
+        """
+        Validation attempts per stage.
+
+        "mean_attempts"/"max_attempts" are over runs (events with a run_id);
+        "revisions" counts every validation after the first draft.
+        """
+        stats: Dict[str, Dict[str, float]] = {}
+        for stage, validations, revisions in self._conn.execute(
+            "SELECT stage, COUNT(*), SUM(attempt > 1) FROM events "
+            "WHERE stage IS NOT NULL AND attempt IS NOT NULL GROUP BY stage"
+        ):
+            stats[stage] = {"validations": validations, "revisions": revisions,
+                            "runs": 0, "mean_attempts": 0.0, "max_attempts": 0}
+        for stage, runs, mean, worst in self._conn.execute(
+            "SELECT stage, COUNT(*), AVG(n), MAX(n) FROM ("
+            "  SELECT stage, run_id, MAX(attempt) AS n FROM events"
+            "  WHERE stage IS NOT NULL AND attempt IS NOT NULL AND run_id IS NOT NULL"
+            "  GROUP BY stage, run_id"
+            ") GROUP BY stage"
+        ):
+            stats[stage].update(runs=runs, mean_attempts=mean, max_attempts=worst)
+        return stats
+
+    def issue_frequency(self, stage: Optional[str] = None, top: int = 20, raw: bool = False) -> List[Tuple[str, int]]:
+        """Most common issues (grouped by normalized pattern unless raw=True)."""
+        column = "issue" if raw else "pattern"
+        where, params = ("WHERE stage = ?", [stage]) if stage else ("", [])
+        return self._conn.execute(
+            f"SELECT {column}, COUNT(*) FROM issues {where} GROUP BY {column} ORDER BY 2 DESC, 1 LIMIT ?",
+            params + [top],
+        ).fetchall()
+
+    def latency_histogram(self, stage: Optional[str] = None, bucket_seconds: float = 5.0) -> List[Tuple[float, int]]:
+        """(bucket start, count) pairs over events that recorded a duration."""
+        where, params = ("AND stage = ?", [stage]) if stage else ("", [])
+        rows = self._conn.execute(
+            f"SELECT CAST(seconds / ? AS INTEGER) AS bucket, COUNT(*) FROM events "
+            f"WHERE seconds IS NOT NULL {where} GROUP BY bucket ORDER BY bucket",
+            [bucket_seconds] + params,
+        )
+        return [(bucket * bucket_seconds, n) for bucket, n in rows]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Query the pipeline event history.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"SQLite store (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--log", default=DEFAULT_LOG_PATH, help=f"JSONL event log (default: {DEFAULT_LOG_PATH})")
+    parser.add_argument("--no-ingest", action="store_true", help="Query without ingesting new events first")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("ingest", help="Index new events")
+    commands.add_parser("counts", help="Events per type")
+    commands.add_parser("attempts", help="Validation attempts per stage")
+    issues = commands.add_parser("issues", help="Most common validation issues")
+    issues.add_argument("--stage")
+    issues.add_argument("--top", type=int, default=20)
+    issues.add_argument("--raw", action="store_true", help="Do not group similar issues")
+    latency = commands.add_parser("latency", help="Stage latency histogram")
+    latency.add_argument("--stage")
+    latency.add_argument("--bucket", type=float, default=5.0, help="Bucket width in seconds")
+    args = parser.parse_args(argv)
+
+    with EventStore(args.db) as store:
+        if args.command == "ingest" or not args.no_ingest:
+            added = store.ingest(args.log)
+            if args.command == "ingest":
+                print(f"Ingested {added} new events from {args.log}")
+                return
+        if args.command == "counts":
+            for event, n in store.event_counts().items():
+                print(f"{n:8d}  {event}")
+        elif args.command == "attempts":
+            for stage, s in sorted(store.attempts_per_stage().items(), key=lambda kv: -kv[1]["mean_attempts"]):
+                print(f"{stage:<12} runs={s['runs']:<6} mean={s['mean_attempts']:.2f} "
+                      f"max={s['max_attempts']} revisions={s['revisions']}")
+        elif args.command == "issues":
+            for issue, n in store.issue_frequency(args.stage, args.top, args.raw):
+                print(f"{n:8d}  {issue}")
+        elif args.command == "latency":
+            rows = store.latency_histogram(args.stage, args.bucket)
+            peak = max((n for _, n in rows), default=0)
+            for start, n in rows:
+                bar = "#" * max(1, round(n / peak * 40))
+                print(f"{start:7.1f}s-{start + args.bucket:<7.1f}s {n:8d}  {bar}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# json_patch.py
+"""
+Minimal RFC 6902 (JSON Patch) implementation for revise rounds.
+
+Supports add, remove, replace, move, copy and test operations with RFC 6901
+JSON Pointer paths (including "~0"/"~1" escapes and "-" to append to arrays).
+"""
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict, List, Tuple
+
+
+class PatchError(ValueError):
+    """Raised when a patch is malformed or does not apply to the document."""
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer {pointer!r}: must start with '/'.")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"Invalid array index {token!r}.")
+    i = int(token)
+    if i > len(container) or (i == len(container) and not allow_end):
+        raise PatchError(f"Array index {i} out of range.")
+    return i
+
+
+def _resolve_parent(doc: Any, pointer: str) -> Tuple[Any, str]:
+    tokens = parse_pointer(pointer)
+    if not tokens:
+        raise PatchError("Operations on the document root are not supported.")
+    target = doc
+    for token in tokens[:-1]:
+        if isinstance(target, list):
+            target = target[_index(target, token)]
+        elif isinstance(target, dict):
+            if token not in target:
+                raise PatchError(f"Path {pointer!r} does not exist.")
+            target = target[token]
+        else:
+            raise PatchError(f"Path {pointer!r} does not exist.")
+    return target, tokens[-1]
+
+
+def _get(doc: Any, pointer: str) -> Any:
+    parent, token = _resolve_parent(doc, pointer)
+    if isinstance(parent, list):
+        return parent[_index(parent, token)]
+    if isinstance(parent, dict) and token in parent:
+        return parent[token]
+    raise PatchError(f"Path {pointer!r} does not exist.")
+
+
+def _add(doc: Any, pointer: str, value: Any) -> None:
+    parent, token = _resolve_parent(doc, pointer)
+    if isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[token] = value
+    else:
+        raise PatchError(f"Cannot add at {pointer!r}.")
+
+
+def _remove(doc: Any, pointer: str) -> Any:
+    parent, token = _resolve_parent(doc, pointer)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, token))
+    if isinstance(parent, dict) and token in parent:
+        return parent.pop(token)
+    raise PatchError(f"Path {pointer!r} does not exist.")
+
+
+def _replace(doc: Any, pointer: str, value: Any) -> None:
+    parent, token = _resolve_parent(doc, pointer)
+    if isinstance(parent, list):
+        parent[_index(parent, token)] = value
+    elif isinstance(parent, dict) and token in parent:
+        parent[token] = value
+    else:
+        raise PatchError(f"Path {pointer!r} does not exist.")
+
+
+def apply_patch(doc: Dict[str, Any], patch: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply a JSON Patch to a copy of `doc` and return the patched copy.
+
+    Args:
+        doc: JSON-compatible document (e.g. a pydantic model_dump())
+        patch: List of operations like {"op": "replace", "path": "/tasks/3/priority", "value": "P1"}
+
+    Returns:
+        The patched document; `doc` itself is left untouched
+
+    Raises:
+        PatchError: If an operation is malformed, a path is missing or a test fails
+    """
+    if not isinstance(patch, list):
+        raise PatchError("Patch must be a list of operations.")
+    result = copy.deepcopy(doc)
+    for op in patch:
+        if not isinstance(op, dict) or "op" not in op or "path" not in op:
+            raise PatchError(f"Malformed patch operation: {op!r}.")
+        name, path = op["op"], op["path"]
+        if name in ("add", "replace", "test") and "value" not in op:
+            raise PatchError(f"'{name}' operation at {path!r} is missing 'value'.")
+        if name == "add":
+            _add(result, path, copy.deepcopy(op["value"]))
+        elif name == "remove":
+            _remove(result, path)
+        elif name == "replace":
+            _replace(result, path, copy.deepcopy(op["value"]))
+        elif name == "move":
+            _add(result, path, _remove(result, op.get("from", "")))
+        elif name == "copy":
+            _add(result, path, copy.deepcopy(_get(result, op.get("from", ""))))
+        elif name == "test":
+            if _get(result, path) != op["value"]:
+                raise PatchError(f"Test failed at {path!r}.")
+        else:
+            raise PatchError(f"Unsupported patch operation {name!r}.")
+    return result
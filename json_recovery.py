@@ -0,0 +1,118 @@
+# json_recovery.py
+"""
+Lenient parsing of model replies that are not valid JSON as sent.
+
+recover_json() salvages the two common failures instead of discarding the
+whole completion:
+
+- wrapping: markdown fences or prose around the object are dropped
+- truncation (e.g. at the max_tokens limit): the reply is cut back to its
+  last complete value and the open arrays and objects are closed. Every
+  complete element of a top-level array is kept (e.g. the first 38 tasks);
+  an element or field that was still being written is dropped.
+
+A truncated reply comes back as a PartialDocument, a dict that also records
+where it was cut off, so the caller can ask for only the rest (see
+pipeline._continuation).
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+from jsonstream import CLOSERS
+
+
+class JsonRecoveryError(ValueError):
+    """Raised when no JSON object can be salvaged from a reply."""
+
+
+class PartialDocument(dict):
+    """
+    The complete part of a truncated JSON object.
+
+    Attributes:
+        field: Top-level field whose value was being written when the reply
+            ended (its complete elements are kept), or None if it ended
+            between fields
+    """
+
+    def __init__(self, data: Dict[str, Any], field: Optional[str] = None):
+        super().__init__(data)
+        self.field = field
+
+
+def _loads(text: str) -> Dict[str, Any]:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise JsonRecoveryError(f"Invalid JSON: {e}") from e
+
+
+def _in_top_array(stack: List[str]) -> bool:
+    return len(stack) == 2 and stack[1] == "["
+
+
+def recover_json(text: str) -> Dict[str, Any]:
+    """
+    Parse the first JSON object in `text`, tolerating wrapping and truncation.
+
+    Returns the object, as a PartialDocument if it had to be closed. Raises
+    JsonRecoveryError if there is no object, its brackets do not match, or
+    the reply ended before any top-level field was complete.
+    """
+    start = text.find("{")
+    if start < 0:
+        raise JsonRecoveryError("No JSON object in the reply.")
+    stack: List[str] = []
+    in_string = escape = False
+    string_start = 0
+    key = ""
+    field: Optional[str] = None  # top-level field whose value is being written
+    # Everything before `cut` is complete; closing cut_stack makes it an object
+    cut, cut_stack = start + 1, ["{"]
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if len(stack) == 1 and field is None:
+                    key = text[string_start:i + 1]
+                elif len(stack) == 1:
+                    cut, cut_stack, field = i + 1, list(stack), None
+                elif _in_top_array(stack):
+                    cut, cut_stack = i + 1, list(stack)
+            continue
+        if ch == '"':
+            in_string = True
+            string_start = i
+        elif ch in CLOSERS:
+            stack.append(ch)
+            if _in_top_array(stack):
+                cut, cut_stack = i + 1, list(stack)
+        elif ch in "}]":
+            if not stack or CLOSERS[stack[-1]] != ch:
+                raise JsonRecoveryError(f"Mismatched {ch!r} (offset {i}).")
+            stack.pop()
+            if not stack:
+                # Complete object; anything after it (a closing fence, prose) is dropped
+                return _loads(text[start:i + 1])
+            if len(stack) == 1:
+                cut, cut_stack, field = i + 1, list(stack), None
+            elif _in_top_array(stack):
+                cut, cut_stack = i + 1, list(stack)
+        elif ch == ":" and len(stack) == 1:
+            field = _loads(key)
+        elif ch == "," and (len(stack) == 1 or _in_top_array(stack)):
+            cut, cut_stack = i, list(stack)
+            if len(stack) == 1:
+                field = None
+    closers = "".join(CLOSERS[opener] for opener in reversed(cut_stack))
+    data = _loads(text[start:cut] + closers)
+    if not data:
+        raise JsonRecoveryError("Reply ended before any field was complete.")
+    return PartialDocument(data, field)
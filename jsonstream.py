@@ -0,0 +1,166 @@
+# jsonstream.py
+"""
+Incremental parsing of a JSON object as it streams in.
+
+JsonItemStream is fed text chunks (e.g. streamed completion deltas) and
+returns every element of a top-level array field as soon as its closing
+brace/quote arrives, e.g. each TaskItem of {"title": ..., "tasks": [...]}.
+Structural errors (a reply that is not an object, mismatched brackets, text
+after the object) are raised as soon as they are seen, so a malformed
+completion can be abandoned without waiting for the rest of it. With
+lenient=True, a short preamble before the object (a markdown fence, a
+sentence of prose) and anything after it are skipped instead, as
+json_recovery.recover_json does.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+CLOSERS = {"{": "}", "[": "]"}
+MAX_PREAMBLE = 500
+
+
+class JsonStreamError(ValueError):
+    """Raised when streamed text cannot be (part of) a JSON object."""
+
+
+class JsonItemStream:
+    """
+    Push parser yielding (field, element) pairs for top-level array fields.
+
+        stream = JsonItemStream()
+        for chunk in chunks:
+            for field, item in stream.feed(chunk):
+                ...
+        doc = stream.close()
+
+    Args:
+        lenient: Skip text before the first "{" and after the object closes
+            instead of raising JsonStreamError
+        max_preamble: With lenient, characters allowed before the first "{";
+            a longer preamble (e.g. a refusal) is still rejected early
+    """
+
+    def __init__(self, lenient: bool = False, max_preamble: int = MAX_PREAMBLE):
+        self.lenient = lenient
+        self.max_preamble = max_preamble
+        self._chunks: List[str] = []
+        self._offset = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._done = False
+        self._key_chars: List[str] = []
+        self._field: Optional[str] = None
+        self._item_parts: Optional[List[str]] = None
+        self._item_start = 0
+        self._start = 0  # offsets of the object's "{" and "}"
+        self._end = 0
+
+    @property
+    def text(self) -> str:
+        """Everything received so far."""
+        return "".join(self._chunks)
+
+    def _error(self, message: str, index: int) -> JsonStreamError:
+        return JsonStreamError(f"{message} (offset {self._offset + index}).")
+
+    def _at_item_level(self) -> bool:
+        return self._item_parts is None and len(self._stack) == 2 and self._stack[1] == "["
+
+    def _start_item(self, index: int) -> None:
+        self._item_parts = []
+        self._item_start = index
+
+    def _end_item(self, chunk: str, index: int) -> Tuple[str, Any]:
+        self._item_parts.append(chunk[self._item_start:index + 1])
+        raw = "".join(self._item_parts)
+        self._item_parts = None
+        try:
+            return self._field, json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise self._error(f"Invalid element in {self._field!r}: {e.msg}", index) from e
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume the next chunk and return the array elements it completed."""
+        self._chunks.append(chunk)
+        items: List[Tuple[str, Any]] = []
+        stack = self._stack
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._item_parts is not None and len(stack) == 2:
+                        items.append(self._end_item(chunk, i))
+                    continue
+                if len(stack) == 1:
+                    self._key_chars.append(ch)
+                continue
+            if ch in " \t\r\n":
+                continue
+            if self._done:
+                if self.lenient:
+                    break  # e.g. a closing fence
+                raise self._error(f"Unexpected {ch!r} after the end of the JSON object", i)
+            if not stack and ch != "{":
+                if self.lenient and self._offset + i < self.max_preamble:
+                    continue  # e.g. an opening fence or a sentence of prose
+                raise self._error(f"Expected a JSON object, got {ch!r}", i)
+            if ch == '"':
+                self._in_string = True
+                if len(stack) == 1:
+                    self._key_chars = []
+                elif self._at_item_level():
+                    self._start_item(i)
+            elif ch in CLOSERS:
+                if not stack:
+                    self._start = self._offset + i
+                elif self._at_item_level():
+                    self._start_item(i)
+                stack.append(ch)
+            elif ch in "}]":
+                if CLOSERS[stack[-1]] != ch:
+                    raise self._error(f"Mismatched {ch!r}", i)
+                stack.pop()
+                if not stack:
+                    self._done = True
+                    self._end = self._offset + i + 1
+                elif self._item_parts is not None and len(stack) == 2:
+                    items.append(self._end_item(chunk, i))
+            elif ch == ":" and len(stack) == 1:
+                self._field = json.loads('"' + "".join(self._key_chars) + '"')
+        if self._item_parts is not None:
+            self._item_parts.append(chunk[self._item_start:])
+            self._item_start = 0
+        self._offset += len(chunk)
+        return items
+
+    def close(self) -> Dict[str, Any]:
+        """Parse and return the complete object once the stream has ended."""
+        if not self._done:
+            raise JsonStreamError("Stream ended before the JSON object was closed.")
+        try:
+            return json.loads(self.text[self._start:self._end])
+        except json.JSONDecodeError as e:
+            raise JsonStreamError(f"Invalid JSON: {e}") from e
+
+
+def iter_json_items(chunks: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+    """Yield (field, element) pairs from an iterable of text chunks."""
+    stream = JsonItemStream()
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    stream.close()
+
+
+def replay_items(doc: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """Yield the same (field, element) pairs JsonItemStream would for a parsed object."""
+    for field, value in doc.items():
+        if isinstance(value, list):
+            for item in value:
+                yield field, item
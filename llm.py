@@ -1,29 +1,527 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
 import os
 import json
+import asyncio
+import contextlib
+import threading
+import weakref
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import httpx
 from dotenv import load_dotenv
 
+from cache import get_cache, make_key
+from json_recovery import JsonRecoveryError, PartialDocument, recover_json
+from jsonstream import JsonItemStream, JsonStreamError, replay_items
+from resilience import InvalidReplyError, get_resilience
+from tracing import record, span
+
 load_dotenv('.env')
 
+DEFAULT_MODEL = "gpt-5-nano"
+
+# Connection pool settings for the shared client (overridable via env vars)
+POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "300"))
+
+# Upper bound on in-flight async requests per event loop
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+
+# Set LLM_CACHE_DISABLED=1 to turn the response cache off process-wide
+CACHE_ENABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
 
+# Set LLM_STRUCTURED_OUTPUT=0 for endpoints without json_schema support: the
+# schema then goes into the system message and the request uses JSON mode
+STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "1").lower() not in ("0", "false", "no")
 
-def call_llm_json(system_prompt, user_prompt) -> dict:
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_clients: Dict[Tuple, OpenAI] = {}
+_clients_lock = threading.Lock()
 
-    response = client.chat.completions.create(
-        model="gpt-5-nano",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        response_format={"type": "json_object"},
-        store=True,
+# Async clients and semaphores are bound to the loop they were created on
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _pool_settings(max_connections, max_keepalive, connect_timeout, request_timeout):
+    timeout = httpx.Timeout(request_timeout, connect=connect_timeout)
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
     )
+    return timeout, limits
+
+
+def get_client(
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    max_connections: int = POOL_MAX_CONNECTIONS,
+    max_keepalive: int = POOL_MAX_KEEPALIVE,
+    connect_timeout: float = CONNECT_TIMEOUT,
+    request_timeout: float = REQUEST_TIMEOUT,
+) -> OpenAI:
+    """
+    Return a long-lived OpenAI client with a keep-alive connection pool.
+
+    Clients are registered per configuration, so repeated calls with the same
+    settings share one HTTP pool (and skip the TCP/TLS handshake). OpenAI
+    clients are thread-safe, so the same instance can be used from workers.
+
+    Args:
+        api_key: API key (defaults to OPENAI_API_KEY)
+        base_url: Override the API endpoint (defaults to OPENAI_BASE_URL / api.openai.com)
+        max_connections: Upper bound on open connections in the pool
+        max_keepalive: Idle connections kept open for reuse
+        connect_timeout: Seconds allowed to establish a connection
+        request_timeout: Seconds allowed for a full request
+
+    Returns:
+        The shared OpenAI client for this configuration
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    base_url = base_url or os.getenv("OPENAI_BASE_URL")
+    key = (api_key, base_url, max_connections, max_keepalive, connect_timeout, request_timeout)
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            timeout, limits = _pool_settings(max_connections, max_keepalive, connect_timeout, request_timeout)
+            http_client = DefaultHttpxClient(limits=limits, timeout=timeout)
+            # Retries happen in resilience.py, not in the client
+            client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, http_client=http_client, max_retries=0)
+            _clients[key] = client
+    return client
+
+
+def close_clients() -> None:
+    """Close every pooled client and forget it (e.g. on shutdown or in tests)."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+def get_async_client(
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    max_connections: int = POOL_MAX_CONNECTIONS,
+    max_keepalive: int = POOL_MAX_KEEPALIVE,
+    connect_timeout: float = CONNECT_TIMEOUT,
+    request_timeout: float = REQUEST_TIMEOUT,
+) -> AsyncOpenAI:
+    """
+    Async counterpart of get_client().
+
+    Must be called from inside a running event loop; each loop gets its own
+    pooled AsyncOpenAI client, released when the loop is garbage collected.
+    """
+    loop = asyncio.get_running_loop()
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    base_url = base_url or os.getenv("OPENAI_BASE_URL")
+    key = (api_key, base_url, max_connections, max_keepalive, connect_timeout, request_timeout)
 
-    text = response.choices[0].message.content
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(key)
+    if client is None:
+        timeout, limits = _pool_settings(max_connections, max_keepalive, connect_timeout, request_timeout)
+        http_client = DefaultAsyncHttpxClient(limits=limits, timeout=timeout)
+        client = AsyncOpenAI(
+            api_key=api_key, base_url=base_url, timeout=timeout, http_client=http_client, max_retries=0
+        )
+        clients[key] = client
+    return client
 
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENCY)
+    return semaphore
+
+
+def _messages(system_prompt: str, user_prompt: str) -> list:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+class InvalidJSONError(InvalidReplyError, ValueError):
+    """The model's reply was not valid JSON (retried, see resilience.py)."""
+
+
+def _parse_json(text: str) -> dict:
     try:
         return json.loads(text)
     except json.JSONDecodeError as e:
-        # Helpful debugging info
-        raise ValueError(f"Model did not return valid JSON. Raw output:\n{text}") from e
\ No newline at end of file
+        try:
+            data = recover_json(text)
+        except JsonRecoveryError:
+            # Helpful debugging info
+            raise InvalidJSONError(f"Model did not return valid JSON. Raw output:\n{text}") from e
+    record(json_recovered="truncated" if isinstance(data, PartialDocument) else "unwrapped")
+    return data
+
+
+def _cacheable(data: dict) -> bool:
+    """A truncated reply is completed by the caller, so it is never replayed from the cache."""
+    return not isinstance(data, PartialDocument)
+
+
+class LLMBackend:
+    """
+    Source of raw completion text for a (system prompt, user prompt) pair.
+
+    The call_llm_json* functions handle caching, JSON parsing, concurrency
+    limits, timeouts and retries; a backend only produces text. Raise
+    resilience.TransientError for failures worth retrying. Subclass it to plug in
+    another provider or a local stub (see stub_llm.py). response_format, when
+    given, is an OpenAI json_schema response format (see structured_output.py)
+    the reply should conform to.
+    """
+
+    @property
+    def cache_namespace(self) -> str:
+        """
+        Identity of this backend in response cache keys, so replies from a
+        stub or another provider never answer requests meant for the API.
+        Override it to include settings that change the replies.
+        """
+        return type(self).__name__
+
+    def complete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        raise NotImplementedError
+
+    async def acomplete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        return await asyncio.to_thread(
+            self.complete, system_prompt, user_prompt, model, max_tokens, timeout, response_format
+        )
+
+    def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        """Yield the completion in chunks (default: all at once)."""
+        yield self.complete(system_prompt, user_prompt, model, max_tokens, timeout, response_format)
+
+
+def _record_usage(usage: Any) -> None:
+    """Attach a response's token usage to the current trace span (see tracing.py)."""
+    if usage is not None:
+        record(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+
+class OpenAIBackend(LLMBackend):
+    """Chat completions in JSON (or json_schema) mode through the given or pooled OpenAI clients."""
+
+    def __init__(self, client: Optional[OpenAI] = None, async_client: Optional[AsyncOpenAI] = None):
+        self.client = client
+        self.async_client = async_client
+
+    @property
+    def cache_namespace(self) -> str:
+        return ""  # the configured API keeps bare keys
+
+    def _request(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        max_tokens: Optional[int],
+        timeout: Optional[float],
+        response_format: Optional[Dict[str, Any]],
+    ) -> dict:
+        if response_format is None:
+            response_format = {"type": "json_object"}
+        elif not STRUCTURED_OUTPUT:
+            schema = json.dumps(response_format["json_schema"]["schema"], separators=(",", ":"))
+            system_prompt = f"{system_prompt}\n\nReturn JSON matching this JSON Schema:\n{schema}"
+            response_format = {"type": "json_object"}
+        request = dict(
+            model=model,
+            messages=_messages(system_prompt, user_prompt),
+            response_format=response_format,
+            store=True,
+        )
+        if max_tokens:
+            request["max_completion_tokens"] = max_tokens
+        if timeout:
+            request["timeout"] = timeout
+        return request
+
+    def complete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        client = self.client or get_client()
+        request = self._request(system_prompt, user_prompt, model, max_tokens, timeout, response_format)
+        response = client.chat.completions.create(**request)
+        _record_usage(getattr(response, "usage", None))
+        return response.choices[0].message.content
+
+    async def acomplete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        client = self.async_client or get_async_client()
+        request = self._request(system_prompt, user_prompt, model, max_tokens, timeout, response_format)
+        response = await client.chat.completions.create(**request)
+        _record_usage(getattr(response, "usage", None))
+        return response.choices[0].message.content
+
+    def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        client = self.client or get_client()
+        stream = client.chat.completions.create(
+            **self._request(system_prompt, user_prompt, model, max_tokens, timeout, response_format),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    _record_usage(chunk.usage)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        finally:
+            stream.close()
+
+
+_backend: Optional[LLMBackend] = None
+
+
+def get_backend() -> LLMBackend:
+    """
+    Backend used when no explicit client is passed.
+
+    Defaults to OpenAIBackend; set LLM_BACKEND=stub to run everything against
+    the deterministic offline stub instead.
+    """
+    global _backend
+    if _backend is None:
+        if os.getenv("LLM_BACKEND", "").lower() == "stub":
+            from stub_llm import StubLLM
+            _backend = StubLLM()
+        else:
+            _backend = OpenAIBackend()
+    return _backend
+
+
+def set_backend(backend: Optional[LLMBackend]) -> Optional[LLMBackend]:
+    """Install a backend process-wide (None restores the default); returns the previous one."""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+@contextlib.contextmanager
+def use_backend(backend: LLMBackend):
+    """Use `backend` for the duration of the block."""
+    previous = set_backend(backend)
+    try:
+        yield backend
+    finally:
+        set_backend(previous)
+
+
+def call_llm_json(
+    system_prompt,
+    user_prompt,
+    client: Optional[OpenAI] = None,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    max_tokens: Optional[int] = None,
+    timeout: Optional[float] = None,
+    response_format: Optional[Dict[str, Any]] = None,
+    hedge_key: Optional[str] = None,
+) -> dict:
+    """
+    Send a chat completion request and parse the JSON reply.
+
+    Identical (system_prompt, user_prompt, model) requests to the same backend
+    are served from the response cache; pass use_cache=False to bypass the
+    cache entirely (a fresh generation that is neither read from nor written
+    to it). Without a client, the request goes to the current backend (see get_backend). max_tokens caps the
+    completion length and timeout (seconds) bounds each attempt; both default
+    to the client's settings. response_format requests a strict json_schema
+    reply (see structured_output.schema_format); by default the reply only
+    has to be a JSON object. Replies wrapped in markdown fences or cut off
+    partway are salvaged (see json_recovery.py); a truncated one is returned
+    as a PartialDocument and not cached. Transient failures are retried, slow
+    attempts hedged and the whole call bounded by a deadline (see
+    resilience.py). hedge_key (e.g. the pipeline stage) keeps the latency
+    stats that decide when to hedge apart from other kinds of calls to the
+    same model.
+    """
+    with span("llm", model=model, cache_hit=False):
+        backend = OpenAIBackend(client) if client is not None else get_backend()
+        cache = get_cache() if CACHE_ENABLED and use_cache else None
+        key = make_key(system_prompt, user_prompt, model, response_format, backend.cache_namespace)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                record(cache_hit=True)
+                return cached
+
+        data = get_resilience().call(
+            lambda t: _parse_json(backend.complete(system_prompt, user_prompt, model, max_tokens, t, response_format)),
+            model,
+            timeout,
+            key=hedge_key,
+        )
+        if cache is not None and _cacheable(data):
+            cache.set(key, data)
+        return data
+
+
+def call_llm_json_stream(
+    system_prompt,
+    user_prompt,
+    on_item: Optional[Callable[[str, Any], None]] = None,
+    client: Optional[OpenAI] = None,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    max_tokens: Optional[int] = None,
+    timeout: Optional[float] = None,
+    response_format: Optional[Dict[str, Any]] = None,
+    hedge_key: Optional[str] = None,
+) -> dict:
+    """
+    Streaming version of call_llm_json.
+
+    The completion is parsed while it streams in: on_item(field, element) is
+    called for each element of a top-level array (e.g. ("tasks", {...})) as
+    soon as it is complete. Text around the object (a markdown fence, prose)
+    is skipped, and the request is abandoned as soon as the object itself is
+    malformed. Exceptions raised by on_item also abort the stream. Cached replies are replayed through on_item. Failed attempts
+    are retried only until the first item has been delivered; streams are
+    never hedged. A stream that ends early returns a PartialDocument of the
+    items that arrived.
+    """
+    with span("llm", model=model, cache_hit=False):
+        backend = OpenAIBackend(client) if client is not None else get_backend()
+        cache = get_cache() if CACHE_ENABLED and use_cache else None
+        key = make_key(system_prompt, user_prompt, model, response_format, backend.cache_namespace)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                record(cache_hit=True)
+                if on_item:
+                    for field, item in replay_items(cached):
+                        on_item(field, item)
+                return cached
+
+        delivered = False
+
+        def attempt(attempt_timeout: Optional[float]) -> dict:
+            nonlocal delivered
+            deltas = backend.stream(system_prompt, user_prompt, model, max_tokens, attempt_timeout, response_format)
+            parser = JsonItemStream(lenient=True)
+            try:
+                for delta in deltas:
+                    for field, item in parser.feed(delta):
+                        if on_item:
+                            delivered = True
+                            on_item(field, item)
+            except JsonStreamError as e:
+                raise InvalidJSONError(f"Model did not return valid JSON ({e}). Raw output:\n{parser.text}") from e
+            finally:
+                deltas.close()
+            # A reply that ended early keeps the items already delivered
+            return _parse_json(parser.text)
+
+        data = get_resilience().call(
+            attempt, model, timeout, hedge=False, can_retry=lambda: not delivered, key=hedge_key
+        )
+
+        if cache is not None and _cacheable(data):
+            cache.set(key, data)
+        return data
+
+
+async def call_llm_json_async(
+    system_prompt,
+    user_prompt,
+    client: Optional[AsyncOpenAI] = None,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    timeout: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    response_format: Optional[Dict[str, Any]] = None,
+    hedge_key: Optional[str] = None,
+) -> dict:
+    """
+    Async version of call_llm_json.
+
+    At most LLM_MAX_CONCURRENCY requests are in flight per event loop; callers
+    beyond that wait on a semaphore. Each attempt is cancelled (raising
+    TimeoutError) if it takes longer than `timeout` seconds; retries, hedging
+    and the deadline work as in call_llm_json.
+    """
+    with span("llm", model=model, cache_hit=False):
+        backend = OpenAIBackend(async_client=client) if client is not None else get_backend()
+        cache = get_cache() if CACHE_ENABLED and use_cache else None
+        key = make_key(system_prompt, user_prompt, model, response_format, backend.cache_namespace)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                record(cache_hit=True)
+                return cached
+
+
+        async def attempt(attempt_timeout: Optional[float]) -> dict:
+            async with _get_semaphore():
+                text = await asyncio.wait_for(
+                    backend.acomplete(system_prompt, user_prompt, model, max_tokens, attempt_timeout, response_format),
+                    timeout=attempt_timeout,
+                )
+            return _parse_json(text)
+
+        data = await get_resilience().acall(attempt, model, timeout or REQUEST_TIMEOUT, key=hedge_key)
+        if cache is not None and _cacheable(data):
+            cache.set(key, data)
+        return data
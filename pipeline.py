@@ -6,165 +6,608 @@ from pathlib import Path
 # Add parent directory to path so we can import modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import io, csv, json, time
-from typing import Dict, Any, List
+import io, csv, json, math, time
+import asyncio
+import queue
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import Dict, Any, List, Callable, Awaitable, Generator, Iterator, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
 
 from schemas import GoalInterpretation, PRD, MilestonesDoc, TasksDoc
-from llm import call_llm_json
-from validators import validate_prd, validate_milestones, validate_tasks
+from checkpoints import RunStore, DEFAULT_RUN_DIR, fingerprint
+from event_log import get_event_logger
+from llm import call_llm_json, call_llm_json_async, call_llm_json_stream
+from json_recovery import PartialDocument
+from jsonstream import replay_items
+from validators import validate_prd, validate_milestones, validate_tasks, TASK_COUNT
 from tools import render_prd_md, render_milestones_md, tasks_to_rows
+from scheduling import critical_path, schedule_csv
+from json_patch import PatchError, apply_patch
+from prompt_context import DEFAULT_TOKEN_BUDGET, build_context, compact_json, context_report
+from structured_output import schema_format
+from repairs import repair_prd, repair_milestones, repair_tasks
+from routing import RouteStats, RoutingPolicy, global_route_stats, load_policy
+from tracing import Tracer, propagate, record, span, summarize, write_otlp_json
 
 SYSTEM = "Return ONLY valid JSON. No markdown, no extra text."
 
-def run_pipeline(idea: str, constraints: List[str], max_attempts: int = 3) -> Dict[str, Any]:
-    start_time = time.time()
-    
-    # 1) GoalInterpretation
-    gi_prompt = f"""
-Return GoalInterpretation JSON with keys:
-- title (string)
-- one_liner (string)
-- target_users (array of strings)
-- constraints (array of strings)
-- assumptions (array of strings)
-- success_metrics (array of strings, NOT objects)
-
-Each success_metric should be a simple string describing the metric.
+# "patch": the model returns a JSON Patch touching only the flagged fields,
+# falling back to a full-document revision if the patch does not apply.
+# "full": the model returns the whole corrected document.
+REVISION_MODES = ("patch", "full")
+
+StageCallback = Callable[[str, BaseModel, List[str]], None]
+ItemCallback = Callable[[str, str, Any], None]
+DocT = TypeVar("DocT", bound=BaseModel)
+
+# Quality validator and deterministic repair for each revisable document
+_CHECKS: Dict[type, Tuple[Callable, Callable]] = {
+    PRD: (validate_prd, repair_prd),
+    MilestonesDoc: (validate_milestones, repair_milestones),
+    TasksDoc: (validate_tasks, repair_tasks),
+}
+
+# Document generated by each stage that can be drafted as best-of-N candidates
+CANDIDATE_STAGES: Dict[str, Type[BaseModel]] = {"prd": PRD, "milestones": MilestonesDoc, "tasks": TasksDoc}
+
+# Strict json_schema response format for each stage's document (see structured_output.py)
+STAGE_FORMATS: Dict[str, dict] = {
+    stage_name: schema_format(model_cls)
+    for stage_name, model_cls in {"goal": GoalInterpretation, **CANDIDATE_STAGES}.items()
+}
+
+
+def _goal_prompt(idea: str, constraints: List[str]) -> str:
+    return f"""
+Return GoalInterpretation JSON for this idea.
 
 Idea: {idea}
 Constraints: {json.dumps(constraints)}
 
-Example format:
-{{
-  "title": "Project Name",
-  "one_liner": "Brief description",
-  "target_users": ["User type 1", "User type 2"],
-  "constraints": ["Constraint 1", "Constraint 2"],
-  "assumptions": ["Assumption 1", "Assumption 2"],
-  "success_metrics": ["Metric 1: description", "Metric 2: description"]
-}}
+Rules:
+- success_metrics are measurable, e.g. "Weekly active users: 100 by week 4"
 """
-    gi_dict = call_llm_json(SYSTEM, gi_prompt)
-    gi = GoalInterpretation.model_validate(gi_dict)
-
-    # 2) PRD + revise loop
-    prd_prompt = f"""
-Using this goal interpretation, return PRD JSON with these exact keys:
-- title (string)
-- problem (string)
-- target_users (array of strings)
-- goals (array of strings)
-- non_goals (array of strings)
-- user_stories (array of strings, NOT objects - use format "As a [user], I want [goal] so that [benefit]")
-- functional_requirements (array of strings)
-- nonfunctional_requirements (array of strings)
-- risks (array of strings)
-- open_questions (array of strings)
+
+
+def _prd_prompt(gi: GoalInterpretation, budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> str:
+    return f"""
+Using this goal interpretation, return PRD JSON.
 
 GoalInterpretation:
-{json.dumps(gi.model_dump(), indent=2)}
+{build_context("prd", "goal", gi, budget)}
 
 Rules:
-- Provide 6–10 functional_requirements
-- Provide 4–8 nonfunctional_requirements
-- Provide 6–10 user_stories as simple strings (e.g., "As a user, I want to add expenses so that I can track spending")
 - Keep scope MVP-realistic
-- All arrays must contain strings, NOT objects or nested structures
 """
-    prd_dict = call_llm_json(SYSTEM, prd_prompt)
-    prd_issues = []
-    for attempt in range(1, max_attempts + 1):
-        prd = PRD.model_validate(prd_dict)
-        prd_issues = validate_prd(prd)
-        if not prd_issues:
-            break
-        if attempt == max_attempts:
-            break
-        revise_prompt = f"""
-You previously returned this PRD JSON:
-{json.dumps(prd.model_dump(), indent=2)}
 
-Issues:
-{json.dumps(prd_issues, indent=2)}
-
-Fix with minimal changes.
-Return corrected PRD JSON ONLY with the same keys.
-"""
-        prd_dict = call_llm_json(SYSTEM, revise_prompt)
 
-    # 3) Milestones + revise loop
-    milestones_prompt = f"""
-Using this PRD JSON, return MilestonesDoc JSON with keys:
-title, milestones (array). Each milestone: name, objective, deliverables, est_days.
+def _milestones_prompt(prd: PRD, budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> str:
+    return f"""
+Using this PRD JSON, return MilestonesDoc JSON.
 
 PRD:
-{json.dumps(prd.model_dump(), indent=2)}
+{build_context("milestones", "prd", prd, budget)}
 
 Rules:
-- Provide 3–6 milestones
-- Each milestone: 2–5 deliverables
 - est_days realistic for solo MVP
 - Order logically
 """
-    mdoc_dict = call_llm_json(SYSTEM, milestones_prompt)
-    m_issues = []
-    for attempt in range(1, max_attempts + 1):
-        mdoc = MilestonesDoc.model_validate(mdoc_dict)
-        m_issues = validate_milestones(mdoc)
-        if not m_issues:
-            break
-        if attempt == max_attempts:
-            break
-        revise_prompt = f"""
-You previously returned this MilestonesDoc JSON:
-{json.dumps(mdoc.model_dump(), indent=2)}
 
-Issues:
-{json.dumps(m_issues, indent=2)}
 
-Fix with minimal changes. Return corrected MilestonesDoc JSON ONLY.
+def _tasks_prompt(prd: PRD, mdoc: MilestonesDoc, budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> str:
+    return f"""
+Using this PRD and Milestones, return TasksDoc JSON.
+
+PRD:
+{build_context("tasks", "prd", prd, budget)}
+
+Milestones:
+{build_context("tasks", "milestones", mdoc, budget)}
+
+Rules:
+- Cover every milestone's deliverables
 """
-        mdoc_dict = call_llm_json(SYSTEM, revise_prompt)
 
-    # 4) Tasks + revise loop
-    tasks_prompt = f"""
-Using this PRD and Milestones, return TasksDoc JSON with keys:
-title, tasks (array). Each task: task_id, title, type, priority, estimate_hours, depends_on, acceptance_criteria.
+
+def _milestone_tasks_prompt(
+    prd: PRD,
+    mdoc: MilestonesDoc,
+    index: int,
+    min_tasks: int,
+    max_tasks: int,
+    budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+) -> str:
+    milestone = mdoc.milestones[index]
+    return f"""
+Using this PRD and milestone, return TasksDoc JSON.
 
 PRD:
-{json.dumps(prd.model_dump(), indent=2)}
+{build_context("tasks", "prd", prd, budget)}
 
-Milestones:
-{json.dumps(mdoc.model_dump(), indent=2)}
+All milestones (for context): {compact_json([m.name for m in mdoc.milestones])}
+
+Plan ONLY milestone {index + 1} of {len(mdoc.milestones)}:
+{compact_json(milestone.model_dump())}
 
 Rules:
-- Return 20–45 tasks
-- task_id like T001, T002, ...
-- type in: backend, frontend, data, ml, infra, docs, testing
-- priority in: P0, P1, P2
-- depends_on references earlier task_ids only
-- every task has >=1 acceptance_criteria
+- Return {min_tasks}–{max_tasks} tasks covering this milestone's deliverables only
+- Numbering starts at T001 for this milestone; depends_on uses these ids
+  (tasks without dependencies are scheduled after the previous milestone)
 """
-    tdoc_dict = call_llm_json(SYSTEM, tasks_prompt)
-    t_issues = []
+
+
+def _task_quota(n_milestones: int) -> Tuple[int, int]:
+    """
+    Per-milestone task range so the merged backlog lands within TASK_COUNT
+    (only possible for up to TASK_COUNT[1] milestones, one task each).
+    """
+    hi = max(1, TASK_COUNT[1] // n_milestones)
+    lo = min(math.ceil(TASK_COUNT[0] / n_milestones), hi)
+    return lo, hi
+
+
+def _can_fan_out(n_milestones: int) -> bool:
+    return 0 < n_milestones <= TASK_COUNT[1]
+
+
+def merge_milestone_tasks(title: str, parts: List[dict]) -> dict:
+    """
+    Merge per-milestone TasksDoc dicts into one TasksDoc dict.
+
+    Tasks are renumbered T001, T002, ... in milestone order, and each
+    depends_on entry is remapped from the milestone-local id to the new global
+    id. References that do not resolve within their milestone are dropped.
+    Milestones are sequential: each milestone's root tasks (no dependencies)
+    depend on the previous milestone's sink tasks (nothing depends on them).
+    """
+    merged: List[dict] = []
+    previous_sinks: List[str] = []
+    for part in parts:
+        local_to_global: Dict[str, str] = {}
+        tasks = part.get("tasks", []) if isinstance(part, dict) else []
+        milestone: List[dict] = []
+        for task in tasks:
+            global_id = f"T{len(merged) + len(milestone) + 1:03d}"
+            local_to_global[str(task.get("task_id", "")).strip()] = global_id
+            depends_on = [
+                local_to_global[d.strip()]
+                for d in task.get("depends_on", [])
+                if isinstance(d, str) and d.strip() in local_to_global
+            ]
+            milestone.append({**task, "task_id": global_id, "depends_on": depends_on or list(previous_sinks)})
+        if milestone:
+            depended_on = {d for task in milestone for d in task["depends_on"]}
+            previous_sinks = [t["task_id"] for t in milestone if t["task_id"] not in depended_on]
+        merged.extend(milestone)
+    return {"title": title, "tasks": merged}
+
+
+def _milestone_tasks_format(min_tasks: int, max_tasks: int) -> dict:
+    """TasksDoc response format for one milestone's share of the tasks."""
+    return schema_format(TasksDoc, {"tasks": {"minItems": min_tasks, "maxItems": max_tasks}})
+
+
+def _fanout_tasks(
+    prd: PRD, mdoc: MilestonesDoc, call: Callable[[str, dict], dict], budget: Optional[int] = DEFAULT_TOKEN_BUDGET
+) -> dict:
+    """
+    First tasks draft from one concurrent LLM call per milestone.
+
+    call(prompt, response_format) makes one request.
+    """
+    n = len(mdoc.milestones)
+    if not _can_fan_out(n):
+        return call(_tasks_prompt(prd, mdoc, budget), STAGE_FORMATS["tasks"])
+    lo, hi = _task_quota(n)
+    response_format = _milestone_tasks_format(lo, hi)
+    prompts = [_milestone_tasks_prompt(prd, mdoc, i, lo, hi, budget) for i in range(n)]
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        parts = list(pool.map(propagate(lambda prompt: call(prompt, response_format)), prompts))
+    return merge_milestone_tasks(f"{prd.title} Tasks", parts)
+
+
+async def _fanout_tasks_async(
+    prd: PRD,
+    mdoc: MilestonesDoc,
+    call: Callable[[str, dict], Awaitable[dict]],
+    budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+) -> dict:
+    n = len(mdoc.milestones)
+    if not _can_fan_out(n):
+        return await call(_tasks_prompt(prd, mdoc, budget), STAGE_FORMATS["tasks"])
+    lo, hi = _task_quota(n)
+    response_format = _milestone_tasks_format(lo, hi)
+    parts = await asyncio.gather(*(
+        call(_milestone_tasks_prompt(prd, mdoc, i, lo, hi, budget), response_format) for i in range(n)
+    ))
+    return merge_milestone_tasks(f"{prd.title} Tasks", list(parts))
+
+
+def _candidate_prompt(prompt: str, index: int) -> str:
+    """Prompt for candidate `index` (0-based) of a best-of-N draft; candidate 0 is the plain prompt."""
+    if index == 0:
+        return prompt
+    return f"{prompt}\nThis is independent draft #{index + 1}; make your own choices rather than the most obvious ones.\n"
+
+
+def _rank_candidate(model_cls: Type[DocT], doc_dict: dict, auto_repair: bool) -> int:
+    """Number of issues a candidate draft would start the revise loop with."""
+    _, issues = _check(model_cls, doc_dict, auto_repair, [])
+    return len(issues)
+
+
+class _Candidates:
+    """The best-ranked candidate draft so far, shared by _best_of and _best_of_async."""
+
+    def __init__(self, model_cls: Type[DocT], auto_repair: bool):
+        self.model_cls = model_cls
+        self.auto_repair = auto_repair
+        self.best: Optional[Tuple[int, int, dict]] = None
+        self.error: Optional[Exception] = None
+
+    def offer(self, index: int, result: Callable[[], dict]) -> bool:
+        """Rank candidate `index` (result() returns its draft or raises); True once one validates."""
+        try:
+            doc_dict = result()
+            n_issues = _rank_candidate(self.model_cls, doc_dict, self.auto_repair)
+        except Exception as e:
+            self.error = self.error or e
+            return False
+        if self.best is None or n_issues < self.best[0]:
+            self.best = (n_issues, index, doc_dict)
+        return n_issues == 0
+
+    def winner(self, n: int, **attributes: Any) -> dict:
+        """The best draft, recorded on the current span; the first error if every candidate failed."""
+        if self.best is None:
+            raise self.error
+        record(candidates=n, winner=self.best[1], winner_issues=self.best[0], **attributes)
+        return self.best[2]
+
+
+def _best_of(model_cls: Type[DocT], produce: Callable[[int], dict], n: int, auto_repair: bool = True) -> dict:
+    """
+    Generate n candidate drafts concurrently and return the first one that validates.
+
+    produce(i) generates candidate i. As soon as one candidate passes
+    validation it is returned. Losing calls already in flight cannot be
+    interrupted: they finish in the background, their replies are discarded,
+    and their count is recorded as `abandoned` (they still count against the
+    candidate budget, which is charged when the candidates are requested). If
+    none passes, the candidate with the fewest issues is returned for the
+    revise loop to fix. Candidates that fail to generate or parse are skipped;
+    the first error is raised if all of them do.
+    """
+    ranked = _Candidates(model_cls, auto_repair)
+    pool = ThreadPoolExecutor(max_workers=n, thread_name_prefix="candidate")
+    futures = {pool.submit(propagate(produce), i): i for i in range(n)}
+    try:
+        for future in as_completed(futures):
+            if ranked.offer(futures[future], future.result):
+                break
+    finally:
+        pool.shutdown(wait=False)
+    return ranked.winner(n, abandoned=sum(not f.done() for f in futures))
+
+
+async def _best_of_async(
+    model_cls: Type[DocT], produce: Callable[[int], Awaitable[dict]], n: int, auto_repair: bool = True
+) -> dict:
+    """Async twin of _best_of; pending candidates are cancelled once one validates."""
+    ranked = _Candidates(model_cls, auto_repair)
+    tasks = {asyncio.ensure_future(produce(i)): i for i in range(n)}
+    pending = set(tasks)
+    try:
+        found = False
+        while pending and not found:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=tasks.get):
+                found = ranked.offer(tasks[task], task.result) or found
+    finally:
+        for task in pending:
+            task.cancel()
+    return ranked.winner(n)
+
+
+def _revise_prompt(label: str, doc: BaseModel, issues: List[str]) -> str:
+    return f"""
+You previously returned this {label} JSON:
+{compact_json(doc.model_dump())}
+
+Issues:
+{compact_json(issues)}
+
+Fix with minimal changes. Return corrected {label} JSON ONLY with the same keys.
+"""
+
+
+def _patch_prompt(label: str, doc: BaseModel, issues: List[str]) -> str:
+    return f"""
+You previously returned this {label} JSON:
+{compact_json(doc.model_dump())}
+
+Issues:
+{compact_json(issues)}
+
+Fix ONLY the fields named in the issues. Do not return the document.
+Return JSON of the form {{"patch": [...]}} where "patch" is an RFC 6902 JSON Patch
+(ops: add, remove, replace) against the document above, with JSON Pointer paths
+such as "/tasks/3/priority" or "/functional_requirements/-".
+"""
+
+
+def _continue_prompt(label: str, partial: PartialDocument, missing: List[str]) -> str:
+    return f"""
+Your reply was cut off. You previously returned this {label} JSON:
+{compact_json(dict(partial))}
+
+Missing: the rest of {compact_json(missing)}. Do not return the document.
+Return JSON of the form {{"patch": [...]}} where "patch" is an RFC 6902 JSON Patch
+of "add" ops adding ONLY what is missing, with JSON Pointer paths such as
+"/tasks/-" to append an element or "/risks" for an absent field.
+"""
+
+
+def _continuation(model_cls: Type[DocT], partial: PartialDocument) -> Optional[Tuple[DocT, str]]:
+    """
+    (document, prompt) asking for the rest of a truncated draft as a patch, or
+    None if what arrived does not even parse as model_cls.
+    """
+    try:
+        doc = model_cls.model_validate(partial)
+    except ValidationError:
+        return None
+    missing = [name for name in model_cls.model_fields if name == partial.field or name not in partial]
+    return doc, _continue_prompt(model_cls.__name__, partial, missing)
+
+
+def _apply_revision(model_cls: Type[DocT], doc: DocT, response: dict) -> Optional[dict]:
+    """Apply a patch response to doc; None if it is empty, malformed or breaks the schema."""
+    patch = response.get("patch") if isinstance(response, dict) else None
+    if not patch:
+        return None
+    try:
+        patched = apply_patch(doc.model_dump(), patch)
+        model_cls.model_validate(patched)
+    except (PatchError, ValidationError):
+        return None
+    return patched
+
+
+def _check(model_cls: Type[DocT], doc_dict: dict, auto_repair: bool, repair_log: List[str]) -> Tuple[DocT, List[str]]:
+    """Parse, optionally auto-repair, and validate a document."""
+    validate, repair = _CHECKS[model_cls]
+    doc = model_cls.model_validate(doc_dict)
+    if auto_repair:
+        doc, changes = repair(doc)
+        repair_log.extend(changes)
+    return doc, validate(doc)
+
+
+# A revise loop's LLM request: (prompt, attempt, response_format)
+_Request = Tuple[str, int, Optional[dict]]
+
+
+def _revise_steps(
+    model_cls: Type[DocT],
+    doc_dict: dict,
+    *,
+    max_attempts: int,
+    revision_mode: str = "patch",
+    auto_repair: bool = True,
+    repair_log: Optional[List[str]] = None,
+    on_attempt: Optional[Callable[[int, List[str]], None]] = None,
+    on_draft: Optional[Callable[[DocT, List[str]], None]] = None,
+) -> Generator[_Request, dict, Tuple[DocT, List[str]]]:
+    """
+    The revise loop's decisions, without I/O: yields each LLM request and is
+    sent the reply. _revise_loop and _revise_loop_async only make the calls.
+    """
+    if isinstance(doc_dict, PartialDocument):
+        continuation = _continuation(model_cls, doc_dict)
+        if continuation is not None:
+            with span("continue", field=doc_dict.field):
+                doc, prompt = continuation
+                doc_dict = _apply_revision(model_cls, doc, (yield prompt, 1, None)) or doc_dict
+    repair_log = repair_log if repair_log is not None else []
+    issues: List[str] = []
+    label = model_cls.__name__
     for attempt in range(1, max_attempts + 1):
-        tdoc = TasksDoc.model_validate(tdoc_dict)
-        t_issues = validate_tasks(tdoc)
-        if not t_issues:
+        with span("validate", attempt=attempt):
+            doc, issues = _check(model_cls, doc_dict, auto_repair, repair_log)
+            record(issues=len(issues))
+        if on_attempt:
+            on_attempt(attempt, issues)
+        if on_draft and attempt == 1:
+            on_draft(doc, issues)
+        if not issues:
             break
         if attempt == max_attempts:
             break
-        revise_prompt = f"""
-You previously returned this TasksDoc JSON:
-{json.dumps(tdoc.model_dump(), indent=2)}
+        with span("revise", attempt=attempt + 1):
+            patched = None
+            if revision_mode == "patch":
+                patched = _apply_revision(model_cls, doc, (yield _patch_prompt(label, doc, issues), attempt + 1, None))
+            if patched is None:
+                patched = yield _revise_prompt(label, doc, issues), attempt + 1, schema_format(model_cls)
+            doc_dict = patched
+    return doc, issues
 
-Issues:
-{json.dumps(t_issues, indent=2)}
 
-Fix with minimal changes. Return corrected TasksDoc JSON ONLY.
-"""
-        tdoc_dict = call_llm_json(SYSTEM, revise_prompt)
+def _revise_loop(
+    model_cls: Type[DocT],
+    doc_dict: dict,
+    *,
+    call: Callable[[str, int, Optional[dict]], dict],
+    **options: Any,
+) -> Tuple[DocT, List[str]]:
+    """
+    Validate a generated document, asking the model to fix it up to max_attempts times.
 
+    Mechanical problems are repaired locally first (see repairs.py), so only
+    issues that remain after repair cost an LLM round trip. call(prompt,
+    attempt, response_format) gets the number of the attempt the reply will be
+    validated as, so the caller can route later attempts to a stronger model,
+    and the document's strict response format (None for patch replies, whose
+    values can be of any type). on_attempt is
+    called with (attempt, issues) after every validation, and on_draft with
+    the repaired first draft and its issues before any revision.
+
+    A truncated first draft (a PartialDocument, see json_recovery.py) is
+    completed by one extra call asking only for what is missing, before it
+    is validated; if that reply does not apply, the partial draft is kept.
+
+    Options (max_attempts, revision_mode, auto_repair, repair_log, on_attempt,
+    on_draft) are those of _revise_steps.
+    """
+    steps = _revise_steps(model_cls, doc_dict, **options)
+    try:
+        request = next(steps)
+        while True:
+            try:
+                reply = call(*request)
+            except BaseException as e:
+                request = steps.throw(e)
+            else:
+                request = steps.send(reply)
+    except StopIteration as done:
+        return done.value
+
+
+async def _revise_loop_async(
+    model_cls: Type[DocT],
+    first_draft: Awaitable[dict],
+    *,
+    call: Callable[[str, int, Optional[dict]], Awaitable[dict]],
+    **options: Any,
+) -> Tuple[DocT, List[str]]:
+    """Async twin of _revise_loop; awaits the first draft itself."""
+    with span("draft", attempt=1):
+        doc_dict = await first_draft
+    steps = _revise_steps(model_cls, doc_dict, **options)
+    try:
+        request = next(steps)
+        while True:
+            try:
+                reply = await call(*request)
+            except BaseException as e:
+                request = steps.throw(e)
+            else:
+                request = steps.send(reply)
+    except StopIteration as done:
+        return done.value
+
+
+def _hedge_key(stage: str, attempt: int) -> str:
+    """Latency bucket for hedging: drafts and revisions of a stage take very different times."""
+    return stage if attempt == 1 else f"{stage}:revise"
+
+
+def _call_options(
+    policy: RoutingPolicy, stage: str, attempt: int, timeout: Optional[float], use_cache: bool
+) -> Dict[str, Any]:
+    """
+    call_llm_json keyword arguments for one attempt of a stage: its route's
+    model, max tokens and timeout, unless the caller gave a timeout.
+    """
+    route = policy.route(stage, attempt)
+    return {
+        "model": route.model,
+        "max_tokens": route.max_tokens,
+        "timeout": timeout if timeout is not None else route.timeout,
+        "use_cache": use_cache,
+        "hedge_key": _hedge_key(stage, attempt),
+    }
+
+
+def _candidate_producer(call: Callable[..., Any], stage: str, prompt: str, produce: Optional[Callable[[int], Any]]):
+    """produce, or by default one call(stage, prompt, attempt, response_format) per candidate index."""
+    return produce or (lambda i: call(stage, _candidate_prompt(prompt, i), 1, STAGE_FORMATS[stage]))
+
+
+def _claim_speculation(speculated: Dict[str, Tuple[str, Any]], stage: str, prompt: str) -> Optional[Any]:
+    """
+    The pending speculative draft for `stage` if it was generated for
+    `prompt`; a stale one is cancelled and recorded as a miss.
+    """
+    guess = speculated.pop(stage, None)
+    if guess is None:
+        return None
+    guessed_prompt, pending = guess
+    if guessed_prompt != prompt:
+        pending.cancel()
+        record(speculation="miss")
+        return None
+    return pending
+
+
+class _RunLog:
+    """Writes one run's validation and stage events to a JSONL log (no-op without a path)."""
+
+    def __init__(self, log_path: Optional[str], run_id: Optional[str]):
+        self._log = get_event_logger(log_path).log if log_path else None
+        self.run_id = run_id or uuid.uuid4().hex
+
+    def attempts(self, stage: str) -> Optional[Callable[[int, List[str]], None]]:
+        if self._log is None:
+            return None
+        return lambda attempt, issues: self._log({
+            "ts": time.time(), "event": f"{stage}_validation", "run_id": self.run_id, "stage": stage,
+            "attempt": attempt, "issues": issues,
+        })
+
+    def stage_complete(self, stage: str, seconds: float, reused: bool, issues: List[str]) -> None:
+        if self._log is not None:
+            self._log({
+                "ts": time.time(), "event": "stage_complete", "run_id": self.run_id, "stage": stage,
+                "seconds": seconds, "reused": reused, "issues": issues,
+            })
+
+
+class _CandidateBudget:
+    """
+    Hands out best-of-N candidate counts per stage, within a per-run cap on
+    extra drafts. Every candidate handed out is charged, whether it wins,
+    loses or is abandoned in flight.
+    """
+
+    def __init__(self, candidates: Optional[Dict[str, int]], budget: Optional[int]):
+        for stage_name, n in (candidates or {}).items():
+            if stage_name not in CANDIDATE_STAGES:
+                raise ValueError(f"candidates stages must be in {tuple(CANDIDATE_STAGES)}, got {stage_name!r}.")
+            if n < 1:
+                raise ValueError(f"candidates[{stage_name!r}] must be at least 1, got {n}.")
+        if budget is not None and budget < 0:
+            raise ValueError(f"candidate_budget must be non-negative, got {budget}.")
+        self.candidates = dict(candidates or {})
+        self.remaining = budget
+
+    def take(self, stage: str) -> int:
+        n = self.candidates.get(stage, 1)
+        if self.remaining is not None:
+            n = min(n, 1 + self.remaining)
+            self.remaining -= n - 1
+        return n
+
+
+def _build_result(
+    gi: GoalInterpretation,
+    prd: PRD,
+    mdoc: MilestonesDoc,
+    tdoc: TasksDoc,
+    issues: Dict[str, List[str]],
+    duration_seconds: float,
+    stage_seconds: Dict[str, float],
+    store: RunStore,
+    repairs: Dict[str, List[str]],
+    context_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+    tracer: Optional[Tracer] = None,
+    trace_path: Optional[str] = None,
+) -> Dict[str, Any]:
     # Render artifacts (strings)
     prd_md = render_prd_md(prd)
     milestones_md = render_milestones_md(mdoc)
@@ -179,9 +622,18 @@ Fix with minimal changes. Return corrected TasksDoc JSON ONLY.
         w.writerow(r)
     tasks_csv = output.getvalue()
 
-    # Calculate total execution time
-    end_time = time.time()
-    duration_seconds = end_time - start_time
+    # Critical path over estimate_hours/depends_on (best-effort output may still have a cycle)
+    try:
+        schedule = critical_path(tdoc)
+    except ValueError:
+        schedule = None
+
+    spans = tracer.to_dicts() if tracer else []
+    if trace_path:
+        write_otlp_json(spans, trace_path)
+    route_stats = RouteStats()
+    route_stats.add_spans(spans)
+    global_route_stats().merge(route_stats)
 
     return {
         "goal": gi,
@@ -191,10 +643,463 @@ Fix with minimal changes. Return corrected TasksDoc JSON ONLY.
         "prd_md": prd_md,
         "milestones_md": milestones_md,
         "tasks_csv": tasks_csv,
+        "schedule": schedule,
+        "schedule_csv": schedule_csv(schedule) if schedule else "",
         "duration_seconds": duration_seconds,
-        "issues": {
-            "prd": prd_issues,
-            "milestones": m_issues,
-            "tasks": t_issues,
-        },
+        "stage_seconds": stage_seconds,
+        "issues": issues,
+        "repairs": repairs,
+        "run_id": store.run_id,
+        "reused_stages": list(store.reused),
+        "context_tokens": context_report(gi, prd, mdoc, context_budget),
+        "spans": spans,
+        "stage_metrics": summarize(spans),
+        "route_stats": route_stats.summary(),
     }
+
+
+def run_pipeline(
+    idea: str,
+    constraints: List[str],
+    max_attempts: int = 3,
+    use_cache: bool = True,
+    timeout: float | None = None,
+    run_id: Optional[str] = None,
+    run_dir: str = DEFAULT_RUN_DIR,
+    resume_from: Optional[str] = None,
+    prd_override: Optional[PRD] = None,
+    revision_mode: str = "patch",
+    auto_repair: bool = True,
+    tasks_fanout: bool = False,
+    on_stage: Optional[StageCallback] = None,
+    on_item: Optional[ItemCallback] = None,
+    log_path: Optional[str] = None,
+    context_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+    trace_path: Optional[str] = None,
+    routing: Optional[RoutingPolicy] = None,
+    speculative: bool = False,
+    candidates: Optional[Dict[str, int]] = None,
+    candidate_budget: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Turn an idea into a PRD, milestones and a task backlog.
+
+    Args:
+        idea: Free-text project idea
+        constraints: Constraints / preferences, one per item
+        max_attempts: Validation attempts per stage (including the first draft)
+        use_cache: Serve identical LLM requests from the response cache (stages
+            regenerated after an invalid checkpoint always bypass it)
+        timeout: Per-call timeout in seconds, taking precedence over the
+            routing policy's (default: the route's, else LLM_REQUEST_TIMEOUT)
+        run_id: Checkpoint each stage under run_dir/run_id. Rerunning with the
+            same id only regenerates stages whose inputs changed (or whose
+            checkpoint is missing/invalid); the rest are reused.
+        run_dir: Root directory for checkpoints
+        resume_from: Regenerate from this stage ("goal", "prd", "milestones",
+            "tasks") even if later checkpoints exist
+        prd_override: A user-edited PRD to use as-is instead of generating one;
+            milestones and tasks are regenerated from it
+        revision_mode: "patch" to have revise rounds return a JSON Patch of the
+            flagged fields (falling back to a full rewrite), or "full"
+        auto_repair: Apply deterministic fixes (repairs.py) before asking the
+            model to revise; the changes are reported under result["repairs"]
+        tasks_fanout: Generate the first tasks draft with one concurrent call per
+            milestone and merge them, instead of one large completion
+        on_stage: Called as on_stage(stage, doc, issues) as soon as each stage
+            ("goal", "prd", "milestones", "tasks") is validated or reused, so
+            callers can render results before the whole run finishes
+        on_item: Stream each stage's first draft and call on_item(stage, field,
+            element) for every array element (e.g. ("tasks", "tasks", {...}))
+            as soon as it has been generated
+        log_path: Append "<stage>_validation" events (one per attempt) and
+            "stage_complete" events to this JSONL log (see event_store.py)
+        context_budget: Max tokens per upstream document embedded in a prompt;
+            longer lists are trimmed (see prompt_context.py). Defaults to
+            PROMPT_CONTEXT_TOKENS, or no limit.
+        trace_path: Also write the run's spans (result["spans"]) to this file
+            as OpenTelemetry OTLP/JSON (see tracing.py)
+        routing: Model, max tokens and timeout per stage and attempt, with
+            escalation to stronger models after failed validations (see
+            routing.py). Defaults to LLM_ROUTING, else the built-in ladder.
+            Per-model call and validation stats are in result["route_stats"].
+        speculative: When a PRD or milestones first draft fails validation,
+            start the next stage's first draft from it while the revision
+            runs. The speculative draft is used if the revised document yields
+            the same downstream prompt (the revision only touched fields that
+            stage does not see) and discarded otherwise.
+        candidates: Best-of-N first drafts per stage, e.g. {"tasks": 3}: N
+            independent drafts are requested concurrently, the first one that
+            passes validation is used and the rest are discarded (requests
+            still in flight finish in the background). If none passes, the
+            one with the fewest issues goes through the revise loop.
+        candidate_budget: Max extra candidate drafts (beyond one per stage)
+            for the whole run, counting every draft requested, including
+            discarded ones; later stages get fewer candidates once it is
+            spent. Defaults to no limit.
+    """
+    if revision_mode not in REVISION_MODES:
+        raise ValueError(f"revision_mode must be one of {REVISION_MODES}, got {revision_mode!r}.")
+    start_time = time.perf_counter()
+    tracer = Tracer()
+    stage_seconds: Dict[str, float] = {}
+    store = RunStore(run_id, run_dir, resume_from)
+    run_log = _RunLog(log_path, run_id)
+    repairs: Dict[str, List[str]] = {"prd": [], "milestones": [], "tasks": []}
+    policy = routing or load_policy()
+    budget = _CandidateBudget(candidates, candidate_budget)
+
+    def options(stage_name: str, attempt: int) -> Dict[str, Any]:
+        return _call_options(policy, stage_name, attempt, timeout, use_cache and not store.regenerating())
+
+    def call(stage_name: str, prompt: str, attempt: int = 1, response_format: Optional[dict] = None) -> dict:
+        return call_llm_json(SYSTEM, prompt, response_format=response_format, **options(stage_name, attempt))
+
+    def generate(stage_name: str, prompt: str) -> dict:
+        if on_item is None:
+            return call(stage_name, prompt, 1, STAGE_FORMATS[stage_name])
+        return call_llm_json_stream(
+            SYSTEM, prompt, on_item=partial(on_item, stage_name), response_format=STAGE_FORMATS[stage_name],
+            **options(stage_name, 1),
+        )
+
+    # Speculative first drafts by stage: (prompt they were generated for, pending result)
+    speculated: Dict[str, Tuple[str, Future]] = {}
+    spec_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculative") if speculative else None
+
+    def speculate(stage_name: str, prompt: str, produce: Optional[Callable[[int], dict]] = None) -> None:
+        produce = _candidate_producer(call, stage_name, prompt, produce)
+
+        def run() -> dict:
+            with span("speculate", stage=stage_name, attempt=1):
+                return produce(0)
+        speculated[stage_name] = (prompt, spec_pool.submit(propagate(run)))
+
+    def replay(stage_name: str, data: dict) -> dict:
+        if on_item:
+            for field, item in replay_items(data):
+                on_item(stage_name, field, item)
+        return data
+
+    def draft(stage_name: str, prompt: str, produce: Optional[Callable[[int], dict]] = None) -> dict:
+        """
+        First draft for `prompt`: a matching speculative draft when there is
+        one, else produce(candidate) (default: one call), best-of-N if configured.
+        """
+        with span("draft", attempt=1):
+            future = _claim_speculation(speculated, stage_name, prompt)
+            if future is not None:
+                if future.exception() is None:
+                    record(speculation="hit")
+                    return replay(stage_name, future.result())
+                record(speculation="failed")
+            n = budget.take(stage_name)
+            if n == 1 and produce is None:
+                return generate(stage_name, prompt)
+            produce = _candidate_producer(call, stage_name, prompt, produce)
+            if n == 1:
+                return replay(stage_name, produce(0))
+
+            def candidate(i: int) -> dict:
+                with span("candidate", index=i):
+                    return produce(i)
+
+            return replay(stage_name, _best_of(CANDIDATE_STAGES[stage_name], candidate, n, auto_repair))
+
+    def revise(
+        model_cls: Type[DocT], doc_dict: dict, stage_name: str, on_draft: Optional[Callable] = None
+    ) -> Tuple[DocT, List[str]]:
+        return _revise_loop(
+            model_cls, doc_dict, max_attempts=max_attempts, call=partial(call, stage_name),
+            revision_mode=revision_mode, auto_repair=auto_repair,
+            repair_log=repairs[stage_name], on_attempt=run_log.attempts(stage_name),
+            on_draft=on_draft if speculative else None,
+        )
+
+    def fanout(prd: PRD, mdoc: MilestonesDoc, candidate: int = 0) -> dict:
+        return _fanout_tasks(
+            prd, mdoc, lambda p, response_format: call("tasks", _candidate_prompt(p, candidate), 1, response_format),
+            context_budget,
+        )
+
+    def speculate_milestones(prd_draft: PRD, issues: List[str]) -> None:
+        if issues:
+            speculate("milestones", _milestones_prompt(prd_draft, context_budget))
+
+    def speculate_tasks(mdoc_draft: MilestonesDoc, issues: List[str]) -> None:
+        if issues:
+            produce = partial(fanout, prd, mdoc_draft) if tasks_fanout else None
+            speculate("tasks", _tasks_prompt(prd, mdoc_draft, context_budget), produce)
+
+    def stage(name: str, inputs: Tuple, produce: Callable[[], Tuple[Any, List[str]]], reuse: bool = True):
+        t0 = time.perf_counter()
+        with tracer.activate(), span("stage", stage=name):
+            inputs_fp = fingerprint(*inputs)
+            outcome = store.load(name, inputs_fp) if reuse else None
+            reused = outcome is not None
+            record(reused=reused)
+            if outcome is None:
+                outcome = produce()
+                store.save(name, *outcome, inputs_fp)
+        stage_seconds[name] = time.perf_counter() - t0
+        run_log.stage_complete(name, stage_seconds[name], reused, outcome[1])
+        if on_stage:
+            on_stage(name, *outcome)
+        return outcome
+
+    try:
+        # 1) GoalInterpretation
+        gi, _ = stage("goal", (idea, constraints), lambda: (
+            GoalInterpretation.model_validate(draft("goal", _goal_prompt(idea, constraints))), []
+        ))
+
+        # 2) PRD + revise loop (or the user's edited PRD, taken as-is)
+        if prd_override is not None:
+            prd, prd_issues = stage("prd", (gi,), lambda: (prd_override, validate_prd(prd_override)), reuse=False)
+        else:
+            prd, prd_issues = stage("prd", (gi,), lambda: revise(
+                PRD, draft("prd", _prd_prompt(gi, context_budget)), "prd", on_draft=speculate_milestones
+            ))
+
+        # 3) Milestones + revise loop
+        mdoc, m_issues = stage("milestones", (prd,), lambda: revise(
+            MilestonesDoc, draft("milestones", _milestones_prompt(prd, context_budget)), "milestones",
+            on_draft=speculate_tasks,
+        ))
+
+        # 4) Tasks + revise loop
+        def tasks_draft() -> dict:
+            prompt = _tasks_prompt(prd, mdoc, context_budget)
+            return draft("tasks", prompt, partial(fanout, prd, mdoc) if tasks_fanout else None)
+
+        tdoc, t_issues = stage("tasks", (prd, mdoc), lambda: revise(TasksDoc, tasks_draft(), "tasks"))
+    finally:
+        # Drop speculative drafts nobody used, also when a stage raised
+        if spec_pool is not None:
+            spec_pool.shutdown(wait=False, cancel_futures=True)
+
+    # Calculate total execution time
+    duration_seconds = time.perf_counter() - start_time
+
+    return _build_result(
+        gi, prd, mdoc, tdoc,
+        {"prd": prd_issues, "milestones": m_issues, "tasks": t_issues},
+        duration_seconds,
+        stage_seconds,
+        store,
+        repairs,
+        context_budget,
+        tracer,
+        trace_path,
+    )
+
+
+
+def iter_pipeline(
+    idea: str, constraints: List[str], stream_items: bool = False, **kwargs: Any
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Run run_pipeline in a worker thread and yield results as they become available.
+
+    Yields ("goal", GoalInterpretation), ("prd", PRD), ("milestones", MilestonesDoc)
+    and ("tasks", TasksDoc) as each stage validates, then ("result", result_dict).
+    With stream_items=True, ("item", (stage, field, element)) events are also
+    yielded while each first draft is still being generated (see on_item).
+    Exceptions raised by the pipeline are re-raised from the generator.
+
+        for stage, value in iter_pipeline(idea, constraints):
+            ...
+
+    Keyword arguments are passed through to run_pipeline (except on_stage and on_item).
+    """
+    events: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+
+    def worker() -> None:
+        try:
+            result = run_pipeline(
+                idea,
+                constraints,
+                on_stage=lambda name, doc, _: events.put((name, doc)),
+                on_item=(lambda *item: events.put(("item", item))) if stream_items else None,
+                **kwargs,
+            )
+        except BaseException as e:
+            events.put(("error", e))
+        else:
+            events.put(("result", result))
+
+    threading.Thread(target=worker, name="pipeline", daemon=True).start()
+    while True:
+        name, value = events.get()
+        if name == "error":
+            raise value
+        yield name, value
+        if name == "result":
+            return
+
+async def run_pipeline_async(
+    idea: str,
+    constraints: List[str],
+    max_attempts: int = 3,
+    use_cache: bool = True,
+    timeout: float | None = None,
+    run_id: Optional[str] = None,
+    run_dir: str = DEFAULT_RUN_DIR,
+    resume_from: Optional[str] = None,
+    prd_override: Optional[PRD] = None,
+    revision_mode: str = "patch",
+    auto_repair: bool = True,
+    tasks_fanout: bool = False,
+    on_stage: Optional[StageCallback] = None,
+    log_path: Optional[str] = None,
+    context_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+    trace_path: Optional[str] = None,
+    routing: Optional[RoutingPolicy] = None,
+    speculative: bool = False,
+    candidates: Optional[Dict[str, int]] = None,
+    candidate_budget: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Asyncio variant of run_pipeline with the same result dict shape.
+
+    LLM calls go through call_llm_json_async, which bounds in-flight requests
+    with a shared semaphore, so many plans can be gathered in one event loop:
+
+        results = await asyncio.gather(*(run_pipeline_async(i, c) for i in ideas))
+
+    Arguments are as in run_pipeline.
+    """
+    if revision_mode not in REVISION_MODES:
+        raise ValueError(f"revision_mode must be one of {REVISION_MODES}, got {revision_mode!r}.")
+    start_time = time.perf_counter()
+    tracer = Tracer()
+    stage_seconds: Dict[str, float] = {}
+    store = RunStore(run_id, run_dir, resume_from)
+    run_log = _RunLog(log_path, run_id)
+    repairs: Dict[str, List[str]] = {"prd": [], "milestones": [], "tasks": []}
+    policy = routing or load_policy()
+    budget = _CandidateBudget(candidates, candidate_budget)
+
+    async def call(stage_name: str, prompt: str, attempt: int = 1, response_format: Optional[dict] = None) -> dict:
+        return await call_llm_json_async(
+            SYSTEM, prompt, response_format=response_format,
+            **_call_options(policy, stage_name, attempt, timeout, use_cache and not store.regenerating()),
+        )
+
+    speculated: Dict[str, Tuple[str, "asyncio.Task[dict]"]] = {}
+
+    def speculate(stage_name: str, prompt: str, produce: Optional[Callable[[int], Awaitable[dict]]] = None) -> None:
+        produce = _candidate_producer(call, stage_name, prompt, produce)
+
+        async def run() -> dict:
+            with span("speculate", stage=stage_name, attempt=1):
+                return await produce(0)
+        speculated[stage_name] = (prompt, asyncio.ensure_future(run()))
+
+    async def draft(stage_name: str, prompt: str, produce: Optional[Callable[[int], Awaitable[dict]]] = None) -> dict:
+        task = _claim_speculation(speculated, stage_name, prompt)
+        if task is not None:
+            try:
+                data = await task
+            except Exception:
+                record(speculation="failed")
+            else:
+                record(speculation="hit")
+                return data
+        n = budget.take(stage_name)
+        produce = _candidate_producer(call, stage_name, prompt, produce)
+        if n == 1:
+            return await produce(0)
+
+        async def candidate(i: int) -> dict:
+            with span("candidate", index=i):
+                return await produce(i)
+
+        return await _best_of_async(CANDIDATE_STAGES[stage_name], candidate, n, auto_repair)
+
+    async def revise(
+        model_cls: Type[DocT], first_draft: Awaitable[dict], stage_name: str, on_draft: Optional[Callable] = None
+    ) -> Tuple[DocT, List[str]]:
+        return await _revise_loop_async(
+            model_cls, first_draft, max_attempts=max_attempts, call=partial(call, stage_name),
+            revision_mode=revision_mode, auto_repair=auto_repair,
+            repair_log=repairs[stage_name], on_attempt=run_log.attempts(stage_name),
+            on_draft=on_draft if speculative else None,
+        )
+
+    def fanout(prd: PRD, mdoc: MilestonesDoc, candidate: int = 0) -> Awaitable[dict]:
+        return _fanout_tasks_async(
+            prd, mdoc, lambda p, response_format: call("tasks", _candidate_prompt(p, candidate), 1, response_format),
+            context_budget,
+        )
+
+    def speculate_milestones(prd_draft: PRD, issues: List[str]) -> None:
+        if issues:
+            speculate("milestones", _milestones_prompt(prd_draft, context_budget))
+
+    def speculate_tasks(mdoc_draft: MilestonesDoc, issues: List[str]) -> None:
+        if issues:
+            produce = partial(fanout, prd, mdoc_draft) if tasks_fanout else None
+            speculate("tasks", _tasks_prompt(prd, mdoc_draft, context_budget), produce)
+
+    async def stage(name: str, inputs: Tuple, produce: Callable[[], Awaitable[Tuple[Any, List[str]]]], reuse: bool = True):
+        t0 = time.perf_counter()
+        with tracer.activate(), span("stage", stage=name):
+            inputs_fp = fingerprint(*inputs)
+            outcome = store.load(name, inputs_fp) if reuse else None
+            reused = outcome is not None
+            record(reused=reused)
+            if outcome is None:
+                outcome = await produce()
+                store.save(name, *outcome, inputs_fp)
+        stage_seconds[name] = time.perf_counter() - t0
+        run_log.stage_complete(name, stage_seconds[name], reused, outcome[1])
+        if on_stage:
+            on_stage(name, *outcome)
+        return outcome
+
+    async def goal():
+        with span("draft", attempt=1):
+            data = await draft("goal", _goal_prompt(idea, constraints))
+            return GoalInterpretation.model_validate(data), []
+
+    async def edited_prd():
+        return prd_override, validate_prd(prd_override)
+
+    try:
+        gi, _ = await stage("goal", (idea, constraints), goal)
+
+        if prd_override is not None:
+            prd, prd_issues = await stage("prd", (gi,), edited_prd, reuse=False)
+        else:
+            prd, prd_issues = await stage("prd", (gi,), lambda: revise(
+                PRD, draft("prd", _prd_prompt(gi, context_budget)), "prd", on_draft=speculate_milestones
+            ))
+
+        mdoc, m_issues = await stage("milestones", (prd,), lambda: revise(
+            MilestonesDoc, draft("milestones", _milestones_prompt(prd, context_budget)), "milestones",
+            on_draft=speculate_tasks,
+        ))
+
+        async def tasks_draft() -> dict:
+            prompt = _tasks_prompt(prd, mdoc, context_budget)
+            return await draft("tasks", prompt, partial(fanout, prd, mdoc) if tasks_fanout else None)
+
+        tdoc, t_issues = await stage("tasks", (prd, mdoc), lambda: revise(TasksDoc, tasks_draft(), "tasks"))
+    finally:
+        for _, task in speculated.values():
+            task.cancel()
+
+    duration_seconds = time.perf_counter() - start_time
+
+    return _build_result(
+        gi, prd, mdoc, tdoc,
+        {"prd": prd_issues, "milestones": m_issues, "tasks": t_issues},
+        duration_seconds,
+        stage_seconds,
+        store,
+        repairs,
+        context_budget,
+        tracer,
+        trace_path,
+    )
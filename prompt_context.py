@@ -0,0 +1,121 @@
+# prompt_context.py
+"""
+Compact, field-pruned upstream context for stage prompts.
+
+Each downstream stage only sees the upstream fields it uses (the tasks stage
+does not need the PRD's risks or open_questions), serialized as minified JSON.
+With a token budget, the longest string lists are trimmed from the end, and
+a "(+N more)" marker is left in place of the dropped items, until the
+context fits.
+
+Token counts use tiktoken when it is installed and a ~4 characters/token
+estimate otherwise.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # not installed, or the encoding cannot be loaded offline
+    _ENCODING = None
+
+# Upper bound on tokens per embedded document (unset or 0 = no limit)
+DEFAULT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKENS", "0")) or None
+
+# Upstream fields each prompt embeds, per document kind (None = all fields)
+STAGE_FIELDS: Dict[str, Dict[str, Optional[List[str]]]] = {
+    "prd": {"goal": None},
+    "milestones": {"prd": [
+        "title", "problem", "goals", "non_goals", "user_stories",
+        "functional_requirements", "nonfunctional_requirements", "risks",
+    ]},
+    "tasks": {
+        "prd": ["title", "goals", "non_goals", "functional_requirements", "nonfunctional_requirements"],
+        "milestones": None,
+    },
+}
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def compact_json(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def _string_lists(node: Any, found: List[list]) -> List[list]:
+    """All lists of strings inside `node` (the containers themselves, for in-place trimming)."""
+    if isinstance(node, dict):
+        for value in node.values():
+            _string_lists(value, found)
+    elif isinstance(node, list):
+        if node and all(isinstance(x, str) for x in node):
+            found.append(node)
+        else:
+            for value in node:
+                _string_lists(value, found)
+    return found
+
+
+def _trim_to_budget(data: Dict[str, Any], budget: int) -> Dict[str, Any]:
+    lists = _string_lists(data, [])
+    omitted = {id(lst): 0 for lst in lists}
+    while count_tokens(compact_json(data)) > budget:
+        # Trim the longest list that still has more than one real item
+        candidates = [lst for lst in lists if len(lst) - (1 if omitted[id(lst)] else 0) > 1]
+        if not candidates:
+            break
+        lst = max(candidates, key=lambda x: len(compact_json(x)))
+        if omitted[id(lst)]:
+            lst.pop()  # the marker
+        lst.pop()
+        omitted[id(lst)] += 1
+        lst.append(f"(+{omitted[id(lst)]} more)")
+    return data
+
+
+def build_context(stage: str, kind: str, doc: BaseModel, budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    Minified JSON of `doc` as embedded in the `stage` prompt.
+
+    Args:
+        stage: Stage whose prompt embeds the document ("prd", "milestones", "tasks")
+        kind: Which upstream document it is ("goal", "prd", "milestones")
+        doc: The upstream document
+        budget: Maximum tokens for this document, or None for no limit
+    """
+    fields = STAGE_FIELDS[stage][kind]
+    data = doc.model_dump(include=set(fields) if fields is not None else None)
+    if budget:
+        data = _trim_to_budget(data, budget)
+    return compact_json(data)
+
+
+def context_report(
+    gi: BaseModel, prd: BaseModel, mdoc: BaseModel, budget: Optional[int] = DEFAULT_TOKEN_BUDGET
+) -> Dict[str, Dict[str, float]]:
+    """
+    Per-stage upstream context tokens: pretty-printed full documents (as the
+    prompts used to embed them) vs the compact, pruned context.
+    """
+    upstream = {"goal": gi, "prd": prd, "milestones": mdoc}
+    report: Dict[str, Dict[str, float]] = {}
+    for stage, kinds in STAGE_FIELDS.items():
+        full = sum(count_tokens(json.dumps(upstream[k].model_dump(), indent=2)) for k in kinds)
+        compact = sum(count_tokens(build_context(stage, k, upstream[k], budget)) for k in kinds)
+        report[stage] = {
+            "full_tokens": full,
+            "compact_tokens": compact,
+            "saved_pct": round(100 * (1 - compact / full), 1) if full else 0.0,
+        }
+    return report
@@ -0,0 +1,156 @@
+# repairs.py
+"""
+Deterministic fixes applied before spending an LLM revise round.
+
+Each repair_* function returns a repaired copy of the document plus a list of
+human-readable changes. Only mechanical, meaning-preserving fixes are made
+(normalizing enum spellings, clamping numbers, dropping dangling references,
+trimming over-long lists); anything semantic is left to the validators and
+the revise prompt.
+"""
+from __future__ import annotations
+from typing import List, Tuple
+
+from schemas import PRD, MilestonesDoc, TasksDoc
+from validators import (
+    ALLOWED_PRIORITIES,
+    ALLOWED_TYPES,
+    MILESTONE_COUNT,
+    MILESTONE_EST_DAYS,
+    PRD_LIST_BOUNDS,
+    TASK_COUNT,
+    TASK_ESTIMATE_HOURS,
+)
+
+PRIORITY_ALIASES = {
+    "p0": "P0", "0": "P0", "critical": "P0", "urgent": "P0", "high": "P0", "highest": "P0", "must": "P0",
+    "p1": "P1", "1": "P1", "medium": "P1", "normal": "P1", "should": "P1",
+    "p2": "P2", "2": "P2", "low": "P2", "lowest": "P2", "could": "P2", "nice to have": "P2",
+}
+
+TYPE_ALIASES = {
+    "back-end": "backend", "back end": "backend", "api": "backend", "server": "backend",
+    "front-end": "frontend", "front end": "frontend", "ui": "frontend", "client": "frontend",
+    "database": "data", "db": "data", "analytics": "data",
+    "ai": "ml", "machine learning": "ml", "ml/ai": "ml",
+    "devops": "infra", "ops": "infra", "infrastructure": "infra", "deployment": "infra", "ci": "infra",
+    "setup": "infra",
+    "doc": "docs", "documentation": "docs",
+    "test": "testing", "tests": "testing", "qa": "testing", "quality": "testing",
+}
+
+
+def _clean_items(items: List[str]) -> List[str]:
+    return [x.strip() for x in items if x.strip()]
+
+
+def repair_prd(prd: PRD) -> Tuple[PRD, List[str]]:
+    changes: List[str] = []
+    data = prd.model_dump()
+
+    for field in ("title", "problem"):
+        if data[field] != data[field].strip():
+            data[field] = data[field].strip()
+            changes.append(f"Stripped whitespace from {field}.")
+
+    for field in ("target_users", "goals", "non_goals", "user_stories", "functional_requirements",
+                  "nonfunctional_requirements", "risks", "open_questions"):
+        cleaned = _clean_items(data[field])
+        if len(cleaned) != len(data[field]):
+            changes.append(f"Removed {len(data[field]) - len(cleaned)} empty item(s) from {field}.")
+        data[field] = cleaned
+
+    for field, (_, hi) in PRD_LIST_BOUNDS.items():
+        if len(data[field]) > hi:
+            changes.append(f"Trimmed {field} from {len(data[field])} to {hi} items.")
+            data[field] = data[field][:hi]
+
+    return PRD.model_validate(data), changes
+
+
+def repair_milestones(mdoc: MilestonesDoc) -> Tuple[MilestonesDoc, List[str]]:
+    changes: List[str] = []
+    data = mdoc.model_dump()
+
+    hi = MILESTONE_COUNT[1]
+    if len(data["milestones"]) > hi:
+        changes.append(f"Trimmed milestones from {len(data['milestones'])} to {hi}.")
+        data["milestones"] = data["milestones"][:hi]
+
+    lo_days, hi_days = MILESTONE_EST_DAYS
+    for idx, m in enumerate(data["milestones"], 1):
+        m["name"] = m["name"].strip()
+        m["objective"] = m["objective"].strip()
+        m["deliverables"] = _clean_items(m["deliverables"])
+        clamped = min(max(m["est_days"], lo_days), hi_days)
+        if clamped != m["est_days"]:
+            changes.append(f"Milestone {idx} est_days clamped from {m['est_days']} to {clamped}.")
+            m["est_days"] = clamped
+
+    return MilestonesDoc.model_validate(data), changes
+
+
+def _normalize_priority(value: str) -> str:
+    if value in ALLOWED_PRIORITIES:
+        return value
+    key = value.strip().lower()
+    return PRIORITY_ALIASES.get(key, value)
+
+
+def _normalize_type(value: str) -> str:
+    if value in ALLOWED_TYPES:
+        return value
+    key = value.strip().lower()
+    if key in ALLOWED_TYPES:
+        return key
+    return TYPE_ALIASES.get(key, value)
+
+
+def repair_tasks(tdoc: TasksDoc) -> Tuple[TasksDoc, List[str]]:
+    changes: List[str] = []
+    data = tdoc.model_dump()
+    tasks = data["tasks"]
+
+    hi = TASK_COUNT[1]
+    if len(tasks) > hi:
+        changes.append(f"Trimmed tasks from {len(tasks)} to {hi}.")
+        tasks = data["tasks"] = tasks[:hi]
+
+    for t in tasks:
+        t["task_id"] = t["task_id"].strip()
+    id_set = {t["task_id"] for t in tasks}
+
+    lo_h, hi_h = TASK_ESTIMATE_HOURS
+    for t in tasks:
+        tid = t["task_id"]
+
+        priority = _normalize_priority(t["priority"])
+        if priority != t["priority"]:
+            changes.append(f"Task {tid} priority '{t['priority']}' normalized to '{priority}'.")
+            t["priority"] = priority
+
+        type_ = _normalize_type(t["type"])
+        if type_ != t["type"]:
+            changes.append(f"Task {tid} type '{t['type']}' normalized to '{type_}'.")
+            t["type"] = type_
+
+        hours = min(max(t["estimate_hours"], lo_h), hi_h)
+        if hours != t["estimate_hours"]:
+            changes.append(f"Task {tid} estimate_hours clamped from {t['estimate_hours']} to {hours}.")
+            t["estimate_hours"] = hours
+
+        deps: List[str] = []
+        for dep in (d.strip() for d in t["depends_on"]):
+            if dep == tid:
+                changes.append(f"Task {tid} self-dependency removed.")
+            elif dep not in id_set:
+                changes.append(f"Task {tid} dependency on unknown id '{dep}' removed.")
+            elif dep in deps:
+                changes.append(f"Task {tid} duplicate dependency '{dep}' removed.")
+            else:
+                deps.append(dep)
+        t["depends_on"] = deps
+
+        t["acceptance_criteria"] = _clean_items(t["acceptance_criteria"])
+
+    return TasksDoc.model_validate(data), changes
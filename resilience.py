@@ -0,0 +1,463 @@
+# resilience.py
+"""
+Deadlines, retries, hedged requests and a circuit breaker for LLM calls.
+
+Every uncached call_llm_json* request goes through the current Resilience
+(see get_resilience()):
+
+- deadline: the whole call, retries and hedges included, raises TimeoutError
+  after `deadline` seconds (600 by default, LLM_DEADLINE=0 disables it); each
+  attempt's timeout is capped at what is left
+- retries: transient errors (connection errors, timeouts, 408/409/429/5xx
+  responses, invalid JSON from the model, TransientError) are retried up to
+  `retries` times with exponential backoff and full jitter
+- hedging: once an attempt has run longer than the observed p95 latency of
+  its model and hedge key (e.g. the pipeline stage, so short patches and long
+  drafts are not mixed), a duplicate request is sent and whichever succeeds
+  first wins
+- circuit breaker: after `breaker_failures` consecutive transient failures
+  of a model, calls to it fail fast with CircuitOpenError for
+  `breaker_reset` seconds; then one trial call decides whether it closes.
+  Unusable replies (InvalidReplyError, e.g. invalid JSON) are retried but do
+  not count: the model did answer
+
+Attempts, hedges and retries are recorded on the call's "llm" span (see
+tracing.py). Defaults come from the LLM_RETRIES, LLM_BACKOFF_BASE,
+LLM_BACKOFF_MAX, LLM_DEADLINE, LLM_HEDGE, LLM_HEDGE_MIN_DELAY,
+LLM_BREAKER_FAILURES and LLM_BREAKER_RESET env vars; tests and benchmarks
+install their own with use_resilience(Resilience(ResiliencePolicy(...))).
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Iterator, Optional, Tuple, TypeVar
+
+import httpx
+import openai
+
+from tracing import propagate, record
+
+RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+DEADLINE = float(os.getenv("LLM_DEADLINE", "600")) or None
+HEDGE = os.getenv("LLM_HEDGE", "1").lower() not in ("0", "false", "no")
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+T = TypeVar("T")
+
+_RETRYABLE_STATUS = {408, 409, 429}
+
+
+class TransientError(RuntimeError):
+    """A failure worth retrying; raise (or subclass) it from custom backends."""
+
+
+class InvalidReplyError(TransientError):
+    """
+    The model answered, but the reply is unusable (e.g. invalid JSON). Retried
+    like any transient error, but not counted by the circuit breaker.
+    """
+
+
+class CircuitOpenError(RuntimeError):
+    """Calls to a model are failing fast after repeated transient failures."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed attempt may succeed if sent again."""
+    if isinstance(error, (TransientError, TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, openai.APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in _RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    """
+    Args:
+        retries: Extra attempts after a transient failure (0 disables retries)
+        backoff_base: Backoff cap before the first retry, doubled per retry
+        backoff_max: Upper bound on the backoff cap
+        deadline: Seconds for the whole call (None: no deadline; defaults to
+            LLM_DEADLINE, 600s)
+        hedge: Send a duplicate request when an attempt outlives the p95 latency
+        hedge_quantile: Latency quantile an attempt must exceed to be hedged
+        hedge_min_samples: Successful calls of a model needed before hedging it
+        hedge_min_delay: Never hedge earlier than this many seconds
+        breaker_failures: Consecutive transient failures that open a model's
+            circuit (0 disables the breaker)
+        breaker_reset: Seconds a circuit stays open before a trial call
+    """
+    retries: int = RETRIES
+    backoff_base: float = BACKOFF_BASE
+    backoff_max: float = BACKOFF_MAX
+    deadline: Optional[float] = DEADLINE
+    hedge: bool = HEDGE
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = HEDGE_MIN_DELAY
+    breaker_failures: int = BREAKER_FAILURES
+    breaker_reset: float = BREAKER_RESET
+
+    def __post_init__(self):
+        if self.retries < 0:
+            raise ValueError("retries must be non-negative.")
+        if not 0 < self.hedge_quantile < 1:
+            raise ValueError("hedge_quantile must be between 0 and 1.")
+
+
+class CircuitBreaker:
+    """Closed → open after `failures` consecutive failures → half-open after `reset_seconds`."""
+
+    def __init__(self, failures: int, reset_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._trial or self._clock() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (only one trial call while half-open)."""
+        if self.failures <= 0:
+            return True
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or self._clock() - self._opened_at < self.reset_seconds:
+                return False
+            self._trial = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            if self._trial or (self.failures > 0 and self._consecutive >= self.failures):
+                self._opened_at = self._clock()
+            self._trial = False
+
+
+class LatencyTracker:
+    """Rolling window of successful attempt latencies per key (e.g. (model, stage))."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[Hashable, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: Hashable, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def count(self, key: Hashable) -> int:
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def quantile(self, key: Hashable, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def _spawn(fn: Callable[..., T], *args) -> "Future[T]":
+    """
+    Run fn(*args) in a daemon thread. Unlike executor workers, an abandoned
+    attempt stuck on a stalled connection cannot hold up interpreter exit.
+    """
+    future: "Future[T]" = Future()
+    call = propagate(fn)
+
+    def run() -> None:
+        try:
+            future.set_result(call(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="llm-attempt", daemon=True).start()
+    return future
+
+
+class Resilience:
+    """
+    Applies a ResiliencePolicy, keeping a circuit breaker per model and
+    latency stats per (model, hedge key).
+    """
+
+    def __init__(self, policy: Optional[ResiliencePolicy] = None, clock: Callable[[], float] = time.monotonic):
+        self.policy = policy or ResiliencePolicy()
+        self.latency = LatencyTracker()
+        self._clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = self._breakers[model] = CircuitBreaker(
+                    self.policy.breaker_failures, self.policy.breaker_reset, self._clock
+                )
+            return breaker
+
+    def hedge_delay(self, model: str, key: Optional[str] = None) -> Optional[float]:
+        """
+        Seconds after which an attempt of `model` with hedge key `key` is
+        hedged (None: not enough samples yet, or hedging is off).
+        """
+        p = self.policy
+        if not p.hedge or self.latency.count((model, key)) < p.hedge_min_samples:
+            return None
+        return max(p.hedge_min_delay, self.latency.quantile((model, key), p.hedge_quantile))
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter exponential backoff before retry number `retry` (1-based)."""
+        return random.uniform(0, min(self.policy.backoff_max, self.policy.backoff_base * 2 ** (retry - 1)))
+
+    def _deadline(self) -> Optional[float]:
+        return self._clock() + self.policy.deadline if self.policy.deadline else None
+
+    def _timeout(self, timeout: Optional[float], deadline: Optional[float]) -> Optional[float]:
+        """Per-attempt timeout: the caller's, capped at the time left before the deadline."""
+        if deadline is None:
+            return timeout
+        left = max(deadline - self._clock(), 0.001)
+        return min(timeout, left) if timeout else left
+
+    def _check_breaker(self, model: str, last_error: Optional[BaseException]) -> CircuitBreaker:
+        breaker = self.breaker(model)
+        if not breaker.allow():
+            raise CircuitOpenError(
+                f"Circuit open for {model!r} after {breaker.failures} consecutive failures; "
+                f"retrying after {breaker.reset_seconds}s"
+            ) from last_error
+        return breaker
+
+    def _next_retry(
+        self, error: BaseException, breaker: CircuitBreaker, retry: int, deadline: Optional[float],
+        can_retry: Optional[Callable[[], bool]],
+    ) -> Optional[float]:
+        """Backoff before the next retry, or None if `error` should be raised."""
+        if not is_transient(error):
+            breaker.success()  # the model answered; the request itself was bad
+            return None
+        if isinstance(error, InvalidReplyError):
+            breaker.success()  # the model answered; only this reply was unusable
+        else:
+            breaker.failure()
+        if retry >= self.policy.retries or (can_retry is not None and not can_retry()):
+            return None
+        delay = self.backoff(retry + 1)
+        if deadline is not None and self._clock() + delay >= deadline:
+            return None
+        return delay
+
+    def _timed(
+        self, fn: Callable[[Optional[float]], T], bucket: Tuple[str, Optional[str]], timeout: Optional[float]
+    ) -> T:
+        t0 = time.perf_counter()
+        result = fn(timeout)
+        self.latency.add(bucket, time.perf_counter() - t0)
+        return result
+
+    def call(
+        self,
+        fn: Callable[[Optional[float]], T],
+        model: str,
+        timeout: Optional[float] = None,
+        hedge: bool = True,
+        can_retry: Optional[Callable[[], bool]] = None,
+        key: Optional[str] = None,
+    ) -> T:
+        """
+        Run fn(attempt_timeout) under the policy.
+
+        fn must be safe to run more than once, and concurrently when hedge is
+        True. can_retry() is asked before each retry (e.g. a stream that has
+        already delivered items must not start over). key separates the
+        latency stats used for hedging among calls to the same model.
+        """
+        deadline = self._deadline()
+        last_error: Optional[BaseException] = None
+        for retry in range(self.policy.retries + 1):
+            breaker = self._check_breaker(model, last_error)
+            try:
+                result = self._attempt(fn, model, key, self._timeout(timeout, deadline), deadline, hedge)
+            except Exception as e:
+                delay = self._next_retry(e, breaker, retry, deadline, can_retry)
+                if delay is None:
+                    raise
+                last_error = e
+                record(retries=retry + 1)
+                time.sleep(delay)
+            else:
+                breaker.success()
+                return result
+        raise AssertionError("unreachable")
+
+    def _attempt(
+        self, fn: Callable[[Optional[float]], T], model: str, key: Optional[str], timeout: Optional[float],
+        deadline: Optional[float], hedge: bool,
+    ) -> T:
+        delay = self.hedge_delay(model, key) if hedge else None
+        if delay is None and deadline is None:
+            return self._timed(fn, (model, key), timeout)
+        # Run in worker threads, so a stalled request cannot outlive the
+        # deadline and a hedge can race it; abandoned attempts finish unobserved
+        pending = [_spawn(self._timed, fn, (model, key), timeout)]
+        first = pending[0]
+        error: Optional[BaseException] = None
+        while pending:
+            left = None if deadline is None else deadline - self._clock()
+            wait_for = left if delay is None else (delay if left is None else min(delay, left))
+            done, _ = wait(pending, timeout=None if wait_for is None else max(wait_for, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                if future.exception() is None:
+                    if future is not first:
+                        record(hedge_won=True)
+                    return future.result()
+                error = error or future.exception()
+            if done:
+                continue
+            if delay is not None and (deadline is None or self._clock() < deadline):
+                record(hedged=True)
+                pending.append(_spawn(self._timed, fn, (model, key), self._timeout(timeout, deadline)))
+                delay = None
+                continue
+            raise TimeoutError(f"LLM call to {model!r} exceeded its {self.policy.deadline}s deadline")
+        raise error
+
+    async def acall(
+        self,
+        fn: Callable[[Optional[float]], Awaitable[T]],
+        model: str,
+        timeout: Optional[float] = None,
+        hedge: bool = True,
+        key: Optional[str] = None,
+    ) -> T:
+        """Async twin of call; losing and timed-out attempts are cancelled."""
+        deadline = self._deadline()
+        last_error: Optional[BaseException] = None
+        for retry in range(self.policy.retries + 1):
+            breaker = self._check_breaker(model, last_error)
+            try:
+                result = await self._aattempt(fn, model, key, self._timeout(timeout, deadline), deadline, hedge)
+            except Exception as e:
+                delay = self._next_retry(e, breaker, retry, deadline, None)
+                if delay is None:
+                    raise
+                last_error = e
+                record(retries=retry + 1)
+                await asyncio.sleep(delay)
+            else:
+                breaker.success()
+                return result
+        raise AssertionError("unreachable")
+
+    async def _atimed(
+        self, fn: Callable[[Optional[float]], Awaitable[T]], bucket: Tuple[str, Optional[str]], timeout: Optional[float]
+    ) -> T:
+        t0 = time.perf_counter()
+        result = await fn(timeout)
+        self.latency.add(bucket, time.perf_counter() - t0)
+        return result
+
+    async def _aattempt(
+        self, fn: Callable[[Optional[float]], Awaitable[T]], model: str, key: Optional[str],
+        timeout: Optional[float], deadline: Optional[float], hedge: bool,
+    ) -> T:
+        delay = self.hedge_delay(model, key) if hedge else None
+        first = asyncio.ensure_future(self._atimed(fn, (model, key), timeout))
+        pending = {first}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                left = None if deadline is None else deadline - self._clock()
+                wait_for = left if delay is None else (delay if left is None else min(delay, left))
+                done, pending = await asyncio.wait(
+                    pending, timeout=None if wait_for is None else max(wait_for, 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            record(hedge_won=True)
+                        return task.result()
+                    error = error or task.exception()
+                if done:
+                    continue
+                if delay is not None and (deadline is None or self._clock() < deadline):
+                    record(hedged=True)
+                    pending.add(asyncio.ensure_future(self._atimed(fn, (model, key), self._timeout(timeout, deadline))))
+                    delay = None
+                    continue
+                raise TimeoutError(f"LLM call to {model!r} exceeded its {self.policy.deadline}s deadline")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def states(self) -> Dict[str, str]:
+        """Circuit state per model seen so far."""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {model: b.state for model, b in breakers.items()}
+
+
+_resilience: Optional[Resilience] = None
+
+
+def get_resilience() -> Resilience:
+    """Process-wide Resilience (built from the LLM_* env vars on first use)."""
+    global _resilience
+    if _resilience is None:
+        _resilience = Resilience()
+    return _resilience
+
+
+def set_resilience(resilience: Optional[Resilience]) -> Optional[Resilience]:
+    """Install a Resilience process-wide (None restores the default); returns the previous one."""
+    global _resilience
+    previous, _resilience = _resilience, resilience
+    return previous
+
+
+@contextlib.contextmanager
+def use_resilience(resilience: Resilience) -> Iterator[Resilience]:
+    """Use `resilience` for the duration of the block."""
+    previous = set_resilience(resilience)
+    try:
+        yield resilience
+    finally:
+        set_resilience(previous)
@@ -0,0 +1,203 @@
+# routing.py
+"""
+Per-stage model routing with cheap-first escalation.
+
+A RoutingPolicy gives each pipeline stage a ladder of routes (model, max
+tokens, timeout). The first draft and early revisions use the first, fast
+route; after `escalate_after` failed validations the stage moves one step up
+the ladder, so only documents the fast model keeps getting wrong pay for a
+stronger one.
+
+Policies come from run_pipeline(routing=...) or the LLM_ROUTING env var (a
+JSON string or a path to a JSON file):
+
+    {
+      "default": ["gpt-5-nano", "gpt-5-mini"],
+      "stages": {"tasks": [{"model": "gpt-5-nano", "max_tokens": 16000, "timeout": 120}, "gpt-5-mini"]},
+      "escalate_after": 1
+    }
+
+Routes may be given as a model name or as an object. RouteStats records
+per-(stage, model) latency, errors and validation outcomes for tuning; every
+run's stats are also merged into the process-wide global_route_stats(). Call
+counts, mean and max latency cover every call; the median covers the most
+recent LATENCY_WINDOW calls, so long-lived processes keep bounded memory.
+"""
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from llm import DEFAULT_MODEL
+
+# Model the default policy escalates to for a stage's last attempts
+ESCALATION_MODEL = os.getenv("LLM_ESCALATION_MODEL", "gpt-5-mini")
+
+
+@dataclass(frozen=True)
+class Route:
+    model: str = DEFAULT_MODEL
+    max_tokens: Optional[int] = None
+    timeout: Optional[float] = None
+
+    @classmethod
+    def from_value(cls, value: Union[str, Dict[str, Any], "Route"]) -> "Route":
+        if isinstance(value, Route):
+            return value
+        if isinstance(value, str):
+            return cls(model=value)
+        return cls(**value)
+
+
+@dataclass
+class RoutingPolicy:
+    """
+    Args:
+        default: Route ladder for stages without their own entry
+        stages: Route ladders per stage ("goal", "prd", "milestones", "tasks")
+        escalate_after: Failed validations before moving one step up a ladder
+    """
+    default: List[Route] = field(default_factory=lambda: [Route(), Route(ESCALATION_MODEL)])
+    stages: Dict[str, List[Route]] = field(default_factory=dict)
+    escalate_after: int = 2
+
+    def __post_init__(self):
+        if self.escalate_after < 1:
+            raise ValueError("escalate_after must be at least 1.")
+        if not self.default or any(not ladder for ladder in self.stages.values()):
+            raise ValueError("Route ladders must not be empty.")
+
+    def ladder(self, stage: str) -> List[Route]:
+        return self.stages.get(stage) or self.default
+
+    def route(self, stage: str, attempt: int = 1) -> Route:
+        """Route for the call producing `attempt` (1 = first draft) of `stage`."""
+        ladder = self.ladder(stage)
+        step = (attempt - 1) // self.escalate_after
+        return ladder[min(step, len(ladder) - 1)]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RoutingPolicy":
+        kwargs: Dict[str, Any] = {}
+        if "default" in data:
+            kwargs["default"] = _ladder(data["default"])
+        if "stages" in data:
+            kwargs["stages"] = {stage: _ladder(ladder) for stage, ladder in data["stages"].items()}
+        if "escalate_after" in data:
+            kwargs["escalate_after"] = int(data["escalate_after"])
+        return cls(**kwargs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "default": [asdict(r) for r in self.default],
+            "stages": {stage: [asdict(r) for r in ladder] for stage, ladder in self.stages.items()},
+            "escalate_after": self.escalate_after,
+        }
+
+
+def _ladder(value: Any) -> List[Route]:
+    return [Route.from_value(v) for v in (value if isinstance(value, list) else [value])]
+
+
+def load_policy(value: Optional[str] = None) -> RoutingPolicy:
+    """Policy from a JSON string or file path (default: $LLM_ROUTING, else the built-in ladder)."""
+    value = value if value is not None else os.getenv("LLM_ROUTING", "")
+    if not value.strip():
+        return RoutingPolicy()
+    text = value if value.lstrip().startswith("{") else Path(value).read_text(encoding="utf-8")
+    return RoutingPolicy.from_dict(json.loads(text))
+
+
+LATENCY_WINDOW = 1000
+
+
+class RouteStats:
+    """Thread-safe per-(stage, model) call latency, error and validation counters."""
+
+    def __init__(self):
+        self._recent: Dict[Tuple[str, str], Deque[float]] = {}
+        self._counts: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, key: Tuple[str, str]) -> Dict[str, float]:
+        self._recent.setdefault(key, deque(maxlen=LATENCY_WINDOW))
+        return self._counts.setdefault(
+            key, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "errors": 0, "validations": 0, "valid": 0}
+        )
+
+    def record_call(self, stage: str, model: str, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            counts = self._entry((stage, model))
+            self._recent[(stage, model)].append(seconds)
+            counts["calls"] += 1
+            counts["seconds"] += seconds
+            counts["max_seconds"] = max(counts["max_seconds"], seconds)
+            if not ok:
+                counts["errors"] += 1
+
+    def record_validation(self, stage: str, model: str, valid: bool) -> None:
+        with self._lock:
+            counts = self._entry((stage, model))
+            counts["validations"] += 1
+            counts["valid"] += int(valid)
+
+    def add_spans(self, spans: List[Dict[str, Any]]) -> None:
+        """
+        Record a run's trace spans (see tracing.py): every uncached LLM call,
+        and every validation against the model that produced that attempt.
+        """
+        produced_by: Dict[Tuple[str, int], str] = {}
+        for s in spans:
+            a = s["attributes"]
+            if "stage" not in a:
+                continue
+            key = (a["stage"], a.get("attempt", 1))
+            if s["name"] == "llm" and a.get("model"):
+                produced_by[key] = a["model"]
+                if not a.get("cache_hit"):
+                    self.record_call(a["stage"], a["model"], s["duration_seconds"], ok=s["error"] is None)
+            elif s["name"] == "validate" and key in produced_by:
+                self.record_validation(a["stage"], produced_by[key], valid=not a.get("issues"))
+
+    def merge(self, other: "RouteStats") -> None:
+        with other._lock:
+            recent = {k: list(v) for k, v in other._recent.items()}
+            counts = {k: dict(v) for k, v in other._counts.items()}
+        with self._lock:
+            for key, seconds in recent.items():
+                entry = self._entry(key)
+                self._recent[key].extend(seconds)
+                for name, n in counts[key].items():
+                    entry[name] = max(entry[name], n) if name == "max_seconds" else entry[name] + n
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """{stage: {model: {calls, errors, p50_seconds, mean_seconds, max_seconds, validations, valid_rate}}}"""
+        with self._lock:
+            out: Dict[str, Dict[str, Dict[str, float]]] = {}
+            for (stage, model), recent in sorted(self._recent.items()):
+                counts = self._counts[(stage, model)]
+                calls = int(counts["calls"])
+                out.setdefault(stage, {})[model] = {
+                    "calls": calls,
+                    "errors": int(counts["errors"]),
+                    "p50_seconds": round(statistics.median(recent), 4) if recent else 0.0,
+                    "mean_seconds": round(counts["seconds"] / calls, 4) if calls else 0.0,
+                    "max_seconds": round(counts["max_seconds"], 4),
+                    "validations": int(counts["validations"]),
+                    "valid_rate": round(counts["valid"] / counts["validations"], 3) if counts["validations"] else 0.0,
+                }
+            return out
+
+
+_global_stats = RouteStats()
+
+
+def global_route_stats() -> RouteStats:
+    """Stats accumulated over every run in this process."""
+    return _global_stats
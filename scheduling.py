@@ -0,0 +1,211 @@
+# scheduling.py
+"""
+Schedule a TasksDoc from its estimate_hours and depends_on fields.
+
+- topological_order: Kahn's algorithm, ties broken by backlog order
+- critical_path: CPM forward/backward pass (earliest/latest start, slack,
+  critical path, total duration)
+- list_schedule: simulate N parallel workers, always starting the ready task
+  with the longest remaining path (HLFET list scheduling)
+
+Everything runs in O((V + E) log V) so merged backlogs with tens of thousands
+of tasks schedule in well under a second. Unknown dependency ids are ignored;
+a dependency cycle raises ValueError.
+"""
+from __future__ import annotations
+
+import csv
+import heapq
+import io
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from schemas import TasksDoc
+
+
+@dataclass
+class Schedule:
+    order: List[str]
+    earliest_start: Dict[str, float]
+    earliest_finish: Dict[str, float]
+    latest_start: Dict[str, float]
+    slack: Dict[str, float]
+    critical_path: List[str]
+    duration_hours: float
+
+
+@dataclass
+class Assignment:
+    task_id: str
+    worker: int
+    start: float
+    finish: float
+
+
+@dataclass
+class WorkerPlan:
+    workers: int
+    assignments: List[Assignment] = field(default_factory=list)
+    makespan_hours: float = 0.0
+
+    def utilization(self) -> float:
+        busy = sum(a.finish - a.start for a in self.assignments)
+        return busy / (self.workers * self.makespan_hours) if self.makespan_hours else 0.0
+
+
+def _graph(tdoc: TasksDoc) -> Tuple[List[str], List[float], List[List[int]], List[List[int]]]:
+    """Index the backlog: ids, durations, predecessor and successor lists."""
+    ids: List[str] = []
+    index: Dict[str, int] = {}
+    for t in tdoc.tasks:
+        if t.task_id not in index:
+            index[t.task_id] = len(ids)
+            ids.append(t.task_id)
+    hours = [0.0] * len(ids)
+    preds: List[List[int]] = [[] for _ in ids]
+    succs: List[List[int]] = [[] for _ in ids]
+    seen = set()
+    for t in tdoc.tasks:
+        i = index[t.task_id]
+        if i in seen:
+            continue  # duplicate id: the first occurrence wins
+        seen.add(i)
+        hours[i] = max(float(t.estimate_hours), 0.0)
+        for dep in dict.fromkeys(t.depends_on):
+            j = index.get(dep)
+            if j is not None and j != i:
+                preds[i].append(j)
+                succs[j].append(i)
+    return ids, hours, preds, succs
+
+
+def _topo(ids: List[str], preds: List[List[int]], succs: List[List[int]]) -> List[int]:
+    indegree = [len(p) for p in preds]
+    ready = [i for i, d in enumerate(indegree) if d == 0]
+    heapq.heapify(ready)
+    order: List[int] = []
+    while ready:
+        i = heapq.heappop(ready)
+        order.append(i)
+        for s in succs[i]:
+            indegree[s] -= 1
+            if indegree[s] == 0:
+                heapq.heappush(ready, s)
+    if len(order) != len(ids):
+        stuck = [ids[i] for i, d in enumerate(indegree) if d > 0]
+        raise ValueError(f"Dependency cycle among tasks: {', '.join(stuck[:10])}" + (" …" if len(stuck) > 10 else ""))
+    return order
+
+
+def topological_order(tdoc: TasksDoc) -> List[str]:
+    """Task ids with every task after its dependencies (backlog order on ties)."""
+    ids, _, preds, succs = _graph(tdoc)
+    return [ids[i] for i in _topo(ids, preds, succs)]
+
+
+def critical_path(tdoc: TasksDoc) -> Schedule:
+    """Critical path method over estimate_hours, assuming unlimited workers."""
+    ids, hours, preds, succs = _graph(tdoc)
+    order = _topo(ids, preds, succs)
+
+    es = [0.0] * len(ids)
+    ef = [0.0] * len(ids)
+    via = [-1] * len(ids)  # predecessor that determines the earliest start
+    for i in order:
+        for p in preds[i]:
+            if ef[p] > es[i]:
+                es[i], via[i] = ef[p], p
+        ef[i] = es[i] + hours[i]
+    duration = max(ef, default=0.0)
+
+    lf = [duration] * len(ids)
+    for i in reversed(order):
+        for s in succs[i]:
+            lf[i] = min(lf[i], lf[s] - hours[s])
+    ls = [lf[i] - hours[i] for i in range(len(ids))]
+
+    path: List[str] = []
+    if ids:
+        i = max(range(len(ids)), key=lambda k: (ef[k], -k))
+        while i != -1:
+            path.append(ids[i])
+            i = via[i]
+        path.reverse()
+
+    return Schedule(
+        order=[ids[i] for i in order],
+        earliest_start=dict(zip(ids, es)),
+        earliest_finish=dict(zip(ids, ef)),
+        latest_start=dict(zip(ids, ls)),
+        slack={ids[i]: ls[i] - es[i] for i in range(len(ids))},
+        critical_path=path,
+        duration_hours=duration,
+    )
+
+
+def list_schedule(tdoc: TasksDoc, workers: int = 1) -> WorkerPlan:
+    """
+    Simulate `workers` people working through the backlog.
+
+    Whenever a worker is free it takes the ready task with the longest
+    remaining path to the end of the project (ties: backlog order).
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    ids, hours, preds, succs = _graph(tdoc)
+    order = _topo(ids, preds, succs)
+
+    # Longest path from the start of each task to the end of the project
+    tail = list(hours)
+    for i in reversed(order):
+        for s in succs[i]:
+            tail[i] = max(tail[i], hours[i] + tail[s])
+
+    remaining = [len(p) for p in preds]
+    ready = [(-tail[i], i) for i in range(len(ids)) if remaining[i] == 0]
+    heapq.heapify(ready)
+    idle = list(range(workers))
+    running: List[Tuple[float, int, int]] = []  # (finish, worker, task)
+    plan = WorkerPlan(workers=workers)
+    now = 0.0
+    while ready or running:
+        while ready and idle:
+            _, i = heapq.heappop(ready)
+            worker = heapq.heappop(idle)
+            plan.assignments.append(Assignment(ids[i], worker, now, now + hours[i]))
+            heapq.heappush(running, (now + hours[i], worker, i))
+        now, worker, i = heapq.heappop(running)
+        heapq.heappush(idle, worker)
+        for s in succs[i]:
+            remaining[s] -= 1
+            if remaining[s] == 0:
+                heapq.heappush(ready, (-tail[s], s))
+    plan.makespan_hours = now
+    return plan
+
+
+def schedule_csv(schedule: Schedule, plan: WorkerPlan | None = None) -> str:
+    """CSV with one row per task in topological order (plus worker columns if given)."""
+    assigned = {a.task_id: a for a in plan.assignments} if plan else {}
+    critical = set(schedule.critical_path)
+    fieldnames = ["task_id", "earliest_start", "earliest_finish", "latest_start", "slack", "critical"]
+    if plan:
+        fieldnames += ["worker", "start", "finish"]
+    output = io.StringIO()
+    w = csv.DictWriter(output, fieldnames=fieldnames)
+    w.writeheader()
+    for tid in schedule.order:
+        row = {
+            "task_id": tid,
+            "earliest_start": round(schedule.earliest_start[tid], 2),
+            "earliest_finish": round(schedule.earliest_finish[tid], 2),
+            "latest_start": round(schedule.latest_start[tid], 2),
+            "slack": round(schedule.slack[tid], 2),
+            "critical": "yes" if tid in critical else "",
+        }
+        if plan:
+            a = assigned[tid]
+            row.update(worker=a.worker + 1, start=round(a.start, 2), finish=round(a.finish, 2))
+        w.writerow(row)
+    return output.getvalue()
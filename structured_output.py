@@ -0,0 +1,106 @@
+# structured_output.py
+"""
+Strict structured-output schemas derived from the pydantic models in schemas.py.
+
+schema_format(TasksDoc) returns an OpenAI `response_format` that makes the
+model emit exactly the document's shape: every field present, no extra keys,
+arrays of strings where the model expects strings. On top of the types, the
+schema carries what validators.py checks where JSON Schema can express it:
+
+- enums for task `type` and `priority`
+- minItems/maxItems for the PRD lists, milestones, deliverables, tasks and
+  acceptance criteria
+- minimum/maximum for milestone est_days and task estimate_hours
+
+String length rules (e.g. a 40+ character PRD problem) become field
+descriptions, since strict mode has no minLength. The validators still run
+on every draft; the schema only makes their failures rarer.
+"""
+from __future__ import annotations
+
+import copy
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from validators import (
+    ALLOWED_PRIORITIES,
+    ALLOWED_TYPES,
+    MILESTONE_COUNT,
+    MILESTONE_EST_DAYS,
+    PRD_LIST_BOUNDS,
+    TASK_COUNT,
+    TASK_ESTIMATE_HOURS,
+)
+
+# JSON Schema keywords per (model, field), mirroring validators.py
+FIELD_RULES: Dict[Tuple[str, str], Dict[str, Any]] = {
+    ("PRD", "problem"): {"description": "At least 40 characters."},
+    ("PRD", "target_users"): {"minItems": 1},
+    ("PRD", "goals"): {"minItems": 3},
+    ("PRD", "non_goals"): {"minItems": 2},
+    ("PRD", "user_stories"): {"description": 'Each: "As a [user], I want [goal] so that [benefit]".'},
+    ("MilestonesDoc", "milestones"): {"minItems": MILESTONE_COUNT[0], "maxItems": MILESTONE_COUNT[1]},
+    ("Milestone", "name"): {"description": "At least 3 characters."},
+    ("Milestone", "objective"): {"description": "At least 20 characters."},
+    ("Milestone", "deliverables"): {"minItems": 2, "maxItems": 5},
+    ("Milestone", "est_days"): {"minimum": MILESTONE_EST_DAYS[0], "maximum": MILESTONE_EST_DAYS[1]},
+    ("TasksDoc", "tasks"): {"minItems": TASK_COUNT[0], "maxItems": TASK_COUNT[1]},
+    ("TaskItem", "task_id"): {"description": "T001, T002, ... in order."},
+    ("TaskItem", "title"): {"description": "At least 5 characters."},
+    ("TaskItem", "type"): {"enum": sorted(ALLOWED_TYPES)},
+    ("TaskItem", "priority"): {"enum": sorted(ALLOWED_PRIORITIES)},
+    ("TaskItem", "estimate_hours"): {"minimum": TASK_ESTIMATE_HOURS[0], "maximum": TASK_ESTIMATE_HOURS[1]},
+    ("TaskItem", "depends_on"): {"description": "task_ids of earlier tasks only."},
+    ("TaskItem", "acceptance_criteria"): {"minItems": 1},
+}
+for _field, (_lo, _hi) in PRD_LIST_BOUNDS.items():
+    FIELD_RULES.setdefault(("PRD", _field), {}).update(minItems=_lo, maxItems=_hi)
+
+_DROPPED = ("$defs", "title", "default")
+
+
+def _strict(node: Dict[str, Any], defs: Dict[str, Any], owner: str) -> Dict[str, Any]:
+    """Inline $refs, require every property, forbid extra keys and apply FIELD_RULES."""
+    if "$ref" in node:
+        name = node["$ref"].rsplit("/", 1)[-1]
+        return _strict(defs[name], defs, name)
+    out = {k: v for k, v in node.items() if k not in _DROPPED}
+    if out.get("type") == "object":
+        properties = {}
+        for field, sub in node.get("properties", {}).items():
+            properties[field] = {**_strict(sub, defs, owner), **FIELD_RULES.get((owner, field), {})}
+        out.update(properties=properties, required=list(properties), additionalProperties=False)
+    elif out.get("type") == "array":
+        out["items"] = _strict(node["items"], defs, owner)
+    return out
+
+
+@lru_cache(maxsize=None)
+def _document_schema(model_cls: Type[BaseModel]) -> Dict[str, Any]:
+    schema = model_cls.model_json_schema()
+    return _strict(schema, schema.get("$defs", {}), model_cls.__name__)
+
+
+def json_schema(model_cls: Type[BaseModel], overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Strict JSON Schema for a document model.
+
+    overrides replace the rules of top-level fields, e.g. {"tasks": {"minItems":
+    4, "maxItems": 8}} for one milestone's share of the tasks.
+    """
+    schema = copy.deepcopy(_document_schema(model_cls))
+    for field, rules in (overrides or {}).items():
+        schema["properties"][field].update(rules)
+    return schema
+
+
+def schema_format(
+    model_cls: Type[BaseModel], overrides: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """OpenAI `response_format` requesting a strict json_schema reply for model_cls."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model_cls.__name__, "strict": True, "schema": json_schema(model_cls, overrides)},
+    }
@@ -0,0 +1,358 @@
+# stub_llm.py
+"""
+Deterministic offline LLM backend for tests and benchmarks.
+
+StubLLM recognizes the pipeline's prompts (goal, PRD, milestones, tasks,
+per-milestone tasks, full revisions, JSON Patch revisions and continuations
+of truncated drafts) and answers with synthetic documents that pass the
+validators. It can be configured to:
+
+- sleep `latency` (+ up to `jitter`) seconds per call
+- raise StubLLMError, a transient error that call_llm_json retries (see
+  resilience.py), on a fraction of calls (`failure_rate`)
+- put semantic defects into first drafts (`defect_rate`): a too-short PRD
+  problem or missing target_users, a too-short milestone objective or task
+  title, or a task without acceptance_criteria. The deterministic repairs cannot fix these, so they
+  exercise the revise loops; revisions fix them with probability `fix_rate`
+- cut single-call tasks drafts off partway (`truncate_rate`), so the
+  pipeline has to recover and continue them (see json_recovery.py)
+- behave differently per model (`models`), e.g. a slower model that always
+  fixes its revisions, to exercise routing and escalation (see routing.py)
+
+Output depends only on the prompt, model and `seed`, so runs are reproducible.
+
+Usage:
+    from llm import use_backend
+    from stub_llm import StubLLM
+
+    with use_backend(StubLLM(latency=0.05, defect_rate=0.1)):
+        result = run_pipeline("Idea", [], use_cache=False)
+
+or set LLM_BACKEND=stub to use a default StubLLM process-wide.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional
+
+from llm import LLMBackend
+from prompt_context import count_tokens
+from resilience import TransientError
+from tracing import record
+
+TYPES = ["backend", "frontend", "data", "ml", "infra", "docs", "testing"]
+PRIORITIES = ["P0", "P1", "P2"]
+
+_REVISION = re.compile(r"You previously returned this (\w+) JSON:\n(.*)\n")
+_TASK_RANGE = re.compile(r"Return (\d+)–(\d+) tasks")
+_IDEA = re.compile(r"^Idea: (.*)$", re.MULTILINE)
+_TITLE = re.compile(r'"title":"((?:[^"\\]|\\.)*)"')
+
+
+class StubLLMError(TransientError):
+    """Injected failure (see StubLLM.failure_rate)."""
+
+
+class StubLLM(LLMBackend):
+    """
+    Synthetic, seeded LLM backend.
+
+    Args:
+        latency: Seconds to sleep per call
+        jitter: Extra random latency, uniform in [0, jitter] seconds
+        failure_rate: Fraction of calls that raise StubLLMError
+        defect_rate: Chance that each drafted PRD, milestone or task has a defect
+        fix_rate: Chance that a revision fixes the defects it was asked about
+        truncate_rate: Chance that a single-call tasks draft is cut off
+            partway, as at a max_tokens limit (see json_recovery.py)
+        tasks: Tasks in a single-call tasks draft
+        milestones: Milestones in a milestones draft
+        seed: Seed combined with the prompt for every random choice
+        models: Per-model overrides of latency, jitter, failure_rate,
+            defect_rate and fix_rate, e.g. {"gpt-5-mini": {"latency": 2.0}}
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        defect_rate: float = 0.0,
+        fix_rate: float = 1.0,
+        truncate_rate: float = 0.0,
+        tasks: int = 30,
+        milestones: int = 4,
+        seed: int = 0,
+        models: Optional[Dict[str, Dict[str, float]]] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.defect_rate = defect_rate
+        self.fix_rate = fix_rate
+        self.truncate_rate = truncate_rate
+        self.models = dict(models or {})
+        self.tasks = tasks
+        self.milestones = milestones
+        self.seed = seed
+        self.calls: Counter = Counter()  # per stage ("goal", "prd", ..., "patch", "revise")
+        self.model_calls: Counter = Counter()
+        self._seen: Counter = Counter()  # per prompt, so retries of a failed call can succeed
+        self._lock = threading.Lock()
+
+    # LLMBackend
+
+    @property
+    def cache_namespace(self) -> str:
+        # Everything that changes the replies; latency and failures do not
+        settings = [self.defect_rate, self.fix_rate, self.truncate_rate, self.tasks, self.milestones, self.seed,
+                    self.models]
+        return "StubLLM:" + json.dumps(settings, sort_keys=True)
+
+    def complete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        delay, text = self._respond(user_prompt, model)
+        if timeout and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Stub call exceeded {timeout}s")
+        if delay:
+            time.sleep(delay)
+        return text
+
+    async def acomplete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        delay, text = self._respond(user_prompt, model)
+        if timeout and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"Stub call exceeded {timeout}s")
+        if delay:
+            await asyncio.sleep(delay)
+        return text
+
+    def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        delay, text = self._respond(user_prompt, model)
+        if timeout and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Stub call exceeded {timeout}s")
+        if delay:
+            time.sleep(delay)
+        for i in range(0, len(text), 64):
+            yield text[i:i + 64]
+
+    # Responses
+
+    def profile(self, model: str) -> Dict[str, float]:
+        """Effective latency, jitter, failure_rate, defect_rate and fix_rate for `model`."""
+        return {
+            "latency": self.latency,
+            "jitter": self.jitter,
+            "failure_rate": self.failure_rate,
+            "defect_rate": self.defect_rate,
+            "fix_rate": self.fix_rate,
+            **self.models.get(model, {}),
+        }
+
+    def _respond(self, prompt: str, model: str = "") -> tuple:
+        stage = stage_of(prompt)
+        p = self.profile(model)
+        with self._lock:
+            self.calls[stage] += 1
+            self.model_calls[model] += 1
+            n = self._seen[(model, prompt)]
+            self._seen[(model, prompt)] += 1
+        call_rng = random.Random(f"{self.seed}:{model}:{n}:{prompt}")
+        delay = p["latency"] + call_rng.uniform(0, p["jitter"]) if p["jitter"] else p["latency"]
+        if call_rng.random() < p["failure_rate"]:
+            raise StubLLMError(f"Injected failure on {stage} call")
+        rng = random.Random(f"{self.seed}:{model}:{prompt}")
+        text = json.dumps(self.document(stage, prompt, rng, p))
+        if stage == "tasks" and call_rng.random() < self.truncate_rate:
+            text = text[:int(len(text) * call_rng.uniform(0.3, 0.9))]
+        record(prompt_tokens=count_tokens(prompt), completion_tokens=count_tokens(text))
+        return delay, text
+
+    def document(
+        self, stage: str, prompt: str, rng: random.Random, profile: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """The reply for a prompt already classified by stage_of()."""
+        p = profile or self.profile("")
+        if stage == "continue":
+            label, original = _embedded_doc(prompt)
+            if label != "TasksDoc":
+                return {"patch": []}
+            rest = make_tasks(original.get("title", ""), self.tasks, rng)["tasks"][len(original.get("tasks", [])):]
+            return {"patch": [{"op": "add", "path": "/tasks/-", "value": task} for task in rest]}
+        if stage in ("revise", "patch"):
+            label, original = _embedded_doc(prompt)
+            fixed = fix_document(label, original) if rng.random() < p["fix_rate"] else original
+            if stage == "revise":
+                return fixed
+            return {"patch": [{"op": "replace", "path": path, "value": value}
+                              for path, value in _diff(original, fixed, "")]}
+        title = _title(prompt)
+        if stage == "goal":
+            return make_goal(title, rng)
+        if stage == "prd":
+            return make_prd(title, rng, p["defect_rate"])
+        if stage == "milestones":
+            return make_milestones(title, self.milestones, rng, p["defect_rate"])
+        if stage == "milestone_tasks":
+            lo, _ = _task_range(prompt)
+            return make_tasks(title, lo, rng, p["defect_rate"])
+        return make_tasks(title, self.tasks, rng, p["defect_rate"])
+
+
+def stage_of(prompt: str) -> str:
+    """Which pipeline prompt this is: goal, prd, milestones, tasks, milestone_tasks, revise, patch or continue."""
+    if "Your reply was cut off" in prompt:
+        return "continue"
+    if "You previously returned this" in prompt:
+        return "patch" if "JSON Patch" in prompt else "revise"
+    if "Plan ONLY milestone" in prompt:
+        return "milestone_tasks"
+    for marker, stage in (("TasksDoc JSON", "tasks"), ("MilestonesDoc JSON", "milestones"),
+                          ("PRD JSON", "prd"), ("GoalInterpretation JSON", "goal")):
+        if marker in prompt:
+            return stage
+    raise ValueError("Unrecognized prompt")
+
+
+def _embedded_doc(prompt: str) -> tuple:
+    match = _REVISION.search(prompt)
+    if not match:
+        raise ValueError("Revision prompt without an embedded document")
+    return match.group(1), json.loads(match.group(2))
+
+
+def _title(prompt: str) -> str:
+    match = _IDEA.search(prompt)
+    if match:
+        return match.group(1).strip()[:60] or "Untitled"
+    match = _TITLE.search(prompt)
+    return json.loads(f'"{match.group(1)}"') if match else "Untitled"
+
+
+def _task_range(prompt: str) -> tuple:
+    match = _TASK_RANGE.search(prompt)
+    return (int(match.group(1)), int(match.group(2))) if match else (20, 45)
+
+
+def _diff(a: Any, b: Any, path: str) -> List[tuple]:
+    """(JSON Pointer, new value) for every leaf of `a` replaced in `b` (same shape assumed)."""
+    if isinstance(a, dict) and isinstance(b, dict) and a.keys() == b.keys():
+        return [change for k in a for change in _diff(a[k], b[k], f"{path}/{k}")]
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b) and a and isinstance(a[0], dict):
+        return [change for i, (x, y) in enumerate(zip(a, b)) for change in _diff(x, y, f"{path}/{i}")]
+    return [] if a == b else [(path, b)]
+
+
+# Documents
+
+def make_goal(title: str, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "title": title,
+        "one_liner": f"{title}: a focused MVP for its first users.",
+        "target_users": [f"User segment {i}" for i in range(1, rng.randint(2, 3) + 1)],
+        "constraints": ["Solo developer", "MVP scope"],
+        "assumptions": [f"Assumption {i}" for i in range(1, 3)],
+        "success_metrics": [f"Metric {i}: weekly active usage" for i in range(1, 4)],
+    }
+
+
+def make_prd(title: str, rng: random.Random, defect_rate: float = 0.0) -> Dict[str, Any]:
+    defect = rng.choice(("problem", "target_users")) if rng.random() < defect_rate else None
+    return {
+        "title": title,
+        "problem": "TBD" if defect == "problem" else
+        f"Users of {title} lack a simple, reliable way to get the core job done without manual work.",
+        "target_users": [] if defect == "target_users" else ["Primary users"],
+        "goals": [f"Goal {i}" for i in range(1, 4)],
+        "non_goals": ["Mobile apps", "Enterprise integrations"],
+        "user_stories": [f"As a user, I want capability {i} so that I save time"
+                         for i in range(1, rng.randint(6, 10) + 1)],
+        "functional_requirements": [f"Functional requirement {i}" for i in range(1, rng.randint(6, 10) + 1)],
+        "nonfunctional_requirements": [f"Non-functional requirement {i}" for i in range(1, rng.randint(4, 8) + 1)],
+        "risks": [f"Risk {i}" for i in range(1, 3)],
+        "open_questions": [f"Open question {i}" for i in range(1, 3)],
+    }
+
+
+def make_milestones(title: str, n: int, rng: random.Random, defect_rate: float = 0.0) -> Dict[str, Any]:
+    return {
+        "title": f"{title} Milestones",
+        "milestones": [
+            {
+                "name": f"Milestone {i}",
+                "objective": "TBD" if rng.random() < defect_rate else
+                f"Deliver the scope of milestone number {i} end to end",
+                "deliverables": [f"Deliverable {i}.{j}" for j in range(1, rng.randint(2, 5) + 1)],
+                "est_days": rng.randint(2, 10),
+            }
+            for i in range(1, n + 1)
+        ],
+    }
+
+
+def make_tasks(title: str, n: int, rng: random.Random, defect_rate: float = 0.0) -> Dict[str, Any]:
+    tasks: List[dict] = []
+    for i in range(1, n + 1):
+        defect = rng.choice(("title", "acceptance_criteria")) if rng.random() < defect_rate else None
+        earlier = [f"T{j:03d}" for j in range(max(1, i - 5), i)]
+        tasks.append({
+            "task_id": f"T{i:03d}",
+            "title": "Fix" if defect == "title" else f"Implement task number {i}",
+            "type": rng.choice(TYPES),
+            "priority": rng.choice(PRIORITIES),
+            "estimate_hours": rng.choice([1, 2, 3, 4, 6, 8, 12]),
+            "depends_on": rng.sample(earlier, min(len(earlier), rng.randint(0, 2))),
+            "acceptance_criteria": [] if defect == "acceptance_criteria" else [f"Task {i} works as specified"],
+        })
+    return {"title": f"{title} Tasks", "tasks": tasks}
+
+
+def fix_document(label: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a drafted document with every injected defect corrected."""
+    doc = json.loads(json.dumps(doc))
+    if label == "PRD" and len(doc.get("problem", "").strip()) < 40:
+        doc["problem"] = f"Users of {doc.get('title', 'the product')} lack a simple way to get the core job done."
+    if label == "PRD" and not doc.get("target_users"):
+        doc["target_users"] = ["Primary users"]
+    elif label == "MilestonesDoc":
+        for i, m in enumerate(doc.get("milestones", []), 1):
+            if len(m.get("objective", "").strip()) < 20:
+                m["objective"] = f"Deliver the scope of milestone number {i} end to end"
+    elif label == "TasksDoc":
+        for t in doc.get("tasks", []):
+            if len(t.get("title", "").strip()) < 5:
+                t["title"] = f"Implement {t.get('task_id', 'task')}"
+            if not t.get("acceptance_criteria"):
+                t["acceptance_criteria"] = [f"{t.get('task_id', 'Task')} works as specified"]
+    return doc
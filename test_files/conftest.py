@@ -0,0 +1,22 @@
+"""
+Shared pytest setup: every test gets its own in-memory response cache, so no
+test reads from or writes to the on-disk cache in .cache/.
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from cache import ResponseCache, set_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache():
+    cache = ResponseCache(path=None)
+    set_cache(cache)
+    yield cache
+    set_cache(None)
+    cache.close()
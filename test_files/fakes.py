@@ -0,0 +1,139 @@
+"""
+Canned LLM responses for offline pipeline tests.
+
+fake_llm() mimics llm.call_llm_json: it looks at which document the prompt asks
+for and returns a valid GoalInterpretation / PRD / MilestonesDoc / TasksDoc
+dict. use_fake_llm() patches the pipeline module to use it.
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import contextlib
+import threading
+from typing import Dict, List, Optional
+
+import pipeline
+from jsonstream import replay_items
+
+
+def make_goal() -> dict:
+    return {
+        "title": "Syllabus Planner",
+        "one_liner": "Turns class syllabi into weekly study plans.",
+        "target_users": ["College students"],
+        "constraints": ["Solo developer", "MVP in 2 weeks"],
+        "assumptions": ["Syllabi are pasted as text"],
+        "success_metrics": ["Plans generated per week"],
+    }
+
+
+def make_prd() -> dict:
+    return {
+        "title": "Syllabus Planner",
+        "problem": "Students struggle to turn long syllabi into a realistic weekly plan they can follow.",
+        "target_users": ["College students"],
+        "goals": ["Parse syllabi", "Generate weekly plans", "Track progress"],
+        "non_goals": ["LMS integrations", "Mobile apps"],
+        "user_stories": [f"As a student, I want feature {i} so that I stay on track" for i in range(1, 7)],
+        "functional_requirements": [f"Functional requirement {i}" for i in range(1, 7)],
+        "nonfunctional_requirements": [f"Non-functional requirement {i}" for i in range(1, 5)],
+        "risks": ["Syllabus formats vary"],
+        "open_questions": ["Which date formats to support?"],
+    }
+
+
+def make_milestones(n: int = 4) -> dict:
+    return {
+        "title": "Syllabus Planner Milestones",
+        "milestones": [
+            {
+                "name": f"Milestone {i}",
+                "objective": f"Deliver the scope of milestone number {i} end to end",
+                "deliverables": [f"Deliverable {i}.1", f"Deliverable {i}.2"],
+                "est_days": 3,
+            }
+            for i in range(1, n + 1)
+        ],
+    }
+
+
+def make_tasks(n: int = 24) -> dict:
+    types = ["backend", "frontend", "data", "ml", "infra", "docs", "testing"]
+    tasks: List[dict] = []
+    for i in range(1, n + 1):
+        tasks.append({
+            "task_id": f"T{i:03d}",
+            "title": f"Implement task number {i}",
+            "type": types[i % len(types)],
+            "priority": ["P0", "P1", "P2"][i % 3],
+            "estimate_hours": 2 + i % 5,
+            "depends_on": [f"T{i - 1:03d}"] if i > 1 else [],
+            "acceptance_criteria": [f"Task {i} works"],
+        })
+    return {"title": "Syllabus Planner Tasks", "tasks": tasks}
+
+
+class FakeLLM:
+    """
+    Callable stand-in for call_llm_json that records every prompt it sees.
+
+    Args:
+        drafts: Optional {"tasks": {...}, ...} documents returned for the first
+            generation prompt of a stage (e.g. a draft with defects); later
+            prompts get the valid canned document
+        patches: JSON Patch responses returned, in order, for patch revise prompts
+    """
+
+    def __init__(self, drafts: Optional[Dict[str, dict]] = None, patches: Optional[List[list]] = None):
+        self.prompts: List[str] = []
+        self.drafts = dict(drafts or {})
+        self.patches = list(patches or [])
+        self._lock = threading.Lock()
+
+    def respond(self, user_prompt: str) -> dict:
+        with self._lock:
+            self.prompts.append(user_prompt)
+            text = user_prompt.lower()
+            if "json patch" in text:
+                return {"patch": self.patches.pop(0) if self.patches else []}
+            for stage, marker, make in (
+                ("tasks", "tasksdoc json", make_tasks),
+                ("milestones", "milestonesdoc json", make_milestones),
+                ("prd", "prd json", make_prd),
+                ("goal", "goalinterpretation json", make_goal),
+            ):
+                if marker in text:
+                    return self.drafts.pop(stage, None) or make()
+        raise AssertionError(f"Unexpected prompt: {user_prompt[:200]}")
+
+    def __call__(self, system_prompt, user_prompt, **kwargs) -> dict:
+        return self.respond(user_prompt)
+
+    async def call_async(self, system_prompt, user_prompt, **kwargs) -> dict:
+        return self.respond(user_prompt)
+
+    def stream(self, system_prompt, user_prompt, on_item=None, **kwargs) -> dict:
+        data = self.respond(user_prompt)
+        if on_item:
+            for field, item in replay_items(data):
+                on_item(field, item)
+        return data
+
+
+@contextlib.contextmanager
+def use_fake_llm(fake: FakeLLM | None = None):
+    """Patch pipeline's LLM calls with a FakeLLM for the duration of the block."""
+    fake = fake or FakeLLM()
+    originals = pipeline.call_llm_json, pipeline.call_llm_json_async, pipeline.call_llm_json_stream
+    pipeline.call_llm_json, pipeline.call_llm_json_async, pipeline.call_llm_json_stream = (
+        fake, fake.call_async, fake.stream
+    )
+    try:
+        yield fake
+    finally:
+        pipeline.call_llm_json, pipeline.call_llm_json_async, pipeline.call_llm_json_stream = originals
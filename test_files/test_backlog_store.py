@@ -0,0 +1,138 @@
+"""
+Test script for the columnar backlog store (backlog_store.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import random
+import tempfile
+
+from backlog_store import PRIORITIES, TYPES, BacklogStore
+from fakes import make_tasks, use_fake_llm
+from pipeline import run_pipeline
+from schemas import TasksDoc
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def test_aggregations():
+    print("Testing vectorized aggregations...")
+    data = make_tasks(6)
+    data["tasks"][5]["type"] = "marketing"
+    data["tasks"][2]["depends_on"] = ["T001", "T002"]
+    store = BacklogStore()
+    store.add_tasks_doc(TasksDoc.model_validate(data), project="a")
+    store.add_tasks_doc(TasksDoc.model_validate(make_tasks(6)), project="b")
+    assert len(store) == 12
+    expected = {}
+    for t in data["tasks"] + make_tasks(6)["tasks"]:
+        kind = t["type"] if t["type"] != "marketing" else "other"
+        expected[kind] = expected.get(kind, 0) + t["estimate_hours"]
+    assert store.hours_by_type() == expected
+    assert sum(store.hours_by_priority().values()) == sum(expected.values())
+    assert store.fan_in_distribution() == {0: 2, 1: 9, 2: 1}
+    # T001 of project "a" is depended on by T002 and T003
+    assert store.fan_out_distribution() == {0: 2, 1: 9, 2: 1}
+    grid = store.hours_by_type_and_priority()
+    assert sum(sum(row.values()) for row in grid.values()) == sum(expected.values())
+    print("✅ Hours by type/priority and fan-in/fan-out match the inputs")
+
+
+def test_outliers():
+    print("Testing estimate outliers...")
+    data = make_tasks(40)
+    for t in data["tasks"]:
+        t["type"], t["estimate_hours"] = "backend", 4
+    data["tasks"][7]["estimate_hours"] = 24
+    store = BacklogStore()
+    store.add_tasks_doc(TasksDoc.model_validate(data), project="p")
+    outliers = store.estimate_outliers()
+    assert [(o["project"], o["task_id"], o["estimate_hours"]) for o in outliers] == [("p", "T008", 24.0)]
+    print("✅ A 24h backend task among 4h ones is flagged")
+
+
+def test_csv_and_persistence():
+    print("Testing CSV ingest and save/load...")
+    with use_fake_llm():
+        result = run_pipeline(IDEA, [])
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("one", "two"):
+            os.makedirs(os.path.join(tmp, name))
+            with open(os.path.join(tmp, name, "TASKS.csv"), "w", encoding="utf-8", newline="") as f:
+                f.write(result["tasks_csv"])
+        store = BacklogStore()
+        assert store.add_csv_files(sorted(str(p) for p in Path(tmp).rglob("TASKS.csv"))) == 2
+        assert len(store) == 48
+        assert store.fan_in_distribution() == {0: 2, 1: 46}
+        path = os.path.join(tmp, "backlog.npz")
+        store.save(path)
+        loaded = BacklogStore.load(path)
+        assert loaded.summary() == store.summary()
+    print("✅ TASKS.csv files ingest in bulk and round-trip through .npz")
+
+
+def _reference_summary(projects):
+    """The summary's aggregates computed row by row with plain dicts."""
+    by_type, by_priority, fan_in, fan_out = {}, {}, {}, {}
+    for ids, types, priorities, hours, deps in projects:
+        dependents = {}
+        for task_deps in deps:
+            for dep in set(task_deps):
+                if dep in ids:
+                    dependents[dep] = dependents.get(dep, 0) + 1
+        for task_id, kind, priority, h, task_deps in zip(ids, types, priorities, hours, deps):
+            kind = kind if kind in TYPES else "other"
+            priority = priority if priority in PRIORITIES else "other"
+            by_type[kind] = by_type.get(kind, 0) + h
+            by_priority[priority] = by_priority.get(priority, 0) + h
+            fan_in[len(task_deps)] = fan_in.get(len(task_deps), 0) + 1
+            n = dependents.get(task_id, 0)
+            fan_out[n] = fan_out.get(n, 0) + 1
+    return {
+        "tasks": sum(len(p[0]) for p in projects),
+        "total_hours": sum(by_type.values()),
+        "hours_by_type": by_type,
+        "hours_by_priority": by_priority,
+        "fan_in": fan_in,
+        "fan_out": fan_out,
+    }
+
+
+def test_scale():
+    print("Testing 200k tasks...")
+    rng = random.Random(0)
+    kinds = sorted(TYPES[:-1]) + ["marketing"]
+    projects = []
+    for _ in range(5000):
+        ids = [f"T{i:03d}" for i in range(1, 41)]
+        deps = [rng.sample(ids[:i], min(i, rng.randint(0, 3))) for i in range(40)]
+        projects.append((
+            ids,
+            [rng.choice(kinds) for _ in ids],
+            [rng.choice(["P0", "P1", "P2", "urgent"]) for _ in ids],
+            [float(rng.randint(1, 16)) for _ in ids],
+            deps,
+        ))
+    store = BacklogStore()
+    for p, (ids, types, priorities, hours, deps) in enumerate(projects):
+        store.add_rows(f"p{p}", ids, types, priorities, hours, deps)
+    summary = store.summary()
+    expected = _reference_summary(projects)
+    assert summary["projects"] == 5000
+    assert {k: summary[k] for k in expected} == expected
+    print("✅ 200k tasks summarize exactly like a row-by-row dict implementation")
+
+
+def main():
+    test_aggregations()
+    test_outliers()
+    test_csv_and_persistence()
+    test_scale()
+
+
+if __name__ == "__main__":
+    main()
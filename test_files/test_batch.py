@@ -0,0 +1,135 @@
+"""
+Test script for batch planning (batch.py) against canned LLM responses
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import tempfile
+
+import batch
+from batch import load_manifest, percentile, run_batch
+from fakes import FakeLLM, make_prd, use_fake_llm
+from llm import use_backend
+from stub_llm import StubLLM
+
+CONSTRAINTS = ["Solo developer"]
+
+
+class FlakyLLM(FakeLLM):
+    """Fails every goal prompt that mentions 'broken'."""
+
+    def respond(self, user_prompt):
+        if "broken" in user_prompt:
+            raise RuntimeError("simulated outage")
+        return super().respond(user_prompt)
+
+
+def test_percentile():
+    print("Testing percentile...")
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile([], 95) == 0.0
+    print("✅ Nearest-rank percentiles")
+
+
+def test_batch_writes_plans_and_resumes():
+    print("Testing run_batch output and resume...")
+    ideas = [f"Idea number {i} for a study app" for i in range(6)] + ["A broken idea"]
+    with tempfile.TemporaryDirectory() as out_dir:
+        with use_fake_llm(FlakyLLM()):
+            report = run_batch(ideas, CONSTRAINTS, out_dir=out_dir, workers=3)
+        assert (report.completed, report.failed, report.skipped) == (6, 1, 0)
+        assert report.plans_per_minute > 0
+        assert set(report.stage_percentiles()) == {"goal", "prd", "milestones", "tasks"}
+
+        plan_dirs = sorted(p for p in Path(out_dir).iterdir() if p.is_dir() and p.name != "runs")
+        assert len(plan_dirs) == 6
+        for d in plan_dirs:
+            assert {p.name for p in d.iterdir()} == {"PRD.md", "MILESTONES.md", "TASKS.csv", "SCHEDULE.csv"}
+
+        # Second run: completed ideas are skipped, the failed one is retried
+        with use_fake_llm() as fake:
+            report = run_batch(ideas, CONSTRAINTS, out_dir=out_dir, workers=3)
+        assert (report.completed, report.failed, report.skipped) == (1, 0, 6)
+        assert len(fake.prompts) == 4
+        assert all(r["status"] == "done" for r in load_manifest(out_dir).values())
+
+        # A plan that ended with validation issues is retried on the next run
+        with use_fake_llm(FakeLLM(drafts={"prd": {**make_prd(), "problem": "TBD"}})):
+            report = run_batch(["An incomplete idea"], CONSTRAINTS, out_dir=out_dir, max_attempts=1)
+        assert report.completed == 1
+        entry = next(r for r in load_manifest(out_dir).values() if r["idea"] == "An incomplete idea")
+        assert entry["status"] == "incomplete" and entry["issues"] > 0
+        with use_fake_llm() as fake:
+            report = run_batch(["An incomplete idea"], CONSTRAINTS, out_dir=out_dir)
+        assert report.skipped == 0 and len(fake.prompts) == 3
+    print("✅ Plans streamed to disk; rerun resumed with only the failed idea")
+
+
+def test_duplicates_write_errors_and_reused_stages():
+    print("Testing duplicate ideas, write failures and reused stages...")
+    ideas = ["Same idea for a study app", "Same idea for a study app", "Other idea for a study app"]
+    write_plan = batch.write_plan
+
+    def failing_write(plan_dir, result):
+        if "other" in plan_dir.name:
+            raise OSError("disk full")
+        write_plan(plan_dir, result)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        batch.write_plan = failing_write
+        try:
+            with use_fake_llm() as fake:
+                report = run_batch(ideas, CONSTRAINTS, out_dir=out_dir, workers=3)
+        finally:
+            batch.write_plan = write_plan
+        assert (report.completed, report.failed, report.skipped) == (1, 1, 1)
+        assert len(fake.prompts) == 8  # the repeated idea was planned once
+        assert report.failures[0]["error"] == "OSError: disk full"
+
+        # Rerun: the failed idea's stages come from its checkpoints and stay out of the percentiles
+        with use_fake_llm() as fake:
+            report = run_batch(ideas, CONSTRAINTS, out_dir=out_dir, workers=3)
+        assert (report.completed, report.failed, report.skipped) == (1, 0, 2)
+        assert fake.prompts == []
+        assert all(values == [] for values in report.stage_seconds.values())
+    print("✅ Repeats planned once, a failed write fails only its idea, reused stages excluded")
+
+
+class SameNamespaceStub(StubLLM):
+    """A StubLLM whose cache entries do not depend on its settings, like one API having a bad day."""
+
+    @property
+    def cache_namespace(self):
+        return "stub"
+
+
+def test_incomplete_plan_retried_past_the_cache():
+    print("Testing the retry of an incomplete plan through the response cache...")
+    with tempfile.TemporaryDirectory() as out_dir:
+        with use_backend(SameNamespaceStub(defect_rate=1.0, fix_rate=0.0)):
+            run_batch(["A cached idea for a study app"], CONSTRAINTS, out_dir=out_dir, max_attempts=1)
+        assert [r["status"] for r in load_manifest(out_dir).values()] == ["incomplete"]
+
+        healthy = SameNamespaceStub()
+        with use_backend(healthy):
+            report = run_batch(["A cached idea for a study app"], CONSTRAINTS, out_dir=out_dir, max_attempts=1)
+        assert report.completed == 1 and [r["status"] for r in load_manifest(out_dir).values()] == ["done"]
+        # The goal checkpoint is reused; every stage from the invalid PRD on is asked for again
+        assert healthy.calls["goal"] == 0 and healthy.calls["prd"] == 1 and healthy.calls["tasks"] == 1
+    print("✅ Regenerated stages bypass cached replies, so the retry can succeed")
+
+
+def main():
+    test_percentile()
+    test_batch_writes_plans_and_resumes()
+    test_duplicates_write_errors_and_reused_stages()
+    test_incomplete_plan_retried_past_the_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Test script for the LLM response cache (cache.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import tempfile
+from types import SimpleNamespace
+
+from cache import DISK_TOUCH_SECONDS, ResponseCache, get_cache, make_key, set_cache
+from llm import DEFAULT_MODEL, call_llm_json, use_backend
+from stub_llm import StubLLM
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingClient:
+    """Stands in for an OpenAI client; counts completions and returns JSON."""
+
+    def __init__(self, content='{"title": "Cached"}'):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.content = content
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_make_key_normalizes_whitespace():
+    print("Testing make_key normalization...")
+    assert make_key("sys", "\nline one   \nline two\n", "m") == make_key("sys", "line one\nline two", "m")
+    assert make_key("sys", "a", "m1") != make_key("sys", "a", "m2")
+    print("✅ Keys ignore trailing whitespace and include the model")
+
+
+def test_memory_lru_eviction():
+    print("Testing in-memory LRU eviction...")
+    cache = ResponseCache(path=None, max_memory_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}  # a is now most recently used
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+    print("✅ Least recently used entry was evicted")
+
+
+def test_ttl_and_persistence():
+    print("Testing TTL expiry and disk persistence...")
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "cache.sqlite3")
+        first = ResponseCache(path=path, ttl_seconds=60, clock=clock)
+        first.set("k", {"title": "x"})
+        first.close()
+
+        second = ResponseCache(path=path, ttl_seconds=60, clock=clock)
+        assert second.get("k") == {"title": "x"}
+        assert second.stats()["disk_hits"] == 1
+
+        clock.now += 120
+        assert second.get("k") is None
+        assert second.stats()["disk_entries"] == 0
+        second.close()
+    print("✅ Entries survive a restart and expire after the TTL")
+
+
+def test_disk_size_eviction():
+    print("Testing disk tier size cap...")
+    clock = FakeClock()
+    cache = ResponseCache(path=":memory:", max_memory_entries=1, max_disk_entries=3, clock=clock)
+    for i in range(5):
+        clock.now += 1
+        cache.set(f"k{i}", {"i": i})
+    assert cache.stats()["disk_entries"] == 3
+    assert cache.get("k0") is None
+    assert cache.get("k4") == {"i": 4}
+    print("✅ Disk tier trimmed to max_disk_entries")
+
+
+def test_memory_hits_keep_disk_entries():
+    print("Testing disk LRU with entries served from memory...")
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "cache.sqlite3")
+        cache = ResponseCache(path=path, max_disk_entries=3, clock=clock)
+        for i in range(3):
+            clock.now += DISK_TOUCH_SECONDS
+            cache.set(f"k{i}", {"i": i})
+        clock.now += DISK_TOUCH_SECONDS
+        assert cache.get("k0") == {"i": 0} and cache.stats()["memory_hits"] == 1
+        cache.set("k3", {"i": 3})
+        cache.close()
+
+        reopened = ResponseCache(path=path, clock=clock)
+        assert reopened.get("k0") == {"i": 0}
+        assert reopened.get("k1") is None
+        reopened.close()
+    print("✅ A memory hit refreshes the disk entry, so the LRU trims a colder one")
+
+
+def test_call_llm_json_uses_cache_and_bypass():
+    print("Testing call_llm_json cache integration...")
+    set_cache(ResponseCache(path=None))
+    client = CountingClient()
+    assert call_llm_json("sys", "same prompt", client=client) == {"title": "Cached"}
+    assert call_llm_json("sys", "same prompt", client=client) == {"title": "Cached"}
+    assert client.calls == 1
+    call_llm_json("sys", "same prompt", client=client, use_cache=False)
+    assert client.calls == 2
+    # A bypassing call does not write either
+    call_llm_json("sys", "fresh prompt", client=client, use_cache=False)
+    assert get_cache().get(make_key("sys", "fresh prompt", DEFAULT_MODEL)) is None
+    set_cache(None)
+    print("✅ Repeated request served from cache; use_cache=False skips reads and writes")
+
+
+def test_backends_do_not_share_entries():
+    print("Testing cache keys across backends...")
+    set_cache(ResponseCache(path=None))
+    prompt = "Idea: A shared grocery list\nReturn GoalInterpretation JSON."
+    client = CountingClient()
+    assert call_llm_json("sys", prompt, client=client) == {"title": "Cached"}
+    stub = StubLLM()
+    with use_backend(stub):
+        assert call_llm_json("sys", prompt) != {"title": "Cached"}
+        call_llm_json("sys", prompt)
+        assert sum(stub.calls.values()) == 1
+    with use_backend(StubLLM(seed=1)) as other:
+        call_llm_json("sys", prompt)
+        assert sum(other.calls.values()) == 1
+    assert call_llm_json("sys", prompt, client=client) == {"title": "Cached"} and client.calls == 1
+    assert make_key("s", "u", "m") != make_key("s", "u", "m", backend=StubLLM().cache_namespace)
+    assert StubLLM(latency=1.0).cache_namespace == StubLLM().cache_namespace
+    set_cache(None)
+    print("✅ Stub replies never answer API requests, or requests to a differently seeded stub")
+
+
+def main():
+    test_make_key_normalizes_whitespace()
+    test_memory_lru_eviction()
+    test_ttl_and_persistence()
+    test_disk_size_eviction()
+    test_memory_hits_keep_disk_entries()
+    test_call_llm_json_uses_cache_and_bypass()
+    test_backends_do_not_share_entries()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Test script for best-of-N candidate drafts (run_pipeline(candidates=...))
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import threading
+
+from fakes import FakeLLM, make_tasks, use_fake_llm
+from pipeline import _best_of, run_pipeline, run_pipeline_async
+from schemas import TasksDoc
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def tasks_with_defects(n: int) -> dict:
+    doc = make_tasks()
+    for task in doc["tasks"][:n]:
+        task["title"] = "Do"
+    return doc
+
+
+def draft_span(result, stage: str) -> dict:
+    return next(s for s in result["spans"] if s["name"] == "draft" and s["attributes"]["stage"] == stage)
+
+
+def revise_calls(fake: FakeLLM) -> int:
+    return sum(1 for p in fake.prompts if "previously returned" in p)
+
+
+class StragglerFirstCandidate(FakeLLM):
+    """The plain tasks prompt (candidate 0) blocks until released; the prompt variants answer at once."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.release = threading.Event()
+        self.straggler_finished = threading.Event()
+
+    def respond(self, user_prompt):
+        if "TasksDoc JSON" in user_prompt and "independent draft" not in user_prompt:
+            self.release.wait(5)
+            self.straggler_finished.set()
+        return super().respond(user_prompt)
+
+
+def test_first_valid_candidate_wins():
+    print("Testing best-of-N tasks drafts...")
+    fake = FakeLLM(drafts={"tasks": tasks_with_defects(2)})
+    with use_fake_llm(fake):
+        result = run_pipeline(IDEA, [], use_cache=False, candidates={"tasks": 3})
+    assert result["issues"]["tasks"] == []
+    assert revise_calls(fake) == 0
+    attributes = draft_span(result, "tasks")["attributes"]
+    assert attributes["candidates"] == 3 and attributes["winner_issues"] == 0
+    prompts = [p for p in fake.prompts if "TasksDoc JSON" in p]
+    assert 1 <= len(prompts) <= 3 and len(set(prompts)) == len(prompts)
+    print("✅ A defective candidate is skipped without a revise round")
+
+
+def test_fewest_issues_fallback():
+    print("Testing the fallback when no candidate validates...")
+    drafts = {0: tasks_with_defects(3), 1: tasks_with_defects(1), 2: tasks_with_defects(2)}
+    doc = _best_of(TasksDoc, drafts.get, 3)
+    assert doc == drafts[1]
+
+    def flaky(i):
+        if i == 0:
+            raise TimeoutError("candidate timed out")
+        return drafts[i]
+
+    assert _best_of(TasksDoc, flaky, 3) == drafts[1]
+    try:
+        _best_of(TasksDoc, lambda i: flaky(0), 2)
+    except TimeoutError:
+        pass
+    else:
+        raise AssertionError("expected TimeoutError")
+    print("✅ The candidate with the fewest issues is revised; failed candidates are skipped")
+
+
+def test_candidate_budget():
+    print("Testing the candidate budget...")
+    with use_fake_llm(FakeLLM()):
+        result = run_pipeline(IDEA, [], use_cache=False, candidate_budget=3,
+                              candidates={"prd": 3, "milestones": 3, "tasks": 3})
+    assert draft_span(result, "prd")["attributes"]["candidates"] == 3
+    assert draft_span(result, "milestones")["attributes"]["candidates"] == 2
+    assert "candidates" not in draft_span(result, "tasks")["attributes"]
+    for bad in ({"goal": 2}, {"tasks": 0}):
+        try:
+            run_pipeline(IDEA, [], candidates=bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"expected ValueError for {bad}")
+    print("✅ Extra drafts stop once the budget is spent")
+
+
+def test_candidates_cut_tail_latency():
+    print("Testing tail latency with candidates...")
+    fake = StragglerFirstCandidate()
+    try:
+        with use_fake_llm(fake):
+            result = run_pipeline(IDEA, [], use_cache=False, candidates={"tasks": 3})
+        # The run finished while candidate 0 was still waiting for its reply
+        assert not fake.straggler_finished.is_set()
+        attributes = draft_span(result, "tasks")["attributes"]
+        assert attributes["winner"] != 0 and attributes["abandoned"] >= 1  # the other variant may still be running too
+    finally:
+        fake.release.set()
+    print("✅ The run returned without waiting for the straggling candidate")
+
+
+def test_async_candidates():
+    print("Testing candidates in run_pipeline_async...")
+    fake = FakeLLM(drafts={"tasks": tasks_with_defects(1)})
+    with use_fake_llm(fake):
+        result = asyncio.run(run_pipeline_async(IDEA, [], use_cache=False, candidates={"tasks": 3}, tasks_fanout=True))
+    assert result["issues"]["tasks"] == []
+    assert draft_span(result, "tasks")["attributes"]["winner_issues"] == 0
+    print("✅ Async pipeline drafts candidates too (with fan-out)")
+
+
+def main():
+    test_first_valid_candidate_wins()
+    test_fewest_issues_fallback()
+    test_candidate_budget()
+    test_candidates_cut_tail_latency()
+    test_async_candidates()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Test script for stage checkpointing and resume in run_pipeline
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import tempfile
+
+from schemas import PRD
+
+from fakes import use_fake_llm
+from pipeline import run_pipeline
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+CONSTRAINTS = ["Solo developer"]
+
+
+def test_resume_after_missing_or_invalid_stage():
+    print("Testing checkpoint resume...")
+    with tempfile.TemporaryDirectory() as run_dir:
+        with use_fake_llm() as fake:
+            first = run_pipeline(IDEA, CONSTRAINTS, run_id="run1", run_dir=run_dir)
+        assert len(fake.prompts) == 4
+        assert first["reused_stages"] == []
+        assert sorted(p.name for p in (Path(run_dir) / "run1").iterdir()) == [
+            "goal.json", "milestones.json", "prd.json", "tasks.json",
+        ]
+
+        # Everything checkpointed: no LLM calls at all
+        with use_fake_llm() as fake:
+            again = run_pipeline(IDEA, CONSTRAINTS, run_id="run1", run_dir=run_dir)
+        assert fake.prompts == []
+        assert again["reused_stages"] == ["goal", "prd", "milestones", "tasks"]
+        assert again["tasks_csv"] == first["tasks_csv"]
+
+        # Missing tasks checkpoint: only the tasks stage runs
+        (Path(run_dir) / "run1" / "tasks.json").unlink()
+        with use_fake_llm() as fake:
+            run_pipeline(IDEA, CONSTRAINTS, run_id="run1", run_dir=run_dir)
+        assert len(fake.prompts) == 1 and "TasksDoc" in fake.prompts[0]
+
+        # Corrupt milestones checkpoint: milestones rerun; since the fake returns
+        # the same milestones, the tasks checkpoint still matches its inputs
+        (Path(run_dir) / "run1" / "milestones.json").write_text("{not json")
+        with use_fake_llm() as fake:
+            result = run_pipeline(IDEA, CONSTRAINTS, run_id="run1", run_dir=run_dir)
+        assert len(fake.prompts) == 1
+        assert result["reused_stages"] == ["goal", "prd", "tasks"]
+
+        # A PRD checkpoint saved with issues is invalid: it and every later stage rerun
+        prd_path = Path(run_dir) / "run1" / "prd.json"
+        payload = json.loads(prd_path.read_text())
+        prd_path.write_text(json.dumps({**payload, "issues": ["Too few goals"]}))
+        with use_fake_llm() as fake:
+            result = run_pipeline(IDEA, CONSTRAINTS, run_id="run1", run_dir=run_dir)
+        assert len(fake.prompts) == 3
+        assert result["reused_stages"] == ["goal"]
+
+        # So is one the current validator rejects
+        payload = json.loads(prd_path.read_text())
+        payload["data"]["problem"] = "TBD"
+        prd_path.write_text(json.dumps(payload))
+        with use_fake_llm() as fake:
+            result = run_pipeline(IDEA, CONSTRAINTS, run_id="run1", run_dir=run_dir)
+        assert len(fake.prompts) == 3 and result["issues"]["prd"] == []
+    print("✅ Reruns resume at the first missing or invalid stage")
+
+
+def test_resume_from_stage():
+    print("Testing resume_from...")
+    with tempfile.TemporaryDirectory() as run_dir:
+        with use_fake_llm():
+            run_pipeline(IDEA, CONSTRAINTS, run_id="run2", run_dir=run_dir)
+        with use_fake_llm() as fake:
+            result = run_pipeline(IDEA, CONSTRAINTS, run_id="run2", run_dir=run_dir, resume_from="milestones")
+        assert len(fake.prompts) == 2
+        assert result["reused_stages"] == ["goal", "prd"]
+
+    try:
+        run_pipeline(IDEA, CONSTRAINTS, resume_from="prd")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("resume_from without run_id should raise")
+    print("✅ resume_from regenerates the named stage onwards")
+
+
+def test_incremental_replanning():
+    print("Testing incremental re-planning...")
+    with tempfile.TemporaryDirectory() as run_dir:
+        with use_fake_llm():
+            first = run_pipeline(IDEA, CONSTRAINTS, run_id="run3", run_dir=run_dir)
+
+        # Tweaked constraint: goal reruns; unchanged downstream inputs are reused
+        tweaked = CONSTRAINTS + ["No login"]
+        with use_fake_llm() as fake:
+            result = run_pipeline(IDEA, tweaked, run_id="run3", run_dir=run_dir)
+        assert len(fake.prompts) == 1 and "GoalInterpretation" in fake.prompts[0]
+        assert result["reused_stages"] == ["prd", "milestones", "tasks"]
+
+        # User-edited PRD goes straight into milestones and tasks
+        edited = PRD.model_validate({**first["prd"].model_dump(), "title": "Edited Planner"})
+        with use_fake_llm() as fake:
+            result = run_pipeline(IDEA, tweaked, run_id="run3", run_dir=run_dir, prd_override=edited)
+        assert len(fake.prompts) == 2
+        assert "MilestonesDoc" in fake.prompts[0] and "TasksDoc" in fake.prompts[1]
+        assert result["prd"].title == "Edited Planner"
+        assert result["reused_stages"] == ["goal"]
+
+        # The edited PRD is now the checkpoint: a plain rerun is free
+        with use_fake_llm() as fake:
+            result = run_pipeline(IDEA, tweaked, run_id="run3", run_dir=run_dir)
+        assert fake.prompts == []
+        assert result["prd"].title == "Edited Planner"
+    print("✅ Only stages with changed inputs were regenerated")
+
+
+def main():
+    test_resume_after_missing_or_invalid_stage()
+    test_resume_from_stage()
+    test_incremental_replanning()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Test script for the buffered, rotating JSONL event logger
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import gzip
+import json
+import multiprocessing
+import tempfile
+from unittest import mock
+
+import event_log
+from event_log import JsonlEventLogger, get_event_logger
+
+
+def read_lines(path):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_buffers_until_flush():
+    print("Testing buffered writes...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "logs" / "events.jsonl"
+        logger = JsonlEventLogger(str(path), flush_interval=60, clock=lambda: 123.0)
+        for i in range(10):
+            logger.log({"event": "e", "i": i})
+        assert not path.exists() or path.stat().st_size == 0
+        logger.flush()
+        assert read_lines(path) == [{"event": "e", "i": i} for i in range(10)]
+        logger.close()
+    print("✅ Events are written in one batch on flush, exactly as logged")
+
+
+def test_max_buffer_triggers_flush():
+    print("Testing max_buffer...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "events.jsonl"
+        with JsonlEventLogger(str(path), flush_interval=60, max_buffer=5) as logger:
+            for i in range(5):
+                logger.log({"i": i})
+            assert len(read_lines(path)) == 5
+    print("✅ A full buffer is flushed without waiting for the timer")
+
+
+def test_size_rotation_with_gzip():
+    print("Testing size-based rotation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "events.jsonl"
+        with JsonlEventLogger(str(path), flush_interval=60, max_bytes=200, backup_count=2, compress=True) as logger:
+            for i in range(12):
+                logger.log({"i": i, "pad": "x" * 40})
+                logger.flush()
+            assert logger.rotations > 2
+        backups = sorted(p.name for p in Path(tmp).iterdir() if p.name.startswith("events.jsonl."))
+        assert backups == ["events.jsonl.1.gz", "events.jsonl.2.gz", "events.jsonl.lock"]
+        newest = read_lines(path)
+        assert newest[-1]["i"] == 11
+        # Newest events live in the current file, the previous batch in .1.gz
+        assert read_lines(Path(tmp) / "events.jsonl.1.gz")[-1]["i"] == newest[0]["i"] - 1
+    print("✅ Rotated files are compressed and pruned to backup_count")
+
+
+def test_time_rotation():
+    print("Testing time-based rotation...")
+    now = [1000.0]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "events.jsonl"
+        with JsonlEventLogger(str(path), flush_interval=60, rotate_seconds=3600, clock=lambda: now[0]) as logger:
+            logger.log({"i": 0})
+            logger.flush()
+            now[0] += 1800
+            logger.log({"i": 1})
+            logger.flush()
+            now[0] += 1800
+            logger.log({"i": 2})
+            logger.flush()
+            assert logger.rotations == 1
+        assert [e["i"] for e in read_lines(Path(tmp) / "events.jsonl.1")] == [0, 1]
+        assert [e["i"] for e in read_lines(path)] == [2]
+
+        # A second logger on the same file sees when it was first written
+        now[0] += 1800
+        with JsonlEventLogger(str(path), flush_interval=60, rotate_seconds=3600, clock=lambda: now[0]) as logger:
+            logger.log({"i": 3})
+            logger.flush()
+            assert logger.rotations == 0
+            now[0] += 1800
+            logger.log({"i": 4})
+            logger.flush()
+            assert logger.rotations == 1
+        assert [e["i"] for e in read_lines(path)] == [4]
+    print("✅ Log rotates once its first write is rotate_seconds old, across loggers")
+
+
+def test_shared_logger_options():
+    print("Testing get_event_logger options...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "events.jsonl")
+        logger = get_event_logger(path, flush_interval=60, compress=True)
+        assert get_event_logger(path) is logger
+        assert get_event_logger(path, compress=True) is logger
+        try:
+            get_event_logger(path, compress=False, max_buffer=10)
+        except ValueError as e:
+            assert "compress" in str(e) and "max_buffer" in str(e)
+        else:
+            raise AssertionError("expected ValueError for conflicting options")
+        logger.close()
+    print("✅ Matching options reuse the logger; conflicting options raise ValueError")
+
+
+def test_short_writes_are_finished():
+    print("Testing partial os.write results...")
+    real_write = event_log.os.write
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "events.jsonl"
+        logger = JsonlEventLogger(str(path), flush_interval=60)
+        for i in range(20):
+            logger.log({"event": "e", "i": i})
+        with mock.patch.object(event_log.os, "write", side_effect=lambda fd, data: real_write(fd, data[:7])):
+            logger.flush()
+        assert read_lines(path) == [{"event": "e", "i": i} for i in range(20)]
+        logger.close()
+    print("✅ A flush keeps writing until the whole batch is on disk")
+
+
+def test_on_create_runs_once():
+    print("Testing get_event_logger on_create...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "events.jsonl")
+        created = []
+        logger = get_event_logger(path, on_create=lambda: created.append(1))
+        for _ in range(3):
+            get_event_logger(path, on_create=lambda: created.append(1)).log({"event": "e"})
+        assert created == [1]
+        logger.close()
+    print("✅ on_create runs only when the logger is created")
+
+
+def _write_from_process(path: str, worker: int, count: int) -> None:
+    with JsonlEventLogger(path, flush_interval=0.01, max_buffer=7, max_bytes=40_000, backup_count=50) as logger:
+        for i in range(count):
+            logger.log({"worker": worker, "i": i, "pad": "y" * (50 + i % 200)})
+
+
+def test_processes_do_not_interleave():
+    print("Testing concurrent writers in several processes...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "events.jsonl")
+        procs = [multiprocessing.Process(target=_write_from_process, args=(path, w, 300)) for w in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+            assert p.exitcode == 0
+        events = []
+        for f in Path(tmp).iterdir():
+            if f.name.startswith("events.jsonl") and not f.name.endswith(".lock"):
+                events.extend(read_lines(f))  # every line must parse
+        assert len(events) == 1200
+        for w in range(4):
+            assert sorted(e["i"] for e in events if e["worker"] == w) == list(range(300))
+    print("✅ 1200 events from 4 processes, all lines intact across rotations")
+
+
+def main():
+    test_buffers_until_flush()
+    test_max_buffer_triggers_flush()
+    test_size_rotation_with_gzip()
+    test_time_rotation()
+    test_shared_logger_options()
+    test_short_writes_are_finished()
+    test_on_create_runs_once()
+    test_processes_do_not_interleave()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Test script for the indexed event history (event_store.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+from event_log import close_event_logs
+from event_store import EventStore, main as event_store_main, normalize_issue
+from fakes import FakeLLM, make_tasks, use_fake_llm
+from llm import use_backend
+from pipeline import run_pipeline
+from stub_llm import StubLLM
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def write_events(path, events, partial=""):
+    with open(path, "a", encoding="utf-8") as f:
+        for e in events:
+            f.write(json.dumps(e) + "\n")
+        f.write(partial)
+
+
+def test_normalize_issue():
+    print("Testing normalize_issue...")
+    assert normalize_issue("Task T005 estimate_hours must be > 0.") == "Task T# estimate_hours must be > N."
+    assert normalize_issue("Task T012 has unknown dependency 'T099'.") == "Task T# has unknown dependency '…'."
+    print("✅ Ids, numbers and quoted values are collapsed")
+
+
+def test_incremental_ingest():
+    print("Testing incremental ingest from a byte offset...")
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "events.jsonl")
+        store = EventStore(os.path.join(tmp, "events.sqlite3"))
+        write_events(log, [
+            {"event": "tasks_validation", "attempt": 1, "issues": ["Task T001 has no acceptance criteria."]},
+            {"event": "tasks_validation", "attempt": 2, "issues": []},
+        ], partial='{"event": "prd_valid')
+        assert store.ingest(log) == 2
+        assert store.ingest(log) == 0
+        # The torn line is completed by the writer, then more events follow
+        with open(log, "a", encoding="utf-8") as f:
+            f.write('ation", "attempt": 1, "issues": []}\n')
+        write_events(log, [{"event": "prd_validation", "attempt": 2, "issues": []}])
+        assert store.ingest(log) == 2
+        assert store.event_counts() == {"tasks_validation": 2, "prd_validation": 2}
+        # A recreated (truncated) log is read from the start
+        os.remove(log)
+        write_events(log, [{"event": "x"}] * 3)
+        assert store.ingest(log) == 3
+        store.close()
+    print("✅ Only new complete lines are indexed on each ingest")
+
+
+def test_ingest_across_rotation():
+    print("Testing ingest across a log rotation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "events.jsonl")
+        store = EventStore(":memory:")
+        write_events(log, [{"event": "a"}] * 2)
+        assert store.ingest(log) == 2
+        write_events(log, [{"event": "b"}] * 3)
+        os.replace(log, log + ".1")
+        write_events(log, [{"event": "c"}] * 4)
+        assert store.ingest(log) == 7
+        assert store.event_counts() == {"c": 4, "b": 3, "a": 2}
+    print("✅ Tail of the rotated file and the new file are both ingested")
+
+
+def test_queries_over_pipeline_runs():
+    print("Testing queries over pipeline event logs...")
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "events.jsonl")
+        for _ in range(3):
+            draft = make_tasks()
+            draft["tasks"][3]["acceptance_criteria"] = []
+            with use_fake_llm(FakeLLM(drafts={"tasks": draft}, patches=[[
+                {"op": "replace", "path": "/tasks/3/acceptance_criteria", "value": ["Works"]},
+            ]])):
+                run_pipeline(IDEA, [], log_path=log)
+        close_event_logs()
+
+        store = EventStore(":memory:")
+        store.ingest(log)
+        attempts = store.attempts_per_stage()
+        assert attempts["tasks"]["runs"] == 3 and attempts["tasks"]["mean_attempts"] == 2
+        assert attempts["prd"]["mean_attempts"] == 1 and attempts["tasks"]["revisions"] == 3
+        top = store.issue_frequency(stage="tasks")
+        assert top[0][1] == 3 and "T#" in top[0][0]
+        histogram = store.latency_histogram(bucket_seconds=60)
+        assert histogram == [(0.0, 12)]  # 4 stage_complete events per run
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            event_store_main(["--db", os.path.join(tmp, "cli.sqlite3"), "--log", log, "attempts"])
+        assert out.getvalue().startswith("tasks")
+    print("✅ Attempts, issue frequency and latency come from the index")
+
+
+def test_issue_totals_match_the_run():
+    print("Testing issue totals against a run's final issues...")
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "events.jsonl")
+        with use_backend(StubLLM(defect_rate=1.0, fix_rate=0.0)):
+            result = run_pipeline(IDEA, [], use_cache=False, max_attempts=1, log_path=log)
+        close_event_logs()
+        store = EventStore(":memory:")
+        store.ingest(log)
+        for stage, issues in result["issues"].items():
+            assert issues
+            assert sum(n for _, n in store.issue_frequency(stage=stage, top=1000, raw=True)) == len(issues), stage
+    print("✅ Issues repeated by stage_complete are not counted twice")
+
+
+def test_large_history():
+    print("Testing aggregates over a large history...")
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "events.jsonl")
+        stages = ["prd", "milestones", "tasks"]
+        write_events(log, (
+            {"event": f"{stages[i % 3]}_validation", "run_id": f"r{i // 9}", "attempt": i % 3 + 1,
+             "issues": [f"Task T{i % 40:03d} estimate_hours must be > 0."], "ts": float(i)}
+            for i in range(50_000)
+        ))
+        store = EventStore(os.path.join(tmp, "events.sqlite3"))
+        assert store.ingest(log) == 50_000
+        attempts = store.attempts_per_stage()
+        assert attempts["tasks"]["validations"] == 16_666 and attempts["tasks"]["max_attempts"] == 3
+        top = store.issue_frequency(stage="tasks", top=100)
+        assert top == [("Task T# estimate_hours must be > N.", 16_666)]
+        # The queries are answered from the indexes, not by scanning the tables
+        plan = " ".join(row[-1] for row in store._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT pattern, COUNT(*) FROM issues WHERE stage = ? GROUP BY pattern", ["tasks"]))
+        assert "USING" in plan and "INDEX issues_pattern" in plan, plan
+        store.close()
+    print("✅ Aggregates over 50k events come from the indexes")
+
+
+def main():
+    test_normalize_issue()
+    test_incremental_ingest()
+    test_ingest_across_rotation()
+    test_queries_over_pipeline_runs()
+    test_issue_totals_match_the_run()
+    test_large_history()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Test script for json_patch.py and patch-based revise rounds in run_pipeline
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fakes import FakeLLM, make_tasks, use_fake_llm
+from json_patch import PatchError, apply_patch
+from pipeline import run_pipeline
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def test_apply_patch_operations():
+    print("Testing apply_patch...")
+    doc = {"title": "T", "items": ["a", "b"], "nested": {"x/y": 1, "k~": 2}}
+    patched = apply_patch(doc, [
+        {"op": "replace", "path": "/title", "value": "New"},
+        {"op": "add", "path": "/items/-", "value": "c"},
+        {"op": "add", "path": "/items/0", "value": "z"},
+        {"op": "remove", "path": "/nested/x~1y"},
+        {"op": "test", "path": "/nested/k~0", "value": 2},
+        {"op": "copy", "from": "/title", "path": "/copy"},
+        {"op": "move", "from": "/copy", "path": "/moved"},
+    ])
+    assert patched == {"title": "New", "items": ["z", "a", "b", "c"], "nested": {"k~": 2}, "moved": "New"}
+    assert doc["title"] == "T"  # original untouched
+    print("✅ add/remove/replace/move/copy/test applied")
+
+
+def test_apply_patch_errors():
+    print("Testing apply_patch errors...")
+    for bad in (
+        [{"op": "replace", "path": "/missing", "value": 1}],
+        [{"op": "replace", "path": "/items/5", "value": 1}],
+        [{"op": "test", "path": "/title", "value": "other"}],
+        [{"op": "explode", "path": "/title"}],
+        [{"path": "/title"}],
+    ):
+        try:
+            apply_patch({"title": "T", "items": []}, bad)
+        except PatchError:
+            continue
+        raise AssertionError(f"Expected PatchError for {bad}")
+    print("✅ Bad patches raise PatchError")
+
+
+def test_pipeline_revises_with_patch():
+    print("Testing patch revise round...")
+    draft = make_tasks()
+    draft["tasks"][4]["priority"] = "High"
+    fake = FakeLLM(drafts={"tasks": draft}, patches=[[{"op": "replace", "path": "/tasks/4/priority", "value": "P1"}]])
+    with use_fake_llm(fake):
+        result = run_pipeline(IDEA, [], auto_repair=False)
+    assert result["issues"]["tasks"] == []
+    assert result["tasks"].tasks[4].priority == "P1"
+    assert len(fake.prompts) == 5 and "JSON Patch" in fake.prompts[-1]
+    print("✅ One patch round fixed the flagged field")
+
+
+def test_pipeline_falls_back_to_full_revision():
+    print("Testing fallback to full revision...")
+    draft = make_tasks()
+    draft["tasks"][4]["priority"] = "High"
+    fake = FakeLLM(drafts={"tasks": draft}, patches=[[{"op": "replace", "path": "/tasks/99/priority", "value": "P1"}]])
+    with use_fake_llm(fake):
+        result = run_pipeline(IDEA, [], auto_repair=False)
+    assert result["issues"]["tasks"] == []
+    assert len(fake.prompts) == 6
+    assert "JSON Patch" in fake.prompts[-2] and "Return corrected TasksDoc JSON" in fake.prompts[-1]
+    print("✅ Unappliable patch fell back to a full-document revision")
+
+
+def main():
+    test_apply_patch_operations()
+    test_apply_patch_errors()
+    test_pipeline_revises_with_patch()
+    test_pipeline_falls_back_to_full_revision()
+
+
+if __name__ == "__main__":
+    main()
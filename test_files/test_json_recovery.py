@@ -0,0 +1,110 @@
+"""
+Test script for salvaging wrapped and truncated JSON replies (json_recovery.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import json
+
+from benchmarks.stub_server import StubLLMServer
+from cache import ResponseCache, get_cache, make_key, set_cache
+from fakes import make_tasks
+from json_recovery import JsonRecoveryError, PartialDocument, recover_json
+from llm import call_llm_json, call_llm_json_stream, close_clients, get_client, use_backend
+from pipeline import run_pipeline, run_pipeline_async
+from stub_llm import StubLLM
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def test_unwraps_fences_and_prose():
+    print("Testing fenced and wrapped replies...")
+    doc = make_tasks(5)
+    text = "Here is your plan:\n```json\n" + json.dumps(doc, indent=2) + "\n```\nLet me know if you need changes."
+    data = recover_json(text)
+    assert data == doc and not isinstance(data, PartialDocument)
+    print("✅ Markdown fences and surrounding prose are dropped")
+
+
+def test_truncated_list_keeps_complete_elements():
+    print("Testing a reply cut off inside the tasks list...")
+    text = json.dumps(make_tasks(40))
+    cut = text.index('"task_id": "T039"') + 30  # partway through the 39th task
+    data = recover_json(text[:cut])
+    assert isinstance(data, PartialDocument) and data.field == "tasks"
+    assert [t["task_id"] for t in data["tasks"]] == [f"T{i:03d}" for i in range(1, 39)]
+    assert data["tasks"] == make_tasks(40)["tasks"][:38]
+
+    # Strings with brackets, quotes and escapes do not confuse the scanner
+    text = json.dumps({"title": 'A "quoted" {title} [x]', "goals": ["one, \\ two", "three ]", "four"]})[:-4]
+    data = recover_json(text)
+    assert data == {"title": 'A "quoted" {title} [x]', "goals": ["one, \\ two", "three ]"]}
+
+    # A scalar field that was still being written is dropped, with its name kept
+    data = recover_json('{"title": "Plan", "problem": "Users of the app lack a simp')
+    assert data == {"title": "Plan"} and data.field == "problem"
+    print("✅ The first 38 fully formed tasks survive; the half-written one is dropped")
+
+
+def test_unsalvageable_replies():
+    print("Testing replies with nothing to salvage...")
+    for text in ("Sorry, I cannot help with that.", '{"title": "Pla', '{"title": [1}', ""):
+        try:
+            recover_json(text)
+        except JsonRecoveryError:
+            pass
+        else:
+            raise AssertionError(f"expected JsonRecoveryError for {text!r}")
+    print("✅ No object, mismatched brackets or no complete field raise JsonRecoveryError")
+
+
+def test_truncated_reply_is_not_retried_or_cached():
+    print("Testing a truncated reply through call_llm_json...")
+    set_cache(ResponseCache(path=None))
+    content = json.dumps(make_tasks(30))
+    with StubLLMServer(content=content, faults=["truncated", "truncated"]) as server:
+        client = get_client(api_key="test", base_url=server.base_url)
+        data = call_llm_json("system", "user", client=client)
+        assert isinstance(data, PartialDocument) and 0 < len(data["tasks"]) < 30
+        assert server.requests == 1
+        assert get_cache().get(make_key("system", "user", "gpt-5-nano")) is None
+
+        items = []
+        data = call_llm_json_stream("system", "user", on_item=lambda f, i: items.append(i), client=client)
+        assert isinstance(data, PartialDocument) and data["tasks"] == items
+        assert server.requests == 2
+    close_clients()
+    print("✅ One request, partial document returned, nothing cached")
+
+
+def test_pipeline_continues_truncated_draft():
+    print("Testing the pipeline on truncated tasks drafts...")
+    stub = StubLLM(truncate_rate=1.0)
+    with use_backend(stub):
+        result = run_pipeline(IDEA, [], use_cache=False)
+    assert result["issues"]["tasks"] == [] and len(result["tasks"].tasks) == stub.tasks
+    assert stub.calls["tasks"] == 1 and stub.calls["continue"] == 1 and stub.calls["revise"] == 0
+    span = next(s for s in result["spans"] if s["name"] == "continue")
+    assert span["attributes"]["field"] == "tasks"
+
+    stub = StubLLM(truncate_rate=1.0)
+    with use_backend(stub):
+        result = asyncio.run(run_pipeline_async(IDEA, [], use_cache=False))
+    assert len(result["tasks"].tasks) == stub.tasks and stub.calls["continue"] == 1
+    print("✅ One continuation call asks only for the missing tasks")
+
+
+def main():
+    test_unwraps_fences_and_prose()
+    test_truncated_list_keeps_complete_elements()
+    test_unsalvageable_replies()
+    test_truncated_reply_is_not_retried_or_cached()
+    test_pipeline_continues_truncated_draft()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Test script for incremental JSON parsing of streamed completions
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+
+from benchmarks.stub_server import StubLLMServer
+from cache import ResponseCache, set_cache
+from fakes import make_tasks, use_fake_llm
+from jsonstream import JsonItemStream, JsonStreamError, iter_json_items
+from llm import call_llm_json_stream, close_clients, get_client
+from pipeline import iter_pipeline, run_pipeline
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def test_items_complete_as_they_close():
+    print("Testing element-by-element parsing...")
+    doc = {"title": "Plan {v1}", "notes": ["a \"quoted\" ]", "b"], "tasks": make_tasks(3)["tasks"]}
+    text = json.dumps(doc, indent=2)
+    stream = JsonItemStream()
+    seen = []
+    for i, ch in enumerate(text):
+        for field, item in stream.feed(ch):
+            seen.append((field, item))
+            if field == "tasks" and len(seen) == 3:
+                # First task is available long before the document ends
+                assert i < len(text) * 0.6
+    assert seen == [("notes", n) for n in doc["notes"]] + [("tasks", t) for t in doc["tasks"]]
+    assert stream.close() == doc
+    print("✅ Each element is returned as soon as it closes")
+
+
+def test_malformed_output_fails_fast():
+    print("Testing early abort on malformed output...")
+    for text, fed in (("Sure! Here is the JSON: {", 1), ('{"tasks": [{"a": 1]}', 19), ('{"a": 1} trailing', 10)):
+        stream = JsonItemStream()
+        try:
+            for i in range(len(text)):
+                stream.feed(text[i])
+        except JsonStreamError:
+            assert i + 1 == fed, (text, i)
+        else:
+            raise AssertionError(f"expected JsonStreamError for {text!r}")
+    try:
+        list(iter_json_items(['{"tasks": [', '{"a": 1}']))
+    except JsonStreamError:
+        pass
+    else:
+        raise AssertionError("expected JsonStreamError for a truncated stream")
+    print("✅ Bad replies are rejected at the first bad character")
+
+
+def test_lenient_skips_fences_and_prose():
+    print("Testing lenient parsing of wrapped replies...")
+    doc = make_tasks(3)
+    text = "Here is your plan:\n```json\n" + json.dumps(doc, indent=2) + "\n```\nLet me know {if} you need changes."
+    stream = JsonItemStream(lenient=True)
+    seen = [item for i in range(0, len(text), 5) for item in stream.feed(text[i:i + 5])]
+    assert seen == [("tasks", t) for t in doc["tasks"]] and stream.close() == doc
+
+    stream = JsonItemStream(lenient=True, max_preamble=50)
+    try:
+        for ch in "I cannot help with that. " * 4:
+            stream.feed(ch)
+    except JsonStreamError:
+        assert len(stream.text) == 51
+    else:
+        raise AssertionError("expected JsonStreamError for a long preamble")
+
+    set_cache(ResponseCache(path=None))
+    with StubLLMServer(content=text, chunk_size=7) as server:
+        client = get_client(api_key="test", base_url=server.base_url)
+        seen = []
+        data = call_llm_json_stream("sys", "user", on_item=lambda f, item: seen.append(item["task_id"]), client=client)
+        assert data == doc and seen == ["T001", "T002", "T003"] and server.requests == 1
+    close_clients()
+    print("✅ A fenced reply with prose around it streams its items and parses")
+
+
+def test_stream_from_server():
+    print("Testing call_llm_json_stream against stub server...")
+    set_cache(ResponseCache(path=None))
+    content = json.dumps(make_tasks(5))
+    with StubLLMServer(content=content, chunk_size=7) as server:
+        client = get_client(api_key="test", base_url=server.base_url)
+        seen = []
+        data = call_llm_json_stream("sys", "user", on_item=lambda f, item: seen.append(item["task_id"]), client=client)
+        assert data == json.loads(content)
+        assert seen == ["T001", "T002", "T003", "T004", "T005"]
+        # A cache hit replays the same elements
+        seen.clear()
+        call_llm_json_stream("sys", "user", on_item=lambda f, item: seen.append(item["task_id"]), client=client)
+        assert len(seen) == 5 and server.requests == 1
+    close_clients()
+    print("✅ Streamed tasks arrive one by one and match the full reply")
+
+
+def test_stream_aborts_early():
+    print("Testing early abort against stub server...")
+    set_cache(ResponseCache(path=None))
+    content = "I cannot help with that. " * 200
+    with StubLLMServer(content=content, chunk_size=8, chunk_delay=0.001) as server:
+        client = get_client(api_key="test", base_url=server.base_url)
+        try:
+            call_llm_json_stream("sys", "user", client=client, use_cache=False)
+        except ValueError as e:
+            assert "valid JSON" in str(e)
+        else:
+            raise AssertionError("expected ValueError")
+        assert server.chunks_sent < len(content) // 8
+    close_clients()
+    print("✅ Stream abandoned before the whole completion was sent")
+
+
+def test_pipeline_on_item():
+    print("Testing on_item in run_pipeline and iter_pipeline...")
+    seen = []
+    with use_fake_llm():
+        run_pipeline(IDEA, [], on_item=lambda stage, field, item: seen.append((stage, field)))
+        events = list(iter_pipeline(IDEA, [], stream_items=True))
+    assert seen.count(("tasks", "tasks")) == 24 and seen.count(("milestones", "milestones")) == 4
+    names = [name for name, _ in events]
+    # Task elements stream before the validated tasks stage
+    assert names.index("item", names.index("milestones")) < names.index("tasks")
+    assert names[-1] == "result"
+    print("✅ Draft elements reach callers before each stage validates")
+
+
+def main():
+    test_items_complete_as_they_close()
+    test_malformed_output_fails_fast()
+    test_lenient_skips_fences_and_prose()
+    test_stream_from_server()
+    test_stream_aborts_early()
+    test_pipeline_on_item()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Test script for the pooled client registry in llm.py
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_server import StubLLMServer
+from cache import ResponseCache, set_cache
+from llm import call_llm_json, call_llm_json_async, get_async_client, get_client, close_clients
+
+
+def test_get_client_is_shared():
+    print("Testing get_client reuse...")
+    a = get_client(api_key="test", base_url="http://127.0.0.1:9/v1")
+    b = get_client(api_key="test", base_url="http://127.0.0.1:9/v1")
+    c = get_client(api_key="test", base_url="http://127.0.0.1:9/v1", max_connections=2)
+    assert a is b
+    assert a is not c
+    close_clients()
+    print("✅ Same configuration returns the same client")
+
+
+def test_get_client_thread_safe():
+    print("Testing get_client from many threads...")
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        clients = list(pool.map(lambda _: get_client(api_key="test", base_url="http://127.0.0.1:9/v1"), range(64)))
+    assert len({id(c) for c in clients}) == 1
+    close_clients()
+    print("✅ One client created across 16 threads")
+
+
+def test_pooled_client_reuses_connection():
+    print("Testing keep-alive against stub server...")
+    set_cache(ResponseCache(path=None))
+    with StubLLMServer(content='{"title": "Stub"}') as server:
+        client = get_client(api_key="test", base_url=server.base_url)
+        for _ in range(5):
+            assert call_llm_json("system", "user", client=client, use_cache=False) == {"title": "Stub"}
+        assert server.requests == 5
+        assert server.connections == 1
+    close_clients()
+    print("✅ 5 calls over 1 connection")
+
+
+def test_async_call_and_timeout():
+    print("Testing call_llm_json_async against stub server...")
+    set_cache(ResponseCache(path=None))
+
+    async def run(server):
+        client = get_async_client(api_key="test", base_url=server.base_url)
+        results = await asyncio.gather(*(
+            call_llm_json_async("system", f"user {i}", client=client) for i in range(10)
+        ))
+        assert results == [{"title": "Stub"}] * 10
+        try:
+            await call_llm_json_async("system", "slow", client=client, timeout=0.01)
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    with StubLLMServer(content='{"title": "Stub"}', delay=0.05) as server:
+        assert asyncio.run(run(server))
+        assert server.requests >= 10
+    print("✅ Concurrent async calls succeed and slow calls time out")
+
+
+def main():
+    test_get_client_is_shared()
+    test_get_client_thread_safe()
+    test_pooled_client_reuses_connection()
+    test_async_call_and_timeout()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Test script for run_pipeline / run_pipeline_async against canned LLM responses
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+from fakes import use_fake_llm
+from pipeline import run_pipeline, run_pipeline_async
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+CONSTRAINTS = ["Solo developer", "MVP in 2 weeks"]
+
+
+def test_async_matches_sync_shape():
+    print("Testing run_pipeline_async result shape...")
+    with use_fake_llm() as fake:
+        sync_result = run_pipeline(IDEA, CONSTRAINTS)
+        sync_calls = len(fake.prompts)
+        async_result = asyncio.run(run_pipeline_async(IDEA, CONSTRAINTS))
+
+    assert set(async_result) == set(sync_result)
+    assert len(fake.prompts) == 2 * sync_calls == 8
+    for key in ("prd_md", "milestones_md", "tasks_csv", "issues"):
+        assert async_result[key] == sync_result[key]
+    print("✅ Async and sync pipelines return the same result")
+
+
+def test_async_pipelines_run_concurrently():
+    print("Testing many async pipelines in one loop...")
+
+    async def main():
+        return await asyncio.gather(*(run_pipeline_async(f"{IDEA} #{i}", CONSTRAINTS) for i in range(20)))
+
+    with use_fake_llm() as fake:
+        results = asyncio.run(main())
+    assert len(results) == 20
+    assert len(fake.prompts) == 80
+    print("✅ 20 plans generated in a single event loop")
+
+
+def main():
+    test_async_matches_sync_shape()
+    test_async_pipelines_run_concurrently()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Test script for compact, field-pruned prompt context (prompt_context.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+
+from fakes import FakeLLM, make_goal, make_milestones, make_prd, use_fake_llm
+from pipeline import _tasks_prompt, run_pipeline
+from prompt_context import build_context, context_report, count_tokens
+from schemas import GoalInterpretation, MilestonesDoc, PRD
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+GI = GoalInterpretation.model_validate(make_goal())
+PRD_DOC = PRD.model_validate(make_prd())
+MDOC = MilestonesDoc.model_validate(make_milestones())
+
+
+def test_fields_pruned_and_minified():
+    print("Testing field pruning and minified JSON...")
+    context = build_context("tasks", "prd", PRD_DOC, budget=None)
+    data = json.loads(context)
+    assert "risks" not in data and "open_questions" not in data and "user_stories" not in data
+    assert data["functional_requirements"] == PRD_DOC.functional_requirements
+    assert "\n" not in context and ", " not in context.replace(", I want", "")
+    assert json.loads(build_context("tasks", "milestones", MDOC, budget=None)) == MDOC.model_dump()
+    prompt = _tasks_prompt(PRD_DOC, MDOC, budget=None)
+    assert "open_questions" not in prompt and "Which date formats" not in prompt
+    print("✅ Tasks prompt carries only the PRD fields it needs, minified")
+
+
+def test_budget_trims_longest_lists():
+    print("Testing token budget...")
+    full = build_context("milestones", "prd", PRD_DOC, budget=None)
+    budget = count_tokens(full) // 2
+    trimmed = build_context("milestones", "prd", PRD_DOC, budget=budget)
+    assert count_tokens(trimmed) <= budget
+    data = json.loads(trimmed)
+    assert data["user_stories"][-1].startswith("(+") and data["user_stories"][-1].endswith("more)")
+    assert data["title"] == PRD_DOC.title and data["problem"] == PRD_DOC.problem
+    # Every list keeps at least its first real item
+    assert all(len(v) >= 1 and not v[0].startswith("(+") for v in data.values() if isinstance(v, list))
+    print(f"✅ {count_tokens(full)} -> {count_tokens(trimmed)} tokens within a budget of {budget}")
+
+
+def test_report_shows_savings():
+    print("Testing per-stage token report...")
+    report = context_report(GI, PRD_DOC, MDOC, budget=None)
+    assert set(report) == {"prd", "milestones", "tasks"}
+    for stage, row in report.items():
+        assert row["compact_tokens"] < row["full_tokens"], stage
+    assert report["tasks"]["saved_pct"] > 30
+    print("✅ Every stage embeds fewer tokens; tasks saves " + f"{report['tasks']['saved_pct']}%")
+
+
+def test_pipeline_uses_budget():
+    print("Testing context_budget in run_pipeline...")
+    fake = FakeLLM()
+    with use_fake_llm(fake):
+        result = run_pipeline(IDEA, [], context_budget=80)
+    tasks_prompt = next(p for p in fake.prompts if "tasksdoc json" in p.lower())
+    assert "more)" in tasks_prompt
+    assert result["context_tokens"]["tasks"]["compact_tokens"] < result["context_tokens"]["tasks"]["full_tokens"]
+    print("✅ Budget reaches the stage prompts and the result report")
+
+
+def main():
+    test_fields_pruned_and_minified()
+    test_budget_trims_longest_lists()
+    test_report_shows_savings()
+    test_pipeline_uses_budget()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Test script for deterministic document repairs (repairs.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fakes import FakeLLM, make_milestones, make_prd, make_tasks, use_fake_llm
+from pipeline import run_pipeline
+from repairs import repair_milestones, repair_prd, repair_tasks
+from schemas import PRD, MilestonesDoc, TasksDoc
+from validators import validate_milestones, validate_prd, validate_tasks
+
+
+def test_repair_tasks():
+    print("Testing repair_tasks...")
+    data = make_tasks(50)
+    data["tasks"][0].update(priority="High", type="Back-End", estimate_hours=40)
+    data["tasks"][1].update(priority="p2", type="QA", estimate_hours=0.1)
+    data["tasks"][2]["depends_on"] = ["T003", "T002", "T002", "T999"]
+    data["tasks"][3]["depends_on"] = ["T048"]  # points at a task that gets trimmed
+    tdoc, changes = repair_tasks(TasksDoc.model_validate(data))
+
+    assert validate_tasks(tdoc) == []
+    t = tdoc.tasks
+    assert (t[0].priority, t[0].type, t[0].estimate_hours) == ("P0", "backend", 24)
+    assert (t[1].priority, t[1].type, t[1].estimate_hours) == ("P2", "testing", 0.5)
+    assert t[2].depends_on == ["T002"]
+    assert t[3].depends_on == []
+    assert len(t) == 45
+    assert any("Trimmed tasks" in c for c in changes)
+    print(f"✅ {len(changes)} mechanical fixes applied")
+
+
+def test_repair_leaves_semantic_issues():
+    print("Testing repair leaves semantic issues alone...")
+    data = make_tasks()
+    data["tasks"][0]["type"] = "marketing"
+    tdoc, _ = repair_tasks(TasksDoc.model_validate(data))
+    assert validate_tasks(tdoc) == ["Task T001 has invalid type 'marketing'."]
+    print("✅ Unknown type still reported")
+
+
+def test_repair_prd_and_milestones():
+    print("Testing repair_prd / repair_milestones...")
+    prd_data = make_prd()
+    prd_data["functional_requirements"] = [f"Requirement {i}" for i in range(14)] + ["  "]
+    prd, changes = repair_prd(PRD.model_validate(prd_data))
+    assert validate_prd(prd) == [] and len(prd.functional_requirements) == 10
+    assert len(changes) == 2
+
+    m_data = make_milestones(8)
+    m_data["milestones"][0]["est_days"] = 30
+    mdoc, changes = repair_milestones(MilestonesDoc.model_validate(m_data))
+    assert validate_milestones(mdoc) == []
+    assert mdoc.milestones[0].est_days == 14 and len(mdoc.milestones) == 6
+    print("✅ Lists trimmed and est_days clamped")
+
+
+def test_pipeline_skips_revise_round():
+    print("Testing pipeline repairs instead of revising...")
+    draft = make_tasks()
+    draft["tasks"][4]["priority"] = "High"
+    fake = FakeLLM(drafts={"tasks": draft})
+    with use_fake_llm(fake):
+        result = run_pipeline("Idea", [])
+    assert len(fake.prompts) == 4
+    assert result["issues"]["tasks"] == []
+    assert result["repairs"]["tasks"] == ["Task T005 priority 'High' normalized to 'P0'."]
+    print("✅ No LLM revise round needed")
+
+
+def main():
+    test_repair_tasks()
+    test_repair_leaves_semantic_issues()
+    test_repair_prd_and_milestones()
+    test_pipeline_skips_revise_round()
+
+
+if __name__ == "__main__":
+    main()
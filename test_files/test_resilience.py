@@ -0,0 +1,188 @@
+"""
+Test script for retries, deadlines, hedging and the circuit breaker (resilience.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import time
+
+import openai
+
+from benchmarks.stub_server import StubLLMServer
+from cache import ResponseCache, set_cache
+from llm import (
+    InvalidJSONError, call_llm_json, call_llm_json_async, call_llm_json_stream, close_clients, get_async_client,
+    get_client,
+)
+from resilience import CircuitBreaker, CircuitOpenError, Resilience, ResiliencePolicy, use_resilience
+from tracing import Tracer, span
+
+CONTENT = '{"title": "Stub"}'
+
+
+def fast_policy(**overrides) -> Resilience:
+    settings = dict(retries=3, backoff_base=0.001, backoff_max=0.01, hedge=False, breaker_failures=0)
+    return Resilience(ResiliencePolicy(**{**settings, **overrides}))
+
+
+def traced(fn):
+    """Run fn() inside a span and return (result, the span's attributes)."""
+    tracer = Tracer()
+    with tracer.activate(), span("test"):
+        result = fn()
+    return result, next(s for s in tracer.to_dicts() if s["name"] == "llm")["attributes"]
+
+
+def test_retries_transient_errors():
+    print("Testing retries against injected faults...")
+    set_cache(ResponseCache(path=None))
+    with StubLLMServer(content=CONTENT, faults=["error", "rate_limit", "bad_json"]) as server, \
+            use_resilience(fast_policy()):
+        client = get_client(api_key="test", base_url=server.base_url)
+        data, attributes = traced(lambda: call_llm_json("system", "user", client=client, use_cache=False))
+        assert data == {"title": "Stub"} and server.requests == 4 and attributes["retries"] == 3
+
+        # A 400 is the caller's fault: raised at once, not retried
+        server.faults = ["bad_request"]
+        try:
+            call_llm_json("system", "user", client=client, use_cache=False)
+        except openai.BadRequestError:
+            pass
+        else:
+            raise AssertionError("expected BadRequestError")
+        assert server.requests == 5
+
+        # Streams retry too, as long as no item has been delivered yet
+        server.faults = ["error"]
+        assert call_llm_json_stream("system", "user", client=client, use_cache=False) == {"title": "Stub"}
+        assert server.requests == 7
+    close_clients()
+    print("✅ 500, 429 and invalid JSON are retried; 400 is not")
+
+
+def test_deadline():
+    print("Testing the per-call deadline...")
+    set_cache(ResponseCache(path=None))
+    with StubLLMServer(content=CONTENT, faults=["stall"], stall=2.0) as server, \
+            use_resilience(fast_policy(deadline=0.3)):
+        client = get_client(api_key="test", base_url=server.base_url)
+        t0 = time.perf_counter()
+        try:
+            call_llm_json("system", "user", client=client, use_cache=False)
+        except (TimeoutError, openai.APITimeoutError):
+            pass
+        else:
+            raise AssertionError("expected a timeout")
+        assert time.perf_counter() - t0 < 1.0
+    close_clients()
+    print("✅ A stalled request fails at the deadline, not when the server answers")
+
+
+def test_hedging():
+    print("Testing hedged requests...")
+    set_cache(ResponseCache(path=None))
+    resilience = fast_policy(hedge=True, hedge_min_samples=5, hedge_min_delay=0.05)
+    with StubLLMServer(content=CONTENT, stall=2.0) as server, use_resilience(resilience):
+        client = get_client(api_key="test", base_url=server.base_url)
+        for i in range(5):
+            call_llm_json("system", f"warm-up {i}", client=client, use_cache=False, hedge_key="patch")
+        assert resilience.hedge_delay("gpt-5-nano", "patch") == 0.05
+        # Latencies of one kind of call do not decide when another kind is hedged
+        assert resilience.hedge_delay("gpt-5-nano", "tasks") is None and resilience.hedge_delay("gpt-5-nano") is None
+
+        server.faults = ["stall"]
+        t0 = time.perf_counter()
+        data, attributes = traced(lambda: call_llm_json("system", "user", client=client, use_cache=False,
+                                                        hedge_key="patch"))
+        assert data == {"title": "Stub"} and time.perf_counter() - t0 < 1.0
+        assert attributes["hedged"] is True and attributes["hedge_won"] is True
+        assert server.requests == 7
+    close_clients()
+    print("✅ A duplicate request beats the stalled one")
+
+
+def test_circuit_breaker():
+    print("Testing the circuit breaker...")
+    now = [0.0]
+    breaker = CircuitBreaker(failures=2, reset_seconds=10, clock=lambda: now[0])
+    breaker.failure()
+    assert breaker.allow() and breaker.state == "closed"
+    breaker.failure()
+    assert not breaker.allow() and breaker.state == "open"
+    now[0] = 10.0
+    assert breaker.allow() and not breaker.allow()  # one trial call at a time
+    breaker.failure()
+    assert breaker.state == "open"
+    now[0] = 20.0
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.allow()
+
+    set_cache(ResponseCache(path=None))
+    resilience = fast_policy(retries=0, breaker_failures=2, breaker_reset=0.2)
+    with StubLLMServer(content=CONTENT, faults=["error", "error"]) as server, use_resilience(resilience):
+        client = get_client(api_key="test", base_url=server.base_url)
+        for _ in range(2):
+            try:
+                call_llm_json("system", "user", client=client, use_cache=False)
+            except openai.InternalServerError:
+                pass
+        try:
+            call_llm_json("system", "user", client=client, use_cache=False)
+        except CircuitOpenError:
+            pass
+        else:
+            raise AssertionError("expected CircuitOpenError")
+        assert server.requests == 2 and resilience.states() == {"gpt-5-nano": "open"}
+        time.sleep(0.25)
+        assert call_llm_json("system", "user", client=client, use_cache=False) == {"title": "Stub"}
+        assert resilience.states() == {"gpt-5-nano": "closed"}
+
+        # Invalid JSON means the model is up; it never opens the circuit
+        server.faults = ["bad_json"] * 3
+        for _ in range(3):
+            try:
+                call_llm_json("system", "user", client=client, use_cache=False)
+            except InvalidJSONError:
+                pass
+            else:
+                raise AssertionError("expected InvalidJSONError")
+        assert server.requests == 6 and resilience.states() == {"gpt-5-nano": "closed"}
+    close_clients()
+    print("✅ Repeated failures fail fast until a trial call succeeds; invalid JSON does not count")
+
+
+def test_async_retry_and_hedge():
+    print("Testing retries and hedging in call_llm_json_async...")
+    set_cache(ResponseCache(path=None))
+    resilience = fast_policy(hedge=True, hedge_min_samples=5, hedge_min_delay=0.05)
+
+    async def run(server):
+        client = get_async_client(api_key="test", base_url=server.base_url)
+        await asyncio.gather(*(call_llm_json_async("system", f"warm-up {i}", client=client) for i in range(5)))
+        server.faults = ["error", "stall"]
+        t0 = time.perf_counter()
+        data = await call_llm_json_async("system", "user", client=client, use_cache=False)
+        return data, time.perf_counter() - t0
+
+    with StubLLMServer(content=CONTENT, stall=2.0) as server, use_resilience(resilience):
+        data, seconds = asyncio.run(run(server))
+        assert data == {"title": "Stub"} and seconds < 1.0
+        assert server.injected[5:] == ["error", "stall", None]
+    print("✅ Async calls retry a 500 and hedge the stalled retry")
+
+
+def main():
+    test_retries_transient_errors()
+    test_deadline()
+    test_hedging()
+    test_circuit_breaker()
+    test_async_retry_and_hedge()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Test script for per-stage model routing and escalation (routing.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import json
+import os
+import tempfile
+
+from cache import ResponseCache, set_cache
+from llm import DEFAULT_MODEL, use_backend
+from pipeline import run_pipeline, run_pipeline_async
+import routing
+from routing import Route, RouteStats, RoutingPolicy, global_route_stats, load_policy
+from stub_llm import StubLLM
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+# Fast model never fixes its revisions; the strong one always does
+STUB_MODELS = {"fast": {"fix_rate": 0.0}, "strong": {"fix_rate": 1.0, "latency": 0.01}}
+
+
+def test_route_ladder():
+    print("Testing route selection...")
+    policy = RoutingPolicy(
+        default=[Route("fast"), Route("strong")],
+        stages={"tasks": [Route("fast", max_tokens=8000), Route("mid"), Route("strong", timeout=60)]},
+        escalate_after=1,
+    )
+    assert policy.route("prd", 1).model == "fast"
+    assert policy.route("prd", 2).model == policy.route("prd", 5).model == "strong"
+    assert [policy.route("tasks", a) for a in (1, 2, 3, 4)] == [
+        Route("fast", max_tokens=8000), Route("mid"), Route("strong", timeout=60), Route("strong", timeout=60),
+    ]
+    assert RoutingPolicy(default=[Route("fast"), Route("strong")], escalate_after=2).route("goal", 2).model == "fast"
+    assert RoutingPolicy().route("goal").model == DEFAULT_MODEL
+    print("✅ Each stage climbs its ladder every escalate_after attempts")
+
+
+def test_load_policy():
+    print("Testing policy loading...")
+    spec = {"default": "fast", "stages": {"tasks": ["fast", {"model": "strong", "timeout": 30}]}, "escalate_after": 1}
+    policy = load_policy(json.dumps(spec))
+    assert policy.default == [Route("fast")]
+    assert policy.route("tasks", 2) == Route("strong", timeout=30)
+    assert RoutingPolicy.from_dict(policy.to_dict()) == policy
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "routing.json"
+        path.write_text(json.dumps(spec), encoding="utf-8")
+        os.environ["LLM_ROUTING"] = str(path)
+        try:
+            assert load_policy() == policy
+        finally:
+            del os.environ["LLM_ROUTING"]
+    try:
+        RoutingPolicy(escalate_after=0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+    print("✅ Policies load from JSON strings, files and LLM_ROUTING")
+
+
+def test_escalation_in_pipeline():
+    print("Testing escalation in run_pipeline...")
+    set_cache(ResponseCache(path=None))
+    policy = RoutingPolicy(default=[Route("fast"), Route("strong")], escalate_after=1)
+    stub = StubLLM(defect_rate=0.3, models=STUB_MODELS)
+    with use_backend(stub):
+        result = run_pipeline(IDEA, [], use_cache=False, routing=policy, revision_mode="full")
+    assert result["issues"] == {"prd": [], "milestones": [], "tasks": []}
+    stats = result["route_stats"]
+    assert stats["goal"] == {"fast": stats["goal"]["fast"]} and stats["goal"]["fast"]["calls"] == 1
+    assert stats["tasks"]["fast"]["valid_rate"] == 0.0 and stats["tasks"]["strong"]["valid_rate"] == 1.0
+    assert stub.model_calls["strong"] == sum(s["strong"]["calls"] for s in stats.values() if "strong" in s)
+
+    # Without escalation the fast model never recovers
+    stub = StubLLM(defect_rate=0.3, models=STUB_MODELS)
+    with use_backend(stub):
+        result = run_pipeline(IDEA, [], use_cache=False, routing=RoutingPolicy(default=[Route("fast")]),
+                              revision_mode="full")
+    assert result["issues"]["tasks"] and stub.model_calls["strong"] == 0
+    print("✅ Failed validations move a stage to the stronger model")
+
+
+def test_async_route_timeout():
+    print("Testing per-route timeouts in run_pipeline_async...")
+    set_cache(ResponseCache(path=None))
+    policy = RoutingPolicy(default=[Route("fast")], stages={"goal": [Route("strong", timeout=0.001)]})
+    with use_backend(StubLLM(models=STUB_MODELS)):
+        try:
+            asyncio.run(run_pipeline_async(IDEA, [], use_cache=False, routing=policy))
+        except (TimeoutError, asyncio.TimeoutError):
+            pass
+        else:
+            raise AssertionError("expected a timeout")
+    print("✅ Route timeouts apply to async calls")
+
+
+def test_caller_timeout_wins():
+    print("Testing caller timeouts over route timeouts...")
+    policy = RoutingPolicy(default=[Route("fast")], stages={"goal": [Route("strong", timeout=0.001)]})
+    with use_backend(StubLLM(models=STUB_MODELS)):
+        result = run_pipeline(IDEA, [], use_cache=False, routing=policy, timeout=60)
+        assert result["issues"] == {"prd": [], "milestones": [], "tasks": []}
+        result = asyncio.run(run_pipeline_async(IDEA, [], use_cache=False, routing=policy, timeout=60))
+        assert result["issues"] == {"prd": [], "milestones": [], "tasks": []}
+    print("✅ An explicit timeout overrides the route's in both pipelines")
+
+
+def test_stats_merge():
+    print("Testing route stats...")
+    a, b = RouteStats(), RouteStats()
+    a.record_call("tasks", "fast", 1.0)
+    b.record_call("tasks", "fast", 3.0, ok=False)
+    b.record_validation("tasks", "fast", valid=True)
+    a.merge(b)
+    s = a.summary()["tasks"]["fast"]
+    assert s["calls"] == 2 and s["errors"] == 1 and s["mean_seconds"] == 2.0 and s["valid_rate"] == 1.0
+    assert "tasks" in global_route_stats().summary()
+    print("✅ Stats merge and summarize per stage and model")
+
+
+def test_stats_stay_bounded():
+    print("Testing route stats memory...")
+    stats = RouteStats()
+    for i in range(3 * routing.LATENCY_WINDOW):
+        stats.record_call("tasks", "fast", 5.0 if i == 0 else 1.0)
+    assert len(stats._recent[("tasks", "fast")]) == routing.LATENCY_WINDOW
+    s = stats.summary()["tasks"]["fast"]
+    assert s["calls"] == 3 * routing.LATENCY_WINDOW and s["max_seconds"] == 5.0 and s["p50_seconds"] == 1.0
+    assert s["mean_seconds"] == round((5.0 + 3 * routing.LATENCY_WINDOW - 1) / (3 * routing.LATENCY_WINDOW), 4)
+    print("✅ Totals cover every call while only recent latencies are kept")
+
+
+def main():
+    test_route_ladder()
+    test_load_policy()
+    test_escalation_in_pipeline()
+    test_async_route_timeout()
+    test_caller_timeout_wins()
+    test_stats_merge()
+    test_stats_stay_bounded()
+
+
+if __name__ == "__main__":
+    main()
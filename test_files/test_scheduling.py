@@ -0,0 +1,121 @@
+"""
+Test script for critical-path and worker scheduling (scheduling.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import csv
+import io
+import random
+
+from fakes import use_fake_llm
+from pipeline import run_pipeline
+from schemas import TasksDoc
+from scheduling import critical_path, list_schedule, schedule_csv, topological_order
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def doc(*tasks) -> TasksDoc:
+    return TasksDoc.model_validate({"title": "T", "tasks": [
+        {"task_id": tid, "title": f"Task {tid}", "type": "backend", "priority": "P1",
+         "estimate_hours": hours, "depends_on": deps, "acceptance_criteria": ["ok"]}
+        for tid, hours, deps in tasks
+    ]})
+
+
+# A(2) -> B(4) -> D(1); A -> C(1) -> D; E(3) independent
+DIAMOND = doc(("A", 2, []), ("B", 4, ["A"]), ("C", 1, ["A"]), ("D", 1, ["B", "C"]), ("E", 3, []))
+
+
+def test_critical_path():
+    print("Testing critical path method...")
+    s = critical_path(DIAMOND)
+    assert s.order == ["A", "B", "C", "D", "E"]
+    assert s.critical_path == ["A", "B", "D"] and s.duration_hours == 7
+    assert s.earliest_start["D"] == 6 and s.slack["C"] == 3 and s.slack["E"] == 4
+    assert all(s.slack[t] == 0 for t in s.critical_path)
+    print("✅ A → B → D is critical with 7h total, slack on C and E")
+
+
+def test_list_schedule():
+    print("Testing list scheduling with N workers...")
+    one = list_schedule(DIAMOND, 1)
+    assert one.makespan_hours == 11 and one.utilization() == 1.0
+    two = list_schedule(DIAMOND, 2)
+    assert two.makespan_hours == 7
+    starts = {a.task_id: a.start for a in two.assignments}
+    finishes = {a.task_id: a.finish for a in two.assignments}
+    assert starts["D"] >= max(finishes["B"], finishes["C"])
+    assert list_schedule(DIAMOND, 8).makespan_hours == 7  # bounded by the critical path
+    print("✅ 1 worker: 11h, 2+ workers: 7h (critical path)")
+
+
+def test_cycle_and_unknown_deps():
+    print("Testing cycles and unknown dependencies...")
+    assert topological_order(doc(("A", 1, ["ZZZ"]), ("B", 1, ["A", "A"]))) == ["A", "B"]
+    try:
+        critical_path(doc(("A", 1, ["B"]), ("B", 1, ["A"]), ("C", 1, [])))
+    except ValueError as e:
+        assert "A, B" in str(e)
+    else:
+        raise AssertionError("expected ValueError for a cycle")
+    print("✅ Unknown ids ignored, cycles rejected")
+
+
+def test_large_graph():
+    print("Testing a 30000-task random DAG...")
+    rng = random.Random(7)
+    tasks = [(f"T{i}", rng.choice([1, 2, 4, 8]), [f"T{rng.randrange(i)}" for _ in range(min(i, 3))])
+             for i in range(30000)]
+    big = doc(*tasks)
+    s = critical_path(big)
+    plan = list_schedule(big, 16)
+    hours = {tid: h for tid, h, _ in tasks}
+    deps = {tid: set(d) for tid, _, d in tasks}
+    position = {tid: i for i, tid in enumerate(s.order)}
+    assert sorted(position) == sorted(hours)
+    for tid in hours:
+        assert all(position[d] < position[tid] for d in deps[tid])
+        start = max((s.earliest_finish[d] for d in deps[tid]), default=0.0)
+        assert s.earliest_start[tid] == start and s.earliest_finish[tid] == start + hours[tid]
+    assert s.duration_hours == max(s.earliest_finish.values())
+    assert sum(hours[t] for t in s.critical_path) == s.duration_hours
+    finish = {a.task_id: a.finish for a in plan.assignments}
+    assert len(finish) == 30000 and plan.makespan_hours == max(finish.values()) >= s.duration_hours
+    by_worker = {}
+    for a in plan.assignments:
+        assert 0 <= a.worker < 16 and a.finish == a.start + hours[a.task_id]
+        assert all(finish[d] <= a.start for d in deps[a.task_id])
+        by_worker.setdefault(a.worker, []).append((a.start, a.finish))
+    for spans in by_worker.values():
+        spans.sort()
+        assert all(prev[1] <= cur[0] for prev, cur in zip(spans, spans[1:]))
+    print("✅ CPM times and the 16-worker schedule respect every dependency")
+
+
+def test_pipeline_exports_schedule():
+    print("Testing schedule in pipeline result...")
+    with use_fake_llm():
+        result = run_pipeline(IDEA, [])
+    rows = list(csv.DictReader(io.StringIO(result["schedule_csv"])))
+    assert len(rows) == 24 and rows[0]["task_id"] == "T001"
+    assert result["schedule"].critical_path[0] == "T001"
+    with_workers = schedule_csv(result["schedule"], list_schedule(result["tasks"], 2))
+    assert "worker" in with_workers.splitlines()[0]
+    print("✅ result['schedule_csv'] exported alongside TASKS.csv")
+
+
+def main():
+    test_critical_path()
+    test_list_schedule()
+    test_cycle_and_unknown_deps()
+    test_large_graph()
+    test_pipeline_exports_schedule()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Test script for speculative downstream drafts (run_pipeline(speculative=True))
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import threading
+
+from fakes import FakeLLM, make_milestones, make_prd, use_fake_llm
+from pipeline import run_pipeline, run_pipeline_async
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def prd_draft(**overrides) -> dict:
+    return {**make_prd(), **overrides}
+
+
+def milestone_calls(fake: FakeLLM) -> int:
+    return sum(1 for p in fake.prompts if "MilestonesDoc JSON" in p and "previously returned" not in p)
+
+
+def speculation(result, stage: str):
+    return next(s["attributes"].get("speculation") for s in result["spans"]
+                if s["name"] == "draft" and s["attributes"]["stage"] == stage)
+
+
+class OverlapFakeLLM(FakeLLM):
+    """
+    Records when the PRD revision and the milestones draft start and end. With
+    hold_revision, the PRD revision waits (up to 5s) for the milestones draft
+    to start, so it can only finish promptly if the two overlap.
+    """
+
+    def __init__(self, hold_revision=False, **kwargs):
+        super().__init__(**kwargs)
+        self.hold_revision = hold_revision
+        self.events = []
+        self.overlapped = None
+        self._milestones_started = threading.Event()
+
+    def respond(self, user_prompt):
+        text = user_prompt.lower()
+        kind = ("prd_revision" if "previously returned this prd json" in text
+                else "milestones" if "milestonesdoc json" in text and "previously returned" not in text
+                else None)
+        if kind:
+            self.events.append(("start", kind))
+        if kind == "milestones":
+            self._milestones_started.set()
+        if kind == "prd_revision" and self.hold_revision:
+            self.overlapped = self._milestones_started.wait(5)
+        data = super().respond(user_prompt)
+        if kind:
+            self.events.append(("end", kind))
+        return data
+
+
+def test_hit_when_revision_is_invisible_downstream():
+    print("Testing a speculative hit...")
+    # target_users is not part of the milestones prompt, so fixing it keeps the guess valid
+    fake = FakeLLM(drafts={"prd": prd_draft(target_users=[])})
+    with use_fake_llm(fake):
+        result = run_pipeline(IDEA, [], revision_mode="full", use_cache=False, speculative=True)
+    assert result["issues"]["prd"] == [] and result["prd"].target_users
+    assert speculation(result, "milestones") == "hit"
+    assert milestone_calls(fake) == 1
+    print("✅ Milestones drafted once, during the PRD revision")
+
+
+def test_miss_when_downstream_prompt_changes():
+    print("Testing a speculative miss...")
+    fake = FakeLLM(drafts={"prd": prd_draft(problem="Too short.")})
+    with use_fake_llm(fake):
+        result = run_pipeline(IDEA, [], revision_mode="full", use_cache=False, speculative=True)
+    assert result["issues"]["prd"] == []
+    assert speculation(result, "milestones") == "miss"
+    assert milestone_calls(fake) in (1, 2)  # 1 if the stale call was cancelled before it started
+    with use_fake_llm(FakeLLM(drafts={"prd": prd_draft(problem="Too short.")})):
+        baseline = run_pipeline(IDEA, [], revision_mode="full", use_cache=False)
+    assert result["milestones"] == baseline["milestones"] and result["tasks"] == baseline["tasks"]
+    print("✅ Stale speculative drafts are discarded and regenerated")
+
+
+def test_tasks_speculation_and_no_speculation_on_clean_drafts():
+    print("Testing tasks speculation...")
+    bad = make_milestones()
+    bad["milestones"][0]["objective"] = "Too short"
+    fake = FakeLLM(drafts={"milestones": bad})
+    with use_fake_llm(fake):
+        result = run_pipeline(IDEA, [], revision_mode="full", use_cache=False, speculative=True, tasks_fanout=True)
+    assert result["issues"] == {"prd": [], "milestones": [], "tasks": []}
+    assert speculation(result, "milestones") is None  # clean PRD draft: nothing to overlap with
+    assert speculation(result, "tasks") == "miss"
+    print("✅ Tasks are speculated from a failing milestones draft")
+
+
+def test_speculation_hides_revision_latency():
+    print("Testing overlap with speculation...")
+    fake = OverlapFakeLLM(drafts={"prd": prd_draft(target_users=[])})
+    with use_fake_llm(fake):
+        run_pipeline(IDEA, [], revision_mode="full", use_cache=False)
+    assert fake.events.index(("start", "milestones")) > fake.events.index(("end", "prd_revision"))
+
+    fake = OverlapFakeLLM(hold_revision=True, drafts={"prd": prd_draft(target_users=[])})
+    with use_fake_llm(fake):
+        result = run_pipeline(IDEA, [], revision_mode="full", use_cache=False, speculative=True)
+    assert fake.overlapped is True, fake.events
+    assert fake.events.index(("start", "milestones")) < fake.events.index(("end", "prd_revision"))
+    assert speculation(result, "milestones") == "hit" and milestone_calls(fake) == 1
+    print("✅ Sequential: milestones after the PRD revision; speculative: during it")
+
+
+def test_async_speculation():
+    print("Testing speculation in run_pipeline_async...")
+    fake = FakeLLM(drafts={"prd": prd_draft(target_users=[])})
+    with use_fake_llm(fake):
+        result = asyncio.run(run_pipeline_async(IDEA, [], revision_mode="full", use_cache=False, speculative=True))
+    assert result["issues"]["prd"] == [] and speculation(result, "milestones") == "hit"
+    assert milestone_calls(fake) == 1
+    print("✅ Async pipeline speculates too")
+
+
+def main():
+    test_hit_when_revision_is_invisible_downstream()
+    test_miss_when_downstream_prompt_changes()
+    test_tasks_speculation_and_no_speculation_on_clean_drafts()
+    test_speculation_hides_revision_latency()
+    test_async_speculation()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Test script for streaming stage results (on_stage callback and iter_pipeline)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import threading
+
+from fakes import FakeLLM, use_fake_llm
+from pipeline import iter_pipeline, run_pipeline, run_pipeline_async
+from schemas import GoalInterpretation, PRD, MilestonesDoc, TasksDoc
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def test_on_stage_called_in_order():
+    print("Testing on_stage callback...")
+    seen = []
+    with use_fake_llm():
+        result = run_pipeline(IDEA, [], on_stage=lambda stage, doc, issues: seen.append((stage, doc, issues)))
+    assert [s for s, _, _ in seen] == ["goal", "prd", "milestones", "tasks"]
+    assert seen[1][1] == result["prd"] and seen[3][1] == result["tasks"]
+    assert seen[3][2] == result["issues"]["tasks"]
+    print("✅ Each stage reported once, in pipeline order")
+
+
+def test_async_on_stage():
+    print("Testing on_stage callback in run_pipeline_async...")
+    seen = []
+    with use_fake_llm():
+        asyncio.run(run_pipeline_async(IDEA, [], on_stage=lambda stage, doc, issues: seen.append(stage)))
+    assert seen == ["goal", "prd", "milestones", "tasks"]
+    print("✅ Async pipeline reports stages too")
+
+
+class GatedFakeLLM(FakeLLM):
+    """Blocks the milestones call until the test releases it."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def respond(self, user_prompt):
+        if "milestonesdoc json" in user_prompt.lower():
+            assert self.release.wait(timeout=5)
+        return super().respond(user_prompt)
+
+
+def test_iter_pipeline_yields_before_run_finishes():
+    print("Testing iter_pipeline streaming...")
+    fake = GatedFakeLLM()
+    with use_fake_llm(fake):
+        events = iter_pipeline(IDEA, [])
+        assert next(events)[0] == "goal"
+        stage, prd = next(events)
+        # PRD arrives while milestones are still blocked
+        assert stage == "prd" and isinstance(prd, PRD)
+        fake.release.set()
+        rest = list(events)
+    assert [s for s, _ in rest] == ["milestones", "tasks", "result"]
+    assert isinstance(rest[0][1], MilestonesDoc) and isinstance(rest[1][1], TasksDoc)
+    assert rest[2][1]["tasks"] == rest[1][1]
+    print("✅ Stages stream out before the pipeline completes")
+
+
+class BrokenLLM(FakeLLM):
+    def respond(self, user_prompt):
+        if "prd json" in user_prompt.lower():
+            raise RuntimeError("model unavailable")
+        return super().respond(user_prompt)
+
+
+def test_iter_pipeline_reraises():
+    print("Testing iter_pipeline error propagation...")
+    with use_fake_llm(BrokenLLM()):
+        events = iter_pipeline(IDEA, [])
+        stage, gi = next(events)
+        assert stage == "goal" and isinstance(gi, GoalInterpretation)
+        try:
+            next(events)
+        except RuntimeError as e:
+            assert "model unavailable" in str(e)
+        else:
+            raise AssertionError("expected RuntimeError")
+    print("✅ Pipeline errors surface from the generator")
+
+
+def main():
+    test_on_stage_called_in_order()
+    test_async_on_stage()
+    test_iter_pipeline_yields_before_run_finishes()
+    test_iter_pipeline_reraises()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Test script for strict structured-output schemas (structured_output.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+
+import llm
+from benchmarks.stub_server import StubLLMServer
+from cache import ResponseCache, make_key, set_cache
+from fakes import make_goal, make_milestones, make_prd, make_tasks
+from llm import call_llm_json, close_clients, get_client, use_backend
+from pipeline import _goal_prompt, _milestone_tasks_prompt, _prd_prompt, _task_quota, _tasks_prompt, run_pipeline
+from schemas import GoalInterpretation, MilestonesDoc, PRD, TasksDoc
+from structured_output import json_schema, schema_format
+from stub_llm import StubLLM, stage_of
+from validators import ALLOWED_TYPES, TASK_COUNT
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+class RecordingStub(StubLLM):
+    """StubLLM that remembers the response format sent with each prompt."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.formats = []
+
+    def complete(self, system_prompt, user_prompt, model, max_tokens=None, timeout=None, response_format=None):
+        self.formats.append((stage_of(user_prompt), response_format))
+        return super().complete(system_prompt, user_prompt, model, max_tokens, timeout, response_format)
+
+
+def walk(schema):
+    yield schema
+    for sub in schema.get("properties", {}).values():
+        yield from walk(sub)
+    if "items" in schema:
+        yield from walk(schema["items"])
+
+
+def test_schemas_are_strict():
+    print("Testing strict schemas...")
+    for model_cls in (GoalInterpretation, PRD, MilestonesDoc, TasksDoc):
+        schema = json_schema(model_cls)
+        assert "$defs" not in json.dumps(schema) and "$ref" not in json.dumps(schema)
+        for node in walk(schema):
+            if node.get("type") == "object":
+                assert node["additionalProperties"] is False
+                assert node["required"] == list(node["properties"])
+    task = json_schema(TasksDoc)["properties"]["tasks"]
+    assert (task["minItems"], task["maxItems"]) == TASK_COUNT
+    assert task["items"]["properties"]["type"]["enum"] == sorted(ALLOWED_TYPES)
+    assert "P0" in task["items"]["properties"]["priority"]["enum"]
+    assert task["items"]["properties"]["depends_on"]["items"] == {"type": "string"}
+    assert json_schema(MilestonesDoc)["properties"]["milestones"]["items"]["properties"]["est_days"]["minimum"] >= 0
+    print("✅ Every object requires all its keys and forbids extras; enums and bounds come from validators.py")
+
+
+def test_overrides():
+    print("Testing per-field overrides...")
+    part = json_schema(TasksDoc, {"tasks": {"minItems": 4, "maxItems": 8}})
+    assert (part["properties"]["tasks"]["minItems"], part["properties"]["tasks"]["maxItems"]) == (4, 8)
+    assert json_schema(TasksDoc)["properties"]["tasks"]["minItems"] == TASK_COUNT[0]
+    fmt = schema_format(TasksDoc)
+    assert fmt["type"] == "json_schema" and fmt["json_schema"]["strict"] is True
+    assert fmt["json_schema"]["name"] == "TasksDoc"
+    print("✅ Overrides apply to one copy and leave the cached schema alone")
+
+
+def test_request_carries_schema():
+    print("Testing the response_format sent to the API...")
+    set_cache(ResponseCache(path=None))
+    fmt = schema_format(TasksDoc)
+    with StubLLMServer(content=json.dumps(make_tasks())) as server:
+        client = get_client(api_key="test", base_url=server.base_url)
+        call_llm_json("system", "user", client=client, response_format=fmt)
+        assert server.last_body["response_format"] == fmt
+        call_llm_json("system", "user", client=client)
+        assert server.last_body["response_format"] == {"type": "json_object"}
+        assert server.requests == 2  # a different response format is a different cache entry
+
+        llm.STRUCTURED_OUTPUT = False
+        try:
+            call_llm_json("system", "other user", client=client, response_format=fmt)
+        finally:
+            llm.STRUCTURED_OUTPUT = True
+        assert server.last_body["response_format"] == {"type": "json_object"}
+        system = server.last_body["messages"][0]["content"]
+        assert '"additionalProperties":false' in system and '"minItems":20' in system
+    close_clients()
+    assert make_key("s", "u", "m") != make_key("s", "u", "m", fmt)
+    print("✅ json_schema mode by default; JSON mode with the schema in the system message when disabled")
+
+
+def test_prompts_have_no_key_lists():
+    print("Testing prompts without hand-written key lists...")
+    gi = GoalInterpretation.model_validate(make_goal())
+    prd = PRD.model_validate(make_prd())
+    mdoc = MilestonesDoc.model_validate(make_milestones())
+    lo, hi = _task_quota(len(mdoc.milestones))
+    prompts = [_goal_prompt(IDEA, []), _prd_prompt(gi), _tasks_prompt(prd, mdoc),
+               _milestone_tasks_prompt(prd, mdoc, 0, lo, hi)]
+    for prompt in prompts:
+        assert "array of strings" not in prompt and "NOT objects" not in prompt
+        assert "type in:" not in prompt and "with keys" not in prompt
+    print("✅ Keys, types, enums and counts live in the schema only")
+
+
+def test_pipeline_sends_stage_schemas():
+    print("Testing response formats across a pipeline run...")
+    stub = RecordingStub(defect_rate=0.02, seed=3)
+    with use_backend(stub):
+        result = run_pipeline(IDEA, [], use_cache=False, tasks_fanout=True)
+    assert not any(result["issues"].values())
+    drafts = {stage: fmt["json_schema"]["name"] for stage, fmt in stub.formats if stage not in ("patch", "revise")}
+    assert drafts == {"goal": "GoalInterpretation", "prd": "PRD", "milestones": "MilestonesDoc",
+                      "milestone_tasks": "TasksDoc"}
+    lo, hi = _task_quota(len(result["milestones"].milestones))
+    parts = [fmt for stage, fmt in stub.formats if stage == "milestone_tasks"]
+    assert all(fmt["json_schema"]["schema"]["properties"]["tasks"]["minItems"] == lo for fmt in parts)
+    assert all(fmt is None for stage, fmt in stub.formats if stage == "patch")
+
+    stub = RecordingStub(defect_rate=0.05, seed=3)
+    with use_backend(stub):
+        run_pipeline(IDEA, [], use_cache=False, revision_mode="full")
+    revisions = [fmt for stage, fmt in stub.formats if stage == "revise"]
+    assert revisions and all(fmt["type"] == "json_schema" for fmt in revisions)
+    print("✅ Drafts and full revisions carry their document's schema; patches do not")
+
+
+def main():
+    test_schemas_are_strict()
+    test_overrides()
+    test_request_carries_schema()
+    test_prompts_have_no_key_lists()
+    test_pipeline_sends_stage_schemas()
+
+
+if __name__ == "__main__":
+    main()
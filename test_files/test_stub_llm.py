@@ -0,0 +1,114 @@
+"""
+Test script for the pluggable LLM backend and the deterministic StubLLM
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+from cache import ResponseCache, set_cache
+from llm import call_llm_json, call_llm_json_async, call_llm_json_stream, use_backend
+from pipeline import SYSTEM, run_pipeline, run_pipeline_async
+from resilience import Resilience, ResiliencePolicy, use_resilience
+from stub_llm import StubLLM, StubLLMError
+from validators import validate_milestones, validate_prd, validate_tasks
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def fresh_cache():
+    set_cache(ResponseCache(path=None))
+
+
+def test_clean_run_passes_validation():
+    print("Testing a defect-free stub run...")
+    fresh_cache()
+    stub = StubLLM()
+    with use_backend(stub):
+        result = run_pipeline(IDEA, [], use_cache=False)
+    assert result["issues"] == {"prd": [], "milestones": [], "tasks": []}
+    assert not validate_prd(result["prd"]) and not validate_milestones(result["milestones"])
+    assert not validate_tasks(result["tasks"]) and len(result["tasks"].tasks) == 30
+    assert dict(stub.calls) == {"goal": 1, "prd": 1, "milestones": 1, "tasks": 1}
+    print("✅ One call per stage, every document valid")
+
+
+def test_deterministic():
+    print("Testing determinism...")
+    fresh_cache()
+    runs = []
+    for _ in range(2):
+        with use_backend(StubLLM(defect_rate=0.2, seed=7)):
+            runs.append(run_pipeline(IDEA, [], use_cache=False, tasks_fanout=True)["tasks_csv"])
+    assert runs[0] == runs[1]
+    with use_backend(StubLLM(defect_rate=0.2, seed=8)):
+        assert run_pipeline(IDEA, [], use_cache=False, tasks_fanout=True)["tasks_csv"] != runs[0]
+    print("✅ Same seed, same backlog")
+
+
+def test_defects_trigger_revisions():
+    print("Testing injected defects...")
+    fresh_cache()
+    for mode in ("patch", "full"):
+        stub = StubLLM(defect_rate=0.3)
+        with use_backend(stub):
+            result = run_pipeline(IDEA, [], use_cache=False, revision_mode=mode)
+        assert result["issues"] == {"prd": [], "milestones": [], "tasks": []}
+        assert stub.calls["patch" if mode == "patch" else "revise"] >= 1
+        assert stub.calls["revise"] == 0 or mode == "full"
+    print("✅ Defective drafts are fixed by patch and full revisions")
+
+
+def test_failure_rate():
+    print("Testing injected failures...")
+    fresh_cache()
+    no_retries = Resilience(ResiliencePolicy(retries=0))
+    stub = StubLLM(failure_rate=1.0)
+    with use_backend(stub), use_resilience(no_retries):
+        try:
+            call_llm_json(SYSTEM, "Return GoalInterpretation JSON\nIdea: x", use_cache=False)
+        except StubLLMError:
+            pass
+        else:
+            raise AssertionError("expected StubLLMError")
+    stub = StubLLM(failure_rate=0.5)
+    outcomes = []
+    with use_backend(stub), use_resilience(no_retries):
+        for _ in range(40):
+            try:
+                call_llm_json(SYSTEM, "Return GoalInterpretation JSON\nIdea: x", use_cache=False)
+                outcomes.append(True)
+            except StubLLMError:
+                outcomes.append(False)
+    assert 5 < sum(outcomes) < 35
+    print("✅ Failures follow failure_rate, retries of one prompt can succeed")
+
+
+def test_stream_and_async_use_backend():
+    print("Testing streaming and async calls through the backend...")
+    fresh_cache()
+    items = []
+    with use_backend(StubLLM()):
+        data = call_llm_json_stream(SYSTEM, "Return TasksDoc JSON\nIdea: x", use_cache=False,
+                                    on_item=lambda field, item: items.append(field))
+        assert items == ["tasks"] * 30 and len(data["tasks"]) == 30
+        result = asyncio.run(run_pipeline_async(IDEA, [], use_cache=False, tasks_fanout=True))
+        assert result["issues"]["tasks"] == []
+        gi = asyncio.run(call_llm_json_async(SYSTEM, "Return GoalInterpretation JSON\nIdea: Planner"))
+        assert gi["title"] == "Planner"
+    print("✅ call_llm_json_stream and call_llm_json_async go through the backend")
+
+
+def main():
+    test_clean_run_passes_validation()
+    test_deterministic()
+    test_defects_trigger_revisions()
+    test_failure_rate()
+    test_stream_and_async_use_backend()
+
+
+if __name__ == "__main__":
+    main()
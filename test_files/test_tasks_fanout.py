@@ -0,0 +1,132 @@
+"""
+Test script for per-milestone tasks fan-out (run_pipeline(tasks_fanout=True))
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import re
+import threading
+import time
+
+from fakes import FakeLLM, make_tasks, use_fake_llm
+from pipeline import _task_quota, iter_pipeline, merge_milestone_tasks, run_pipeline, run_pipeline_async
+from validators import TASK_COUNT, validate_tasks
+from schemas import TasksDoc
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+class MilestoneFakeLLM(FakeLLM):
+    """Answers per-milestone prompts with 6 tasks each, slowly, tracking concurrency."""
+
+    def __init__(self, delay=0.05):
+        super().__init__()
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._count_lock = threading.Lock()
+
+    def respond(self, user_prompt):
+        match = re.search(r"Plan ONLY milestone (\d+) of", user_prompt)
+        if not match:
+            return super().respond(user_prompt)
+        with self._count_lock:
+            self.prompts.append(user_prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._count_lock:
+            self.in_flight -= 1
+        part = make_tasks(6)
+        for t in part["tasks"]:
+            t["title"] = f"Milestone {match.group(1)} {t['title']}"
+        return part
+
+    async def call_async(self, system_prompt, user_prompt, **kwargs):
+        return await asyncio.to_thread(self.respond, user_prompt)
+
+
+def test_merge_renumbers_and_remaps():
+    print("Testing merge_milestone_tasks...")
+    part = {"tasks": [
+        {"task_id": "T001", "title": "First", "depends_on": []},
+        {"task_id": "T002", "title": "Second", "depends_on": ["T001", "T404"]},
+    ]}
+    merged = merge_milestone_tasks("Plan", [part, part])
+    assert [t["task_id"] for t in merged["tasks"]] == ["T001", "T002", "T003", "T004"]
+    assert merged["tasks"][1]["depends_on"] == ["T001"]
+    assert merged["tasks"][3]["depends_on"] == ["T003"]
+    assert merged["tasks"][2]["depends_on"] == ["T002"]  # root of milestone 2 after sink of milestone 1
+    assert merged["tasks"][0]["depends_on"] == []
+
+    part = {"tasks": [
+        {"task_id": "T001", "title": "Schema", "depends_on": []},
+        {"task_id": "T002", "title": "API", "depends_on": ["T001"]},
+        {"task_id": "T003", "title": "Docs", "depends_on": []},
+    ]}
+    merged = merge_milestone_tasks("Plan", [part, {"tasks": []}, part])
+    assert merged["tasks"][3]["depends_on"] == ["T002", "T003"] and merged["tasks"][5]["depends_on"] == ["T002", "T003"]
+    print("✅ Ids are global; each milestone's roots depend on the previous milestone's sinks")
+
+
+def test_task_quota_stays_within_cap():
+    print("Testing _task_quota...")
+    assert _task_quota(4) == (5, 11)
+    for n in range(1, 60):
+        lo, hi = _task_quota(n)
+        assert 1 <= lo <= hi
+        if n <= TASK_COUNT[1]:
+            assert n * hi <= TASK_COUNT[1] and n * lo >= min(TASK_COUNT[0], n)
+    print("✅ Per-milestone quotas never push the merged backlog past the cap")
+
+
+def test_pipeline_fans_out_per_milestone():
+    print("Testing tasks fan-out in run_pipeline...")
+    fake = MilestoneFakeLLM()
+    with use_fake_llm(fake):
+        result = run_pipeline(IDEA, [], tasks_fanout=True)
+    milestone_prompts = [p for p in fake.prompts if "Plan ONLY milestone" in p]
+    assert len(milestone_prompts) == 4
+    assert fake.max_in_flight == 4
+    tdoc = result["tasks"]
+    assert len(tdoc.tasks) == 24 and validate_tasks(tdoc) == []
+    assert tdoc.tasks[6].title.startswith("Milestone 2") and tdoc.tasks[7].depends_on == ["T007"]
+    assert tdoc.tasks[6].depends_on == ["T006"]
+    print("✅ 4 milestone calls ran concurrently and merged into one valid backlog")
+
+
+def test_fanout_streams_items():
+    print("Testing iter_pipeline(stream_items=True) with tasks fan-out...")
+    with use_fake_llm(MilestoneFakeLLM(delay=0)):
+        events = list(iter_pipeline(IDEA, [], stream_items=True, tasks_fanout=True))
+    names = [name for name, _ in events]
+    task_items = [value[2] for name, value in events if name == "item" and value[0] == "tasks"]
+    assert task_items == [t.model_dump() for t in dict(events)["tasks"].tasks]
+    assert names.index("item", names.index("milestones")) < names.index("tasks")
+    print("✅ The merged draft's tasks are emitted as items before the tasks stage")
+
+
+def test_async_pipeline_fans_out():
+    print("Testing tasks fan-out in run_pipeline_async...")
+    fake = MilestoneFakeLLM()
+    with use_fake_llm(fake):
+        result = asyncio.run(run_pipeline_async(IDEA, [], tasks_fanout=True))
+    assert fake.max_in_flight == 4
+    assert validate_tasks(TasksDoc.model_validate(result["tasks"].model_dump())) == []
+    print("✅ Async fan-out gathered all milestones")
+
+
+def main():
+    test_merge_renumbers_and_remaps()
+    test_task_quota_stays_within_cap()
+    test_pipeline_fans_out_per_milestone()
+    test_fanout_streams_items()
+    test_async_pipeline_fans_out()
+
+
+if __name__ == "__main__":
+    main()
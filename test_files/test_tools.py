@@ -4,6 +4,7 @@ Test script for tools.py functions
 import os
 from pathlib import Path
 from tools import write_markdown, write_csv, append_jsonl_log, render_prd
+from event_log import flush_event_logs
 
 def test_write_markdown():
     print("Testing write_markdown...")
@@ -65,6 +66,7 @@ def test_append_jsonl_log():
     
     for event in events:
         append_jsonl_log(event, test_path)
+    flush_event_logs()
     
     # Verify the file was created
     if os.path.exists(test_path):
@@ -0,0 +1,119 @@
+"""
+Test script for per-call spans and stage metrics (tracing.py)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import ResponseCache, set_cache
+from llm import use_backend
+from pipeline import run_pipeline, run_pipeline_async
+from stub_llm import StubLLM
+from tracing import Tracer, propagate, record, span, summarize
+
+IDEA = "A web app that helps college students turn class syllabi into weekly plans and track progress."
+
+
+def test_spans_nest_and_inherit():
+    print("Testing span nesting...")
+    tracer = Tracer()
+    with tracer.activate():
+        with span("stage", stage="tasks"):
+            with span("llm", attempt=2):
+                record(prompt_tokens=10)
+    inner, outer = sorted(tracer.to_dicts(), key=lambda s: s["name"])
+    assert outer["name"] == "stage" and outer["parent_id"] is None
+    assert inner["parent_id"] == outer["span_id"]
+    assert inner["attributes"] == {"stage": "tasks", "attempt": 2, "prompt_tokens": 10}
+    assert outer["duration_seconds"] >= inner["duration_seconds"]
+    print("✅ Child spans link to their parent and inherit stage")
+
+
+def test_noop_without_tracer():
+    print("Testing spans without an active tracer...")
+    with span("llm") as s:
+        record(cache_hit=True)
+    assert s is None
+    print("✅ span()/record() do nothing outside a run")
+
+
+def test_propagate_to_threads():
+    print("Testing propagation to worker threads...")
+    tracer = Tracer()
+
+    def work(i):
+        with span("llm", index=i):
+            pass
+
+    with tracer.activate(), span("draft", stage="tasks"):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(propagate(work), range(4)))
+    spans = tracer.to_dicts()
+    parent = next(s for s in spans if s["name"] == "draft")
+    calls = [s for s in spans if s["name"] == "llm"]
+    assert len(calls) == 4 and all(s["parent_id"] == parent["span_id"] for s in calls)
+    assert all(s["attributes"]["stage"] == "tasks" for s in calls)
+    print("✅ Spans from pool threads attach to the caller's span")
+
+
+def test_run_pipeline_spans():
+    print("Testing spans in the run_pipeline result...")
+    set_cache(ResponseCache(path=None))
+    with tempfile.TemporaryDirectory() as tmp, use_backend(StubLLM(defect_rate=0.3)):
+        trace_path = str(Path(tmp) / "trace.json")
+        result = run_pipeline(IDEA, [], use_cache=False, tasks_fanout=True, trace_path=trace_path)
+        otlp = json.loads(Path(trace_path).read_text(encoding="utf-8"))
+
+    spans = result["spans"]
+    stages = [s["attributes"]["stage"] for s in spans if s["name"] == "stage"]
+    assert stages == ["goal", "prd", "milestones", "tasks"]
+    calls = [s for s in spans if s["name"] == "llm"]
+    assert all(s["attributes"]["prompt_tokens"] > 0 and s["attributes"]["cache_hit"] is False for s in calls)
+    assert sum(1 for s in calls if s["attributes"]["stage"] == "tasks" and s["attributes"]["attempt"] == 1) == 4
+
+    metrics = result["stage_metrics"]
+    assert metrics == summarize(spans)
+    assert metrics["tasks"]["attempts"] >= 2 and metrics["tasks"]["llm_calls"] >= 5
+    assert metrics["goal"]["validation_seconds"] == 0.0 and metrics["tasks"]["validation_seconds"] > 0
+    tasks_span = next(s for s in spans if s["name"] == "stage" and s["attributes"]["stage"] == "tasks")
+    assert metrics["tasks"]["seconds"] == tasks_span["duration_seconds"]
+    # The stage span runs inside the stage_seconds timer (durations are rounded to 1µs)
+    assert metrics["tasks"]["validation_seconds"] <= metrics["tasks"]["seconds"]
+    assert metrics["tasks"]["seconds"] <= result["stage_seconds"]["tasks"] + 1e-6
+
+    exported = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(exported) == len(spans)
+    assert {s["traceId"] for s in exported} == {spans[0]["trace_id"]}
+    assert all(int(s["endTimeUnixNano"]) >= int(s["startTimeUnixNano"]) for s in exported)
+    print("✅ Stage, validation, revision and LLM spans recorded and exported as OTLP/JSON")
+
+
+def test_cache_hits_and_async():
+    print("Testing cache hits and async spans...")
+    set_cache(ResponseCache(path=None))
+    with use_backend(StubLLM()):
+        run_pipeline(IDEA, [])
+        result = asyncio.run(run_pipeline_async(IDEA, []))
+    metrics = result["stage_metrics"]
+    assert all(m["cache_hits"] == m["llm_calls"] == 1 for m in metrics.values())
+    assert all(m["prompt_tokens"] == 0 for m in metrics.values())
+    print("✅ Cached calls are marked and cost no tokens")
+
+
+def main():
+    test_spans_nest_and_inherit()
+    test_noop_without_tracer()
+    test_propagate_to_threads()
+    test_run_pipeline_spans()
+    test_cache_hits_and_async()
+
+
+if __name__ == "__main__":
+    main()
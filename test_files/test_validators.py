@@ -0,0 +1,89 @@
+"""
+Test script for the single-pass tasks validator (validators.check_tasks)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fakes import make_tasks
+from schemas import TasksDoc
+from validators import check_tasks, validate_tasks
+
+
+def tasks_doc(mutate) -> TasksDoc:
+    data = make_tasks()
+    mutate(data["tasks"])
+    return TasksDoc.model_validate(data)
+
+
+def test_reports_every_field_issue():
+    print("Testing that all field issues are reported at once...")
+    def mutate(tasks):
+        tasks[1]["type"] = "marketing"
+        tasks[4]["priority"] = "urgent"
+        tasks[4]["estimate_hours"] = 40
+        tasks[9]["acceptance_criteria"] = []
+        tasks[12]["title"] = "Do"
+    issues = check_tasks(tasks_doc(mutate))
+    assert [(i.code, i.task_id, i.field) for i in issues] == [
+        ("invalid_type", "T002", "type"),
+        ("invalid_priority", "T005", "priority"),
+        ("estimate_out_of_range", "T005", "estimate_hours"),
+        ("missing_acceptance_criteria", "T010", "acceptance_criteria"),
+        ("short_title", "T013", "title"),
+    ]
+    assert validate_tasks(tasks_doc(mutate))[0] == "Task T002 has invalid type 'marketing'."
+    print("✅ Five problems, five structured issues, one pass")
+
+
+def test_dependency_checks():
+    print("Testing dependency graph checks...")
+    def mutate(tasks):
+        tasks[2]["depends_on"] = ["T003", "T404"]   # self + unknown
+        tasks[5]["depends_on"] = ["T008"]           # forward
+        tasks[7]["depends_on"] = ["T006"]           # closes T006 -> T008 -> T006
+    issues = check_tasks(tasks_doc(mutate))
+    codes = [(i.code, i.task_id) for i in issues]
+    assert ("self_dependency", "T003") in codes
+    assert ("unknown_dependency", "T003") in codes
+    assert ("forward_dependency", "T006") in codes
+    cycles = [i for i in issues if i.code == "dependency_cycle"]
+    assert len(cycles) == 1 and cycles[0].message == "Dependency cycle: T006 -> T008 -> T006."
+    assert str(cycles[0]) == cycles[0].message
+    print("✅ Self, unknown, forward and cyclic dependencies all reported")
+
+
+def test_duplicates_and_count():
+    print("Testing duplicate ids and task count...")
+    data = make_tasks(3)
+    data["tasks"][2]["task_id"] = "T001"
+    data["tasks"][2]["depends_on"] = []
+    issues = check_tasks(TasksDoc.model_validate(data))
+    assert [i.code for i in issues] == ["task_count", "duplicate_id"]
+    print("✅ Count and duplicate-id issues reported")
+
+
+def test_long_chain():
+    print("Testing a 20000-task dependency chain...")
+    data = make_tasks(20000)
+    assert [i.code for i in check_tasks(TasksDoc.model_validate(data))] == ["task_count"]
+    # Closing the chain into one 20000-task cycle is found without recursing per task
+    data["tasks"][0]["depends_on"] = ["T20000"]
+    issues = check_tasks(TasksDoc.model_validate(data))
+    assert [i.code for i in issues] == ["task_count", "forward_dependency", "dependency_cycle"]
+    cycle = issues[2].message.removeprefix("Dependency cycle: ").rstrip(".").split(" -> ")
+    assert cycle == ["T001"] + [f"T{i:03d}" for i in range(20000, 0, -1)]
+    print("✅ The chain validates, and closing it reports one cycle through every task")
+
+
+def main():
+    test_reports_every_field_issue()
+    test_dependency_checks()
+    test_duplicates_and_count()
+    test_long_chain()
+
+
+if __name__ == "__main__":
+    main()
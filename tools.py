@@ -3,6 +3,7 @@ import json
 from pathlib import Path
 from typing import List, Dict, Any
 from schemas import PRD, MilestonesDoc, TasksDoc
+from event_log import get_event_logger
 
 def write_markdown(path: str, text: str) -> None:
     """
@@ -49,14 +50,16 @@ def tasks_to_rows(tdoc: "TasksDoc") -> list[dict]:
 def append_jsonl_log(event: Dict[str, Any], log_path: str = "events.jsonl") -> None:
     """
     Append an event as a JSON line to a log file.
+
+    Events go through the shared buffered logger for `log_path` (see
+    event_log.py), so they reach disk within a second, on flush_event_logs()
+    or at interpreter exit rather than immediately.
     
     Args:
         event: Dictionary containing event data
         log_path: Path to the JSONL log file (default: "events.jsonl")
     """
-    out_dir = ensure_output_dir()
-    with open(log_path, 'a') as f:
-        f.write(f'{json.dumps(event)}\n')
+    get_event_logger(log_path, on_create=ensure_output_dir).log(event)
 
 
 def render_prd(prd_obj: Dict[str, Any]) -> str:
@@ -0,0 +1,208 @@
+# tracing.py
+"""
+Lightweight per-call spans for pipeline runs.
+
+run_pipeline activates a Tracer per run; stage, validation, revision and LLM
+call spans nest under each other through a context variable, so code deeper
+in the stack (llm.py, the backends) can attach attributes such as token usage
+or cache hits to whatever span is current with record(). Without an active
+tracer span() and record() are no-ops.
+
+Durations use time.perf_counter(); start times are offsets from the start of
+the run plus a wall-clock anchor, which is what the OpenTelemetry (OTLP/JSON)
+export needs.
+
+Attributes recorded by the pipeline:
+    stage span:    stage, reused
+    validate span: stage, attempt, issues
+    revise span:   stage, attempt (the attempt the revision produces)
+    llm span:      stage, attempt, model, cache_hit, prompt_tokens, completion_tokens
+"""
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Attributes a span inherits from its parent unless it sets them itself
+INHERITED = ("stage", "attempt")
+
+_tracer: contextvars.ContextVar[Optional["Tracer"]] = contextvars.ContextVar("tracer", default=None)
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float  # perf_counter()
+    duration: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class Tracer:
+    """Collects the spans of one run (thread-safe)."""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self._t0 = time.perf_counter()
+        self._wall_t0_ns = time.time_ns()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        """Make this the current tracer for the block (and threads started via propagate())."""
+        token = _tracer.set(self)
+        try:
+            yield self
+        finally:
+            _tracer.reset(token)
+
+    def _add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Finished spans in start order, as plain dicts (offsets in seconds from the run start)."""
+        with self._lock:
+            spans = sorted((s for s in self.spans if s.duration is not None), key=lambda s: s.start)
+        return [
+            {
+                "trace_id": self.trace_id,
+                "span_id": s.span_id,
+                "parent_id": s.parent_id,
+                "name": s.name,
+                "start_seconds": round(s.start - self._t0, 6),
+                "duration_seconds": round(s.duration, 6),
+                "start_unix_nano": self._wall_t0_ns + int((s.start - self._t0) * 1e9),
+                "attributes": dict(s.attributes),
+                "error": s.error,
+            }
+            for s in spans
+        ]
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time the block as a child of the current span (no-op without an active tracer)."""
+    tracer = _tracer.get()
+    if tracer is None:
+        yield None
+        return
+    parent = _current.get()
+    inherited = {k: parent.attributes[k] for k in INHERITED if parent and k in parent.attributes}
+    s = Span(name, os.urandom(8).hex(), parent.span_id if parent else None, time.perf_counter(),
+             attributes={**inherited, **attributes})
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.duration = time.perf_counter() - s.start
+        _current.reset(token)
+        tracer._add(s)
+
+
+def record(**attributes: Any) -> None:
+    """Set attributes on the current span, if any."""
+    s = _current.get()
+    if s is not None:
+        s.attributes.update(attributes)
+
+
+def propagate(fn: Callable) -> Callable:
+    """Wrap fn so calls from worker threads run in (a copy of) the caller's tracing context."""
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return ctx.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+def summarize(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-stage totals from a run's span dicts.
+
+    llm_seconds sums call durations, so it exceeds the stage's wall time when
+    calls ran concurrently (tasks fan-out).
+    """
+    stages: Dict[str, Dict[str, Any]] = {}
+    for s in spans:
+        a = s["attributes"]
+        if "stage" not in a:
+            continue
+        m = stages.setdefault(a["stage"], {
+            "seconds": 0.0, "reused": False, "attempts": 0, "llm_calls": 0, "llm_seconds": 0.0,
+            "validation_seconds": 0.0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+        })
+        if s["name"] == "stage":
+            m["seconds"] = s["duration_seconds"]
+            m["reused"] = bool(a.get("reused"))
+        elif s["name"] == "validate":
+            m["attempts"] = max(m["attempts"], a.get("attempt", 1))
+            m["validation_seconds"] += s["duration_seconds"]
+        elif s["name"] == "llm":
+            m["attempts"] = max(m["attempts"], a.get("attempt", 1))
+            m["llm_calls"] += 1
+            m["llm_seconds"] += s["duration_seconds"]
+            m["cache_hits"] += bool(a.get("cache_hit"))
+            m["prompt_tokens"] += a.get("prompt_tokens") or 0
+            m["completion_tokens"] += a.get("completion_tokens") or 0
+    for m in stages.values():
+        m["llm_seconds"] = round(m["llm_seconds"], 6)
+        m["validation_seconds"] = round(m["validation_seconds"], 6)
+    return stages
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Dict[str, Any]], service_name: str = "agentic-project-assistant") -> Dict[str, Any]:
+    """Span dicts as an OTLP/JSON ExportTraceServiceRequest (importable by OTel collectors and Jaeger)."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "pipeline"},
+            "spans": [
+                {
+                    "traceId": s["trace_id"],
+                    "spanId": s["span_id"],
+                    **({"parentSpanId": s["parent_id"]} if s["parent_id"] else {}),
+                    "name": s["name"] if "stage" not in s["attributes"] else f"{s['name']} {s['attributes']['stage']}",
+                    "kind": 3 if s["name"] == "llm" else 1,  # CLIENT / INTERNAL
+                    "startTimeUnixNano": str(s["start_unix_nano"]),
+                    "endTimeUnixNano": str(s["start_unix_nano"] + int(s["duration_seconds"] * 1e9)),
+                    "attributes": [
+                        {"key": k, "value": _otlp_value(v)} for k, v in s["attributes"].items() if v is not None
+                    ],
+                    "status": {"code": 2, "message": s["error"]} if s["error"] else {"code": 1},
+                }
+                for s in spans
+            ],
+        }],
+    }]}
+
+
+def write_otlp_json(spans: List[Dict[str, Any]], path: str, service_name: str = "agentic-project-assistant") -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(to_otlp(spans, service_name), indent=2), encoding="utf-8")
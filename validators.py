@@ -1,6 +1,7 @@
 # validators.py
 from __future__ import annotations
-from typing import List
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 from schemas import PRD
 from schemas import MilestonesDoc
 from schemas import TasksDoc
@@ -8,6 +9,17 @@ from schemas import TasksDoc
 ALLOWED_TYPES = {"backend", "frontend", "data", "ml", "infra", "docs", "testing"}
 ALLOWED_PRIORITIES = {"P0", "P1", "P2"}
 
+# (min, max) bounds checked below
+PRD_LIST_BOUNDS = {
+    "functional_requirements": (6, 10),
+    "nonfunctional_requirements": (4, 8),
+    "user_stories": (6, 10),
+}
+MILESTONE_COUNT = (3, 6)
+MILESTONE_EST_DAYS = (1, 14)
+TASK_COUNT = (20, 45)
+TASK_ESTIMATE_HOURS = (0.5, 24)
+
 def validate_prd(prd: PRD) -> List[str]:
     issues: List[str] = []
 
@@ -19,14 +31,10 @@ def validate_prd(prd: PRD) -> List[str]:
     if len(prd.target_users) < 1:
         issues.append("PRD target_users should have at least 1 item.")
 
-    if not (6 <= len(prd.functional_requirements) <= 10):
-        issues.append(f"functional_requirements should be 6–10 items, got {len(prd.functional_requirements)}.")
-
-    if not (4 <= len(prd.nonfunctional_requirements) <= 8):
-        issues.append(f"nonfunctional_requirements should be 4–8 items, got {len(prd.nonfunctional_requirements)}.")
-
-    if not (6 <= len(prd.user_stories) <= 10):
-        issues.append(f"user_stories should be 6–10 items, got {len(prd.user_stories)}.")
+    for field, (lo, hi) in PRD_LIST_BOUNDS.items():
+        n = len(getattr(prd, field))
+        if not (lo <= n <= hi):
+            issues.append(f"{field} should be {lo}–{hi} items, got {n}.")
 
     # Optional: require some goals
     if len(prd.goals) < 3:
@@ -43,8 +51,9 @@ def validate_milestones(mdoc: MilestonesDoc) -> List[str]:
     if not mdoc.title.strip():
         issues.append("Milestones title is empty.")
 
-    if not (3 <= len(mdoc.milestones) <= 6):
-        issues.append(f"milestones should be 3–6 items, got {len(mdoc.milestones)}.")
+    lo, hi = MILESTONE_COUNT
+    if not (lo <= len(mdoc.milestones) <= hi):
+        issues.append(f"milestones should be {lo}–{hi} items, got {len(mdoc.milestones)}.")
 
     for idx, m in enumerate(mdoc.milestones, 1):
         if len(m.name.strip()) < 3:
@@ -53,54 +62,117 @@ def validate_milestones(mdoc: MilestonesDoc) -> List[str]:
             issues.append(f"Milestone {idx} objective is too short.")
         if len(m.deliverables) < 2:
             issues.append(f"Milestone {idx} should have at least 2 deliverables.")
-        if not (1 <= m.est_days <= 14):
+        if not (MILESTONE_EST_DAYS[0] <= m.est_days <= MILESTONE_EST_DAYS[1]):
             issues.append(f"Milestone {idx} est_days should be 1–14 for MVP solo scope, got {m.est_days}.")
 
     return issues
 
 
-def validate_tasks(tdoc: TasksDoc) -> list[str]:
-    issues: list[str] = []
+@dataclass(frozen=True)
+class TaskIssue:
+    """One tasks-doc problem; str() gives the message used in revise prompts."""
+    code: str
+    message: str
+    task_id: Optional[str] = None
+    field: Optional[str] = None
+
+    def __str__(self) -> str:
+        return self.message
+
+
+def _find_cycles(ids: List[str], edges: Dict[str, List[str]]) -> List[List[str]]:
+    """Iterative DFS over task -> dependency edges; returns one path per back edge."""
+    WHITE, GREY, BLACK = 0, 1, 2
+    color = {tid: WHITE for tid in ids}
+    cycles: List[List[str]] = []
+    for root in ids:
+        if color[root] != WHITE:
+            continue
+        color[root] = GREY
+        path = [root]
+        stack = [iter(edges.get(root, ()))]
+        while stack:
+            dep = next(stack[-1], None)
+            if dep is None:
+                color[path.pop()] = BLACK
+                stack.pop()
+            elif color[dep] == GREY:
+                cycles.append(path[path.index(dep):] + [dep])
+            elif color[dep] == WHITE:
+                color[dep] = GREY
+                path.append(dep)
+                stack.append(iter(edges.get(dep, ())))
+    return cycles
+
+
+def check_tasks(tdoc: TasksDoc) -> List[TaskIssue]:
+    """
+    Report every problem in a tasks doc in one pass.
+
+    Field checks run on every task, and the dependency graph is built once to
+    flag unknown, self, forward (depends_on a later task) and cyclic
+    references in O(V+E).
+    """
+    issues: List[TaskIssue] = []
 
     n = len(tdoc.tasks)
-    if not (20 <= n <= 45):
-        issues.append(f"tasks should be 20–45 items, got {n}.")
-
-    # task_id uniqueness
-    ids = [t.task_id for t in tdoc.tasks]
-    if len(set(ids)) != len(ids):
-        issues.append("task_id values are not unique.")
+    if not (TASK_COUNT[0] <= n <= TASK_COUNT[1]):
+        issues.append(TaskIssue("task_count", f"tasks should be {TASK_COUNT[0]}–{TASK_COUNT[1]} items, got {n}.",
+                                field="tasks"))
+
+    # task_id uniqueness; the first occurrence is the one dependencies resolve to
+    position: Dict[str, int] = {}
+    for idx, t in enumerate(tdoc.tasks):
+        if t.task_id in position:
+            issues.append(TaskIssue("duplicate_id", f"task_id values are not unique ('{t.task_id}' repeats).",
+                                    t.task_id, "task_id"))
+        else:
+            position[t.task_id] = idx
 
     # basic field checks
+    lo_h, hi_h = TASK_ESTIMATE_HOURS
     for t in tdoc.tasks:
-        if not t.task_id.strip():
-            issues.append("A task has an empty task_id.")
-            break
+        tid = t.task_id
+        if not tid.strip():
+            issues.append(TaskIssue("empty_id", "A task has an empty task_id.", tid, "task_id"))
         if len(t.title.strip()) < 5:
-            issues.append(f"Task {t.task_id} title too short.")
-            break
+            issues.append(TaskIssue("short_title", f"Task {tid} title too short.", tid, "title"))
         if t.type not in ALLOWED_TYPES:
-            issues.append(f"Task {t.task_id} has invalid type '{t.type}'.")
-            break
+            issues.append(TaskIssue("invalid_type", f"Task {tid} has invalid type '{t.type}'.", tid, "type"))
         if t.priority not in ALLOWED_PRIORITIES:
-            issues.append(f"Task {t.task_id} has invalid priority '{t.priority}'.")
-            break
-        if not (0.5 <= t.estimate_hours <= 24):
-            issues.append(f"Task {t.task_id} estimate_hours should be 0.5–24, got {t.estimate_hours}.")
-            break
+            issues.append(TaskIssue("invalid_priority", f"Task {tid} has invalid priority '{t.priority}'.",
+                                    tid, "priority"))
+        if not (lo_h <= t.estimate_hours <= hi_h):
+            issues.append(TaskIssue("estimate_out_of_range",
+                                    f"Task {tid} estimate_hours should be 0.5–24, got {t.estimate_hours}.",
+                                    tid, "estimate_hours"))
         if len(t.acceptance_criteria) < 1:
-            issues.append(f"Task {t.task_id} missing acceptance_criteria.")
-            break
+            issues.append(TaskIssue("missing_acceptance_criteria", f"Task {tid} missing acceptance_criteria.",
+                                    tid, "acceptance_criteria"))
 
-    # dependency correctness (depends_on must reference existing ids)
-    id_set = set(ids)
-    for t in tdoc.tasks:
+    # dependency graph: depends_on must reference existing, earlier ids
+    edges: Dict[str, List[str]] = {}
+    for idx, t in enumerate(tdoc.tasks):
+        tid = t.task_id
         for dep in t.depends_on:
-            if dep not in id_set:
-                issues.append(f"Task {t.task_id} depends_on unknown id '{dep}'.")
-                return issues
-            if dep == t.task_id:
-                issues.append(f"Task {t.task_id} depends on itself.")
-                return issues
+            if dep == tid:
+                issues.append(TaskIssue("self_dependency", f"Task {tid} depends on itself.", tid, "depends_on"))
+            elif dep not in position:
+                issues.append(TaskIssue("unknown_dependency", f"Task {tid} depends_on unknown id '{dep}'.",
+                                        tid, "depends_on"))
+            else:
+                if position[dep] > idx:
+                    issues.append(TaskIssue("forward_dependency",
+                                            f"Task {tid} depends_on later task '{dep}'; "
+                                            f"dependencies must reference earlier task_ids.",
+                                            tid, "depends_on"))
+                edges.setdefault(tid, []).append(dep)
+
+    for cycle in _find_cycles(list(position), edges):
+        issues.append(TaskIssue("dependency_cycle", f"Dependency cycle: {' -> '.join(cycle)}.", cycle[0], "depends_on"))
 
     return issues
+
+
+def validate_tasks(tdoc: TasksDoc) -> list[str]:
+    return [issue.message for issue in check_tasks(tdoc)]